@@ -1,14 +1,33 @@
+import json
 import os
 import re
+import time
 from collections import Counter
-import nltk
-from flask import Flask, jsonify, request
-from googleapiclient.discovery import build
+import numpy as np
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from dotenv import load_dotenv
 from flask_cors import CORS
 
-from creator_suggestions import suggest_content
-from creator_coach_ai import fetch_trending_videos, analyze_trends_with_gemini
+# creator_suggestions / creator_coach_ai (pandas, sklearn, textblob, Gemini) are
+# imported inside the endpoints that use them, keeping app startup fast
+from youtube_api import build_youtube_client, iter_most_popular, trending_cache, youtube_inflight
+from video_batch import VideoBatch, group_sum
+from snapshot_store import TRENDING_CHART_SIZE, content_hash, snapshot_store, snapshot_writer
+from collector import TrendingCollector
+from gemini_api import gemini_stats, gemini_pool_stats
+from client_pool import youtube_http_pool
+from jobs import job_manager, JobQueueFull
+from title_sentiment import sentiment_memo
+from stopwords_en import ENGLISH_STOP_WORDS
+from search_index import corpus_index, snapshot_index
+from keyword_trends import keyword_trends
+from response_cache import FieldsError, RenderedResponse, parse_fields, project_payload, response_cache
+from serialization import FormatError, encode_frame_payload, negotiate_format
+from metrics import REQUEST_SECONDS, render_metrics, stage, timed
+from profiler import (PROFILING_AVAILABLE, begin_request, end_request, profile_store, profiled,
+                      pstats_text, token_matches)
+from transport import TRANSPORT_MODE, record_inbound, transport_stats
+from watchlist import VIDEO_ID, WATCHLIST_MAX_VIDEOS, WatchlistPoller, velocity, watchlist_store
 
 
 # --- 1. Setup and Config ---
@@ -22,25 +41,48 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not YOUTUBE_API_KEY or not GEMINI_API_KEY:
     raise ValueError("⚠️ API keys not found in environment variables.")
 
-# Initialize the NLTK library for keyword analysis
-# We only need to do this once
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    print("Downloading NLTK stopwords...")
-    nltk.download('stopwords')
-
-from nltk.corpus import stopwords
-STOP_WORDS = set(stopwords.words('english'))
+# Stopwords for keyword analysis (NLTK's English list, vendored in stopwords_en.py)
+STOP_WORDS = set(ENGLISH_STOP_WORDS)
 
 # Initialize the Flask app
 app = Flask(__name__)
 CORS(app)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if PROFILING_AVAILABLE:
+        # Opt-in profiling (see profiler.py): admin token in X-Profile / ?profile=, or sampled traffic
+        begin_request(
+            request.headers.get('X-Profile') or request.args.get('profile'),
+            request.headers.get('X-Profile-Mode') or request.args.get('profile_mode')
+        )
+
+
+@app.after_request
+def record_request_time(response):
+    """Request latency by route (streamed bodies: until the response starts)."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        latency = time.perf_counter() - started
+        REQUEST_SECONDS.observe(latency, endpoint, request.method, str(response.status_code))
+        if TRANSPORT_MODE == 'record':
+            # Inbound traffic goes in the transport log too, for benchmarks/bench_replay.py
+            record_inbound(request.method, request.full_path, response.status_code, latency)
+    if PROFILING_AVAILABLE:
+        profile_id = end_request()
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = str(profile_id)
+    return response
+
+
 # --- 2. API Service ---
 
 # Create the YouTube API service object
 # This is what we'll use to make our calls
-youtube_service = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+youtube_service = build_youtube_client(YOUTUBE_API_KEY)
 
 
 # --- 3. Test Route ---
@@ -52,22 +94,23 @@ def home():
 
 # --- 3. Helper Functions (The Analysis Core) ---
 
-def analyze_categories(video_items):
+@timed
+def analyze_categories(batch):
     """Counts the occurrences of each video category ID."""
     category_counter = Counter()
-    for item in video_items:
-        # 'categoryId' is in the 'snippet' part of the video item
-        category_id = item['snippet'].get('categoryId')
-        if category_id:
-            category_counter[category_id] += 1
+    counts = np.bincount(batch.category_codes[batch.category_codes >= 0], minlength=len(batch.categories))
+    # 'categories' is already in first-seen order, matching the old per-item loop
+    for code, category_id in enumerate(batch.categories):
+        category_counter[category_id] = int(counts[code])
     
     # We'll get category *names* in a later step
     # For now, just return the counts by ID
     return category_counter
 
-def analyze_keywords(video_items):
+@timed
+def analyze_keywords(batch):
     """Extracts and counts common keywords from video titles, filtering stopwords."""
-    all_titles = " ".join([item['snippet']['title'] for item in video_items])
+    all_titles = " ".join([title for title in batch.titles if title])
     
     # Clean the text: keep only letters and spaces, and make lowercase
     cleaned_text = re.sub(r'[^a-zA-Z\s]', '', all_titles).lower()
@@ -78,135 +121,66 @@ def analyze_keywords(video_items):
     # Return the 15 most common keywords
     return Counter(words).most_common(15)
 
-def analyze_upload_vs_popularity(video_items):
+@timed
+def analyze_upload_vs_popularity(batch, now_seconds=None):
     """Analyzes time since upload vs popularity for scatter/bubble chart visualization."""
     from datetime import datetime, timezone
     
-    data_points = []
+    # Whole seconds since the epoch; timestamps in the batch are whole seconds too
+    if now_seconds is None:
+        now_seconds = int(datetime.now(timezone.utc).timestamp())
     
-    for item in video_items:
-        snippet = item.get('snippet', {})
-        statistics = item.get('statistics', {})
-        
-        published_at = snippet.get('publishedAt')
-        views_str = statistics.get('viewCount')
-        
-        # Calculate engagement rate
-        likes_str = statistics.get('likeCount')
-        comments_str = statistics.get('commentCount')
-        
-        try:
-            views = int(views_str) if views_str is not None else 0
-        except ValueError:
-            views = 0
-        
-        try:
-            likes = int(likes_str) if likes_str is not None else 0
-        except ValueError:
-            likes = 0
-        
-        try:
-            comments = int(comments_str) if comments_str is not None else 0
-        except ValueError:
-            comments = 0
-        
-        engagement_rate = round(((likes + comments) / views) * 100, 2) if views > 0 else 0.0
-        
-        # Calculate days since upload
-        if published_at:
-            try:
-                # Handle different date formats from YouTube API
-                if published_at.endswith('Z'):
-                    upload_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
-                else:
-                    upload_date = datetime.strptime(published_at.split('.')[0], "%Y-%m-%dT%H:%M:%S")
-                
-                days_since_upload = (datetime.now(timezone.utc) - upload_date.replace(tzinfo=timezone.utc)).days
-                
-                if days_since_upload is not None and days_since_upload >= 0:
-                    video_title = snippet.get('title', 'Unknown Video')
-                    video_id = item.get('id', '')
-                    data_points.append({
-                        "x": days_since_upload,
-                        "y": views,
-                        "engagement_rate": engagement_rate,  # Store for later normalization
-                        "title": video_title,
-                        "video_id": video_id
-                    })
-            except Exception as e:
-                # Skip videos with invalid date formats
-                continue
+    # Calculate days since upload for every video with a valid date at once
+    rows = np.flatnonzero(batch.published_valid)
+    days_since_upload = (now_seconds - batch.published_at[rows]) // 86400
+    keep = days_since_upload >= 0
+    rows = rows[keep]
     
-    # Set uniform bubble size for all data points
-    for point in data_points:
-        point["r"] = 8  # Uniform size for all bubbles (8 pixels radius)
+    titles = batch.titles
+    ids = batch.ids
     
-    return data_points
+    # One dict per point is what the chart expects; bubble size is uniform (8px radius)
+    return [
+        {
+            "x": x,
+            "y": y,
+            "engagement_rate": rate,  # Store for later normalization
+            "title": titles[i] if titles[i] is not None else 'Unknown Video',
+            "video_id": ids[i],
+            "r": 8
+        }
+        for i, x, y, rate in zip(
+            rows.tolist(),
+            days_since_upload[keep].tolist(),
+            batch.views[rows].tolist(),
+            batch.engagement_rates[rows].tolist()
+        )
+    ]
 
-def analyze_upload_times(video_items):
+@timed
+def analyze_upload_times(batch):
     """Analyzes which hour of the day (0-23) trending videos were uploaded and their average view counts."""
-    from datetime import datetime, timezone
-    from collections import defaultdict
+    valid = batch.published_valid
     
-    # Dictionary to store hour -> [views, count]
-    hour_data = defaultdict(lambda: {"total_views": 0, "count": 0, "total_engagement": 0.0})
+    # Extract the hour (0-23) from each UTC timestamp
+    upload_hours = (batch.published_at[valid] % 86400 // 3600).astype(np.intp)
     
-    for item in video_items:
-        snippet = item.get('snippet', {})
-        statistics = item.get('statistics', {})
-        
-        published_at = snippet.get('publishedAt')
-        views_str = statistics.get('viewCount')
-        likes_str = statistics.get('likeCount')
-        comments_str = statistics.get('commentCount')
-        
-        try:
-            views = int(views_str) if views_str is not None else 0
-        except ValueError:
-            views = 0
-        
-        try:
-            likes = int(likes_str) if likes_str is not None else 0
-        except ValueError:
-            likes = 0
-        
-        try:
-            comments = int(comments_str) if comments_str is not None else 0
-        except ValueError:
-            comments = 0
-        
-        engagement_rate = round(((likes + comments) / views) * 100, 2) if views > 0 else 0.0
-        
-        if published_at:
-            try:
-                # Parse the upload date and time
-                if published_at.endswith('Z'):
-                    upload_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
-                else:
-                    upload_date = datetime.strptime(published_at.split('.')[0], "%Y-%m-%dT%H:%M:%S")
-                
-                # Extract the hour (0-23)
-                upload_hour = upload_date.hour
-                
-                # Add to the hour's data
-                hour_data[upload_hour]["total_views"] += views
-                hour_data[upload_hour]["count"] += 1
-                hour_data[upload_hour]["total_engagement"] += engagement_rate
-            except Exception as e:
-                # Skip videos with invalid date formats
-                continue
+    # Per-hour reductions. Views are summed as exact integers; bincount adds the
+    # engagement weights in row order, so the float totals match a plain loop.
+    counts = np.bincount(upload_hours, minlength=24).tolist()
+    total_views = group_sum(upload_hours, batch.views[valid], 24).tolist()
+    total_engagement = np.bincount(upload_hours, weights=batch.engagement_rates[valid], minlength=24).tolist()
     
     # Calculate average views per hour and create data points for line chart
     upload_time_data = []
     for hour in range(24):
-        if hour in hour_data:
-            avg_views = hour_data[hour]["total_views"] / hour_data[hour]["count"]
-            avg_engagement = hour_data[hour]["total_engagement"] / hour_data[hour]["count"]
-            video_count = hour_data[hour]["count"]
+        video_count = counts[hour]
+        if video_count:
+            avg_views = total_views[hour] / video_count
+            avg_engagement = total_engagement[hour] / video_count
         else:
             avg_views = 0
             avg_engagement = 0
-            video_count = 0
         
         # Format hour for display (12-hour format with AM/PM)
         hour_label = f"{hour % 12 if hour % 12 != 0 else 12}{'AM' if hour < 12 else 'PM'}"
@@ -221,7 +195,19 @@ def analyze_upload_times(video_items):
     
     return upload_time_data
 
-def generate_upload_recommendations(video_items, upload_time_data, category_analysis):
+def category_view_totals(batch):
+    """{category_id: {"total_views", "count"}} for every category with videos (grouped by category code)."""
+    has_category = batch.category_codes >= 0
+    codes = batch.category_codes[has_category]
+    category_counts = np.bincount(codes, minlength=len(batch.categories)).tolist()
+    category_totals = group_sum(codes, batch.views[has_category], len(batch.categories)).tolist()
+    return {
+        category_id: {"total_views": category_totals[code], "count": category_counts[code]}
+        for code, category_id in enumerate(batch.categories) if category_counts[code]
+    }
+
+@timed
+def generate_upload_recommendations(batch, upload_time_data, category_analysis):
     """Uses ML/statistical analysis to recommend best upload times and categories."""
     
     # Find the best upload hour based on average views (only consider hours with videos)
@@ -247,20 +233,7 @@ def generate_upload_recommendations(video_items, upload_time_data, category_anal
         category_items = list(category_analysis.items())
         
         # Analyze videos in each category to find average views
-        category_views = {}
-        for item in video_items:
-            category_id = str(item.get('snippet', {}).get('categoryId', ''))
-            views_str = item.get('statistics', {}).get('viewCount', '0')
-            try:
-                views = int(views_str) if views_str else 0
-            except ValueError:
-                views = 0
-            
-            if category_id:
-                if category_id not in category_views:
-                    category_views[category_id] = {"total_views": 0, "count": 0}
-                category_views[category_id]["total_views"] += views
-                category_views[category_id]["count"] += 1
+        category_views = category_view_totals(batch)
         
         # Calculate average views per category
         category_performance = []
@@ -322,216 +295,337 @@ def generate_upload_recommendations(video_items, upload_time_data, category_anal
     
     return insights
 
-# --- 4. Main API Endpoint ---
+@timed
+def load_trending_items(country_code, source='api'):
+    """
+    Fetches (or loads from the snapshot store) trending videos for a country.
+    Returns (video_items, snapshot); snapshot is None when the data came from the API.
+    """
+    # --- Stored snapshot (optional) ---
+    snapshot = snapshot_store.latest_snapshot(country_code) if source == 'store' else None
+    
+    if snapshot is not None:
+        video_items = snapshot["items"]
+    else:
+        # --- API Integration (30%) ---
+        # This is the actual call to the YouTube API
+        # Responses are shared through the trending cache (see youtube_api.py)
+        # Pages of 50 are streamed until we have the top 100
+        video_items = list(iter_most_popular(
+            youtube_service,
+            region=country_code,       # Set the country
+            limit=TRENDING_CHART_SIZE, # Get the top 100 videos
+            part="snippet,statistics"  # Request video details and view counts
+        ))
+    return video_items, snapshot
+
+def load_trending_batch(country_code, source='api'):
+    """Like load_trending_items, but returns (batch, snapshot)."""
+    video_items, snapshot = load_trending_items(country_code, source)
+    # Parse every video once; all analyzers share this columnar batch
+    return VideoBatch.from_items(video_items), snapshot
+
+def trending_version(video_items, snapshot):
+    """
+    The snapshot hash a trending payload was built from (ETags derive from it).
+    A stored snapshot adds its id: the payload carries snapshot_captured_at,
+    which differs between snapshots of the same chart.
+    """
+    if snapshot is not None:
+        return f"{snapshot['content_hash']}-{snapshot['id']}"
+    return content_hash(video_items)
+
+@timed
+def build_trending_payload(country_code, keyword='', source='api', batch=None, snapshot=None):
+    """
+    Runs every analyzer on a country's trending videos and returns the
+    /get_trending_data payload. Pass `batch` to skip loading it again.
+    """
+    if batch is None:
+        batch, snapshot = load_trending_batch(country_code, source)
+    
+    # --- Data Analysis (50%) ---
+    category_analysis = analyze_categories(batch)
+    keyword_analysis = analyze_keywords(batch)
+    upload_vs_popularity = analyze_upload_vs_popularity(batch)
+    upload_times_analysis = analyze_upload_times(batch)
+    upload_recommendations = generate_upload_recommendations(batch, upload_times_analysis, category_analysis)
+    
+    # We also need a simple list of videos for the dashboard
+    video_dashboard_list = [batch.dashboard_row(i) for i in range(len(batch))]
+
+    # Filter main videos by keyword if provided. Each chart's index is cached
+    # and remembers the rows a keyword matched, so repeat filters skip the scan.
+    also_trending_list = []
+    if keyword:
+        index = snapshot_index(batch)
+        video_dashboard_list = [video_dashboard_list[i] for i in index.rows_containing(keyword, ('title',))]
+
+        # "Also trending" reuses the same top 100 (the extended search used to
+        # issue the exact same request a second time), skipping videos already
+        # in the main list
+        main_ids = {v['video_id'] for v in video_dashboard_list}
+        also_trending_list = [
+            batch.dashboard_row(i) for i in index.rows_containing(keyword, ('title', 'description'))
+            if batch.ids[i] not in main_ids
+        ]
+
+    # Return everything in a structured JSON format
+    payload = {
+        "success": True,
+        "country": country_code,
+        "keyword": keyword,
+        "videos": video_dashboard_list,
+        "also_trending": also_trending_list if keyword else [],
+        "category_analysis": category_analysis,
+        "keyword_analysis": keyword_analysis,
+        "upload_vs_popularity": upload_vs_popularity,
+        "upload_times_analysis": upload_times_analysis,
+        "upload_recommendations": upload_recommendations
+    }
+    if snapshot is not None:
+        payload["snapshot_captured_at"] = snapshot["captured_at"]
+    return payload
+
+# --- 4. Background Collector ---
+
+def precompute_trending(region, category_id):
+    """
+    Collector task: warms the YouTube cache for a region (and genre), and
+    precomputes the dashboard payload for the all-category chart, as
+    (snapshot hash, payload).
+    """
+    if category_id is None:
+        video_items, snapshot = load_trending_items(region)
+        batch = VideoBatch.from_items(video_items)
+        return trending_version(video_items, snapshot), build_trending_payload(region, batch=batch, snapshot=snapshot)
+    # Same request the Creator Coach makes for a genre
+    list(iter_most_popular(youtube_service, region=region, limit=20, category_id=category_id))
+    return None
+
+# The all-category chart is two 50-item pages, i.e. two quota units
+trending_collector = TrendingCollector(precompute_trending, quota_cost=2)
+
+# Every freshly fetched dashboard chart also feeds the streaming keyword statistics
+# (the Creator Coach / suggestions fetch the top of the same chart; counting them too would double titles)
+snapshot_writer.subscribe(keyword_trends.observe, min_chart_size=TRENDING_CHART_SIZE)
+
+def warm_trending(country_code):
+    """(snapshot hash, payload) the collector precomputed for a region, or (None, None)."""
+    warm = trending_collector.warm_payload(country_code)
+    return warm if warm is not None else (None, None)
+
+def start_background_collector():
+    """Starts the collector when COLLECTOR_ENABLED=1, and the watchlist poller when WATCHLIST_ENABLED=1."""
+    if os.getenv("COLLECTOR_ENABLED", "0") == "1":
+        trending_collector.start()
+    if os.getenv("WATCHLIST_ENABLED", "0") == "1":
+        watchlist_poller.start()
+
+# --- 5. Multi-Region Fan-out ---
+
+MULTI_REGION_WORKERS = int(os.getenv("MULTI_REGION_WORKERS", 8))
+MAX_REGIONS = int(os.getenv("MAX_REGIONS", 20))
+
+def parse_country_list(country_param):
+    """'us, IN,JP,us' -> ['US', 'IN', 'JP'] (order kept, duplicates dropped)."""
+    countries = []
+    for code in country_param.split(','):
+        code = code.strip().upper()
+        if code and code not in countries:
+            countries.append(code)
+    return countries[:MAX_REGIONS]
+
+def merge_region_analytics(batches):
+    """Cross-region aggregates computed over every region's videos together."""
+    combined = VideoBatch.concat(batches)
+    return {
+        "video_count": len(combined),
+        "category_analysis": analyze_categories(combined),
+        "keyword_analysis": analyze_keywords(combined),
+        "upload_times_analysis": analyze_upload_times(combined)
+    }
+
+def build_multi_region_payload(countries, keyword='', source='api'):
+    """
+    Fetches and analyzes several regions in parallel on a bounded pool.
+    Total latency tracks the slowest region instead of the sum of all of them.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run_region(country_code):
+        start = time.perf_counter()
+        try:
+            batch, snapshot = load_trending_batch(country_code, source)
+            payload = None
+            if not keyword and source == 'api':
+                _, payload = warm_trending(country_code)
+            if payload is None:
+                payload = build_trending_payload(country_code, keyword, source, batch=batch, snapshot=snapshot)
+        except Exception as e:
+            print(f"An error occurred for {country_code}: {e}")
+            batch, payload = None, {"success": False, "error": str(e)}
+        return batch, payload, round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    workers = max(1, min(MULTI_REGION_WORKERS, len(countries)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="region") as pool:
+        results = list(pool.map(run_region, countries))
+
+    regions, timings, batches = {}, {}, []
+    for country_code, (batch, payload, elapsed_ms) in zip(countries, results):
+        regions[country_code] = payload
+        timings[country_code] = elapsed_ms
+        if batch is not None:
+            batches.append(batch)
+
+    return {
+        "success": any(payload.get("success") for payload in regions.values()),
+        "countries": countries,
+        "keyword": keyword,
+        "regions": regions,
+        "merged": merge_region_analytics(batches),
+        "timings_ms": {
+            "regions": timings,
+            "slowest_region": max(timings.values()) if timings else 0,
+            "total": round((time.perf_counter() - start) * 1000, 1)
+        }
+    }
+
+# --- 6. Main API Endpoint ---
 
 @app.route('/get_trending_data')
+@profiled
 def get_trending_data():
     """
     Fetches trending videos for a given country and returns analyzed data.
+    A comma-separated list (e.g. ?country=US,IN,JP) returns per-region
+    results plus merged cross-region analytics.
+
+    `fields=` trims the response (e.g. fields=videos(video_id,title),keyword_analysis).
+    Responses are gzip/brotli compressed when the client accepts it, and
+    single-region responses carry an ETag: an unchanged chart revalidates
+    with a 304 instead of being rebuilt and resent.
     """
     # Get the 'country' code from the request (e.g., /get_trending_data?country=US)
     country_code = request.args.get('country', 'US') # Default to 'US'
     keyword = request.args.get('keyword', '').strip().lower() # Get keyword filter
+    source = request.args.get('source', 'api') # 'store' reads the latest recorded snapshot
+    fields_param = request.args.get('fields', '').strip()
     
     try:
-        # --- API Integration (30%) ---
-        # This is the actual call to the YouTube API
-        # Fetch top 25 for main display
-        api_request = youtube_service.videos().list(
-            part="snippet,statistics", # Request video details and view counts
-            chart="mostPopular",      # Get the "trending" chart
-            regionCode=country_code,  # Set the country
-            maxResults=100             # Get the top 25 videos
-        )
-        api_response = api_request.execute()
-        
-        video_items = api_response.get("items", [])
-        
-        # If keyword is provided, fetch more videos (top 100) for "Also trending" section
-        extended_video_items = []
-        if keyword:
-            extended_request = youtube_service.videos().list(
-                part="snippet,statistics",
-                chart="mostPopular",
-                regionCode=country_code,
-                maxResults=100  # Get top 100 for extended search
-            )
-            extended_response = extended_request.execute()
-            extended_video_items = extended_response.get("items", [])
-        
-        # --- Data Analysis (50%) ---
-        category_analysis = analyze_categories(video_items)
-        keyword_analysis = analyze_keywords(video_items)
-        upload_vs_popularity = analyze_upload_vs_popularity(video_items)
-        upload_times_analysis = analyze_upload_times(video_items)
-        upload_recommendations = generate_upload_recommendations(video_items, upload_times_analysis, category_analysis)
-        
-        # We also need a simple list of videos for the dashboard
-        video_dashboard_list = []
-        for item in video_items:
-            # Extract statistics safely
-            views_str = item['statistics'].get('viewCount')
-            likes_str = item['statistics'].get('likeCount')
-            comments_str = item['statistics'].get('commentCount')
-
-            try:
-                views = int(views_str) if views_str is not None else 0
-            except ValueError:
-                views = 0
-
-            try:
-                likes = int(likes_str) if likes_str is not None else 0
-            except ValueError:
-                likes = 0
-
-            try:
-                comments = int(comments_str) if comments_str is not None else 0
-            except ValueError:
-                comments = 0
-
-            engagement_rate = round(((likes + comments) / views) * 100, 2) if views > 0 else 0.0
-
-            # Get category ID from snippet (ensure it's a string for consistency)
-            category_id = str(item['snippet'].get('categoryId', ''))
-            
-            # Get higher quality thumbnail (try maxres, then high, fallback to default)
-            thumbnails = item['snippet'].get('thumbnails', {})
-            thumbnail_url = thumbnails.get('maxres', {}).get('url') or \
-                           thumbnails.get('high', {}).get('url') or \
-                           thumbnails.get('medium', {}).get('url') or \
-                           thumbnails.get('default', {}).get('url', '')
-
-            # Get description from snippet
-            description = item['snippet'].get('description', '')
-            
-            video_dashboard_list.append({
-                "video_id": item['id'],
-                "title": item['snippet']['title'],
-                "thumbnail": thumbnail_url,
-                "views": views,
-                "likes": likes,
-                "comment_count": comments,
-                "like_count": likes,
-                "engagement_rate": engagement_rate,
-                "category_id": category_id,
-                "description": description
-            })
-
-        # Helper function to check if video contains keyword
-        def video_contains_keyword(item, keyword):
-            if not keyword:
-                return True
-            title = item['snippet'].get('title', '').lower()
-            description = item['snippet'].get('description', '').lower()
-            return keyword in title or keyword in description
-        
-        # Filter main videos by keyword if provided
-        if keyword:
-            video_dashboard_list = [v for v in video_dashboard_list 
-                                  if keyword in v['title'].lower()]
-        
-        # Process extended videos for "Also trending" section
-        also_trending_list = []
-        if keyword and extended_video_items:
-            for item in extended_video_items:
-                # Skip videos already in main list
-                item_id = item['id']
-                if any(v['video_id'] == item_id for v in video_dashboard_list):
-                    continue
-                
-                # Check if video contains keyword
-                if not video_contains_keyword(item, keyword):
-                    continue
-                
-                # Extract statistics
-                views_str = item['statistics'].get('viewCount')
-                likes_str = item['statistics'].get('likeCount')
-                comments_str = item['statistics'].get('commentCount')
-
-                try:
-                    views = int(views_str) if views_str is not None else 0
-                except ValueError:
-                    views = 0
-
-                try:
-                    likes = int(likes_str) if likes_str is not None else 0
-                except ValueError:
-                    likes = 0
-
-                try:
-                    comments = int(comments_str) if comments_str is not None else 0
-                except ValueError:
-                    comments = 0
-
-                engagement_rate = round(((likes + comments) / views) * 100, 2) if views > 0 else 0.0
-
-                # Get category ID (ensure it's a string for consistency)
-                category_id = str(item['snippet'].get('categoryId', ''))
-                
-                # Get thumbnail
-                thumbnails = item['snippet'].get('thumbnails', {})
-                thumbnail_url = thumbnails.get('maxres', {}).get('url') or \
-                               thumbnails.get('high', {}).get('url') or \
-                               thumbnails.get('medium', {}).get('url') or \
-                               thumbnails.get('default', {}).get('url', '')
-
-                # Get description
-                description = item['snippet'].get('description', '')
-                
-                also_trending_list.append({
-                    "video_id": item_id,
-                    "title": item['snippet']['title'],
-                    "thumbnail": thumbnail_url,
-                    "views": views,
-                    "likes": likes,
-                    "comment_count": comments,
-                    "like_count": likes,
-                    "engagement_rate": engagement_rate,
-                    "category_id": category_id,
-                    "description": description
-                })
+        fields = parse_fields(fields_param) if fields_param else None
+    except FieldsError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-        # Return everything in a structured JSON format
-        return jsonify({
-            "success": True,
-            "country": country_code,
-            "keyword": keyword,
-            "videos": video_dashboard_list,
-            "also_trending": also_trending_list if keyword else [],
-            "category_analysis": category_analysis,
-            "keyword_analysis": keyword_analysis,
-            "upload_vs_popularity": upload_vs_popularity,
-            "upload_times_analysis": upload_times_analysis,
-            "upload_recommendations": upload_recommendations
-        })
+    try:
+        if ',' in country_code:
+            payload = build_multi_region_payload(parse_country_list(country_code), keyword, source)
+            return render_json(None, project_payload(payload, fields)).response(request)
+
+        # Serve the collector's precomputed payload when we have a fresh one
+        version, payload = warm_trending(country_code) if not keyword and source == 'api' else (None, None)
+        if payload is None:
+            video_items, snapshot = load_trending_items(country_code, source)
+            version = trending_version(video_items, snapshot)
+
+        # Same chart, same request: reuse the rendered (and compressed) body
+        key = ('get_trending_data', country_code, keyword, source, fields_param)
+        rendered = response_cache.get(key, version)
+        if rendered is None:
+            if payload is None:
+                batch = VideoBatch.from_items(video_items)
+                payload = build_trending_payload(country_code, keyword, source, batch=batch, snapshot=snapshot)
+            rendered = response_cache.put(key, render_json(version, project_payload(payload, fields)))
+        return rendered.response(request)
 
     except Exception as e:
         # Handle errors (like an invalid API key or bad country code)
         print(f"An error occurred: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
+
+def render_json(version, payload):
+    """Encode a payload exactly as jsonify would, for caching and compression."""
+    with stage("serialize_json"):
+        response = app.json.response(payload)
+    return RenderedResponse(version, response.get_data(), mimetype=response.mimetype)
     
 
+def sse_event(event, data):
+    """Format one server-sent event. `data` is sent as JSON so newlines survive."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events):
+    """Stream an iterator of SSE strings without buffering (also through nginx)."""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def stream_creator_suggestions(region, max_results, bypass_cache):
+    """SSE version of /get_creator_suggestions: status, then idea text as Gemini writes it."""
+    from creator_suggestions import analyze_trending_topics, stream_ai_ideas_with_gemini
+
+    try:
+        yield sse_event('status', {"stage": "analyzing", "region": region})
+        df, top_keywords, sample_titles, avg_engagement, sentiment = analyze_trending_topics(region, max_results)
+
+        yield sse_event('status', {"stage": "generating", "region": region})
+        parts = []
+        for text in stream_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment,
+                                                bypass_cache=bypass_cache):
+            parts.append(text)
+            yield sse_event('chunk', {"text": text})
+
+        yield sse_event('done', {
+            "success": True,
+            "region": region,
+            "insights": "".join(parts),
+            "video_data": df.to_dict(orient='records')
+        })
+    except Exception as e:
+        print(f"Error streaming creator suggestions: {e}")
+        yield sse_event('error', {"success": False, "error": str(e)})
+
+
 @app.route('/get_creator_suggestions')
 def get_creator_suggestions():
     """
     Runs the advanced clustering and insight generator from creator_suggestions.py
     and returns the results as JSON.
+    With stream=1 the ideas are sent as server-sent events while Gemini writes them.
+    format=columnar (or Accept: application/vnd.trends.columnar+json) sends
+    video_data column by column; format=arrow sends an Arrow IPC stream.
     """
     region = request.args.get('country', 'US')
     max_results = int(request.args.get('max_results', 50))
+    bypass_cache = request.args.get('bypass_cache') == '1' # Force a fresh Gemini call
+
+    if request.args.get('stream') == '1':
+        return sse_response(stream_creator_suggestions(region, max_results, bypass_cache))
 
     try:
-        insights, df = suggest_content(region=region, max_results=max_results)
+        response_format = negotiate_format(request)
+    except FormatError as e:
+        return jsonify({"success": False, "error": str(e)}), 406
 
-        # Convert DataFrame to dictionary for JSON
-        videos_data = df.to_dict(orient='records')
+    from creator_suggestions import suggest_content
 
-        return jsonify({
-            "success": True,
-            "region": region,
-            "insights": insights,
-            "video_data": videos_data
-        })
+    try:
+        insights, df = suggest_content(region=region, max_results=max_results, bypass_cache=bypass_cache)
+
+        # The frame is encoded straight from its columns, never as a list of dicts
+        with stage("serialize_frame"):
+            body, mimetype = encode_frame_payload(
+                {"success": True, "region": region, "insights": insights},
+                "video_data", df, response_format
+            )
+        response = RenderedResponse(None, body, mimetype=mimetype).response(request)
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        return response
 
     except Exception as e:
         print(f"Error generating creator suggestions: {e}")
@@ -539,16 +633,37 @@ def get_creator_suggestions():
 
 
 
+def stream_creator_coach(videos_df, country, genre, bypass_cache):
+    """SSE version of /get_creator_coach: the cleaned report chunk by chunk, then the full text."""
+    from creator_coach_ai import stream_trends_with_gemini
+
+    parts = []
+    try:
+        for text in stream_trends_with_gemini(videos_df, country=country, genre=genre, bypass_cache=bypass_cache):
+            parts.append(text)
+            yield sse_event('chunk', {"text": text})
+    except Exception as e:
+        print(f"Error streaming Creator Coach AI: {e}")
+        yield sse_event('error', {"success": False, "error": f"⚠️ Error analyzing with Gemini: {str(e)}"})
+        return
+
+    yield sse_event('done', {"success": True, "country": country, "genre": genre, "insights": "".join(parts)})
+
+
 @app.route('/get_creator_coach')
 def get_creator_coach():
     """
     Runs the Creator Coach AI analysis for a given country and genre.
     Returns Gemini insights based on trending YouTube data.
+    With stream=1 the report is sent as server-sent events while Gemini writes it.
     """
     country = request.args.get('country', 'US').upper()
     genre = request.args.get('genre', None)
+    bypass_cache = request.args.get('bypass_cache') == '1' # Force a fresh Gemini call
     
     try:
+        from creator_coach_ai import fetch_trending_videos, analyze_trends_with_gemini
+
         # Fetch trending videos (from your Creator Coach module)
         videos_df = fetch_trending_videos(region=country, genre=genre, max_results=20)
         
@@ -559,8 +674,11 @@ def get_creator_coach():
                 "message": f"No trending videos found for {country} (genre: {genre})"
             }), 404
 
+        if request.args.get('stream') == '1':
+            return sse_response(stream_creator_coach(videos_df, country, genre, bypass_cache))
+
         # Run Gemini analysis (cleaned text output)
-        insights = analyze_trends_with_gemini(videos_df, country=country, genre=genre)
+        insights = analyze_trends_with_gemini(videos_df, country=country, genre=genre, bypass_cache=bypass_cache)
 
         # Return insights as JSON
         return jsonify({
@@ -577,9 +695,300 @@ def get_creator_coach():
             "error": str(e)
         }), 500
 
-# --- 4. Main Server Execution ---
+@app.route('/search')
+def search():
+    """
+    Keyword search over every trending video recorded in trends.db.
+    Params: q (terms; a trailing * matches prefixes), op=and|or, prefix=1,
+    countries (comma-separated), days (default 7), limit (default 50).
+    """
+    query = request.args.get('q', '').strip()
+    op = request.args.get('op', 'and').lower()
+    prefix = request.args.get('prefix', '0') == '1'
+    countries = parse_country_list(request.args.get('countries', ''))
+    if not query:
+        return jsonify({"success": False, "error": "Missing 'q' parameter"}), 400
+    if op not in ('and', 'or'):
+        return jsonify({"success": False, "error": "'op' must be 'and' or 'or'"}), 400
+
+    try:
+        days = float(request.args.get('days', 7))
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        start = time.perf_counter()
+        total, results = corpus_index.search(
+            query, op=op, prefix=prefix, regions=countries,
+            since=time.time() - days * 86400 if days > 0 else None, limit=limit
+        )
+        took_ms = (time.perf_counter() - start) * 1000
+        return jsonify({
+            "success": True,
+            "query": query,
+            "op": op,
+            "prefix": prefix,
+            "total_matches": total,
+            "results": results,
+            "took_ms": round(took_ms, 3),
+            "corpus": corpus_index.stats()
+        })
+    except Exception as e:
+        print(f"Search failed: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/keyword_trends')
+def get_keyword_trends():
+    """
+    Top keywords across every chart fetched recently, from the streaming
+    keyword statistics. Params: country (omit for all regions), k (default 15),
+    order=presence|velocity (velocity lists the fastest-rising first).
+    """
+    country = request.args.get('country', '').strip().upper() or None
+    order = request.args.get('order', 'presence').lower()
+    if order not in ('presence', 'velocity'):
+        return jsonify({"success": False, "error": "'order' must be 'presence' or 'velocity'"}), 400
+    k = max(1, min(int(request.args.get('k', 15)), 200))
+
+    return jsonify({
+        "success": True,
+        "region": country or "global",
+        "order": order,
+        "keywords": keyword_trends.top(k, region=country, order=order),
+        "stats": keyword_trends.stats()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Stage latencies, request latencies, quota and token counters in the Prometheus text format."""
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def admin_authorized():
+    return token_matches(request.headers.get('X-Admin-Token') or request.args.get('token'))
+
+
+@app.route('/admin/profiles')
+def list_profiles():
+    """Recently captured request profiles (needs the admin token)."""
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Admin token required"}), 403
+    return jsonify({"success": True, "profiles": profile_store.list()})
+
+
+@app.route('/admin/profiles/<int:profile_id>')
+def get_profile(profile_id):
+    """
+    One profile: collapsed stacks for sampled profiles; a pstats report for
+    cprofile ones, or the raw pstats file with format=raw.
+    """
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Admin token required"}), 403
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"success": False, "error": f"Unknown or expired profile: {profile_id}"}), 404
+    if profile["mode"] != "cprofile":
+        return Response(profile["data"], mimetype='text/plain')
+    if request.args.get('format') == 'raw':
+        return Response(profile["data"], mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=profile-{profile_id}.pstats'
+        })
+    return Response(pstats_text(profile["data"]), mimetype='text/plain')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Reports hit/miss counters for the shared YouTube and Gemini response caches."""
+    return jsonify({
+        "success": True,
+        "youtube": trending_cache.stats(),
+        "youtube_inflight": youtube_inflight.stats(),
+        "gemini": gemini_stats(),
+        "sentiment": sentiment_memo.stats(),
+        "responses": response_cache.stats()
+    })
+
+@app.route('/pool_stats')
+def pool_stats():
+    """Reports size, usage and wait counters for the pooled YouTube and Gemini clients."""
+    return jsonify({
+        "success": True,
+        "youtube_http": youtube_http_pool.stats(),
+        "gemini": gemini_pool_stats(),
+        "transport": transport_stats()
+    })
+
+@app.route('/collector_stats')
+def collector_stats():
+    """Reports what the background collector has prefetched so far."""
+    return jsonify({
+        "success": True,
+        "collector": trending_collector.stats()
+    })
+
+# --- 7. Background Jobs ---
+
+def run_creator_suggestions_job(region, max_results, bypass_cache, progress=None):
+    """Job body for /jobs/creator_suggestions; returns the /get_creator_suggestions payload."""
+    from creator_suggestions import suggest_content
+
+    insights, df = suggest_content(region=region, max_results=max_results, bypass_cache=bypass_cache,
+                                   progress=progress)
+    return {
+        "success": True,
+        "region": region,
+        "insights": insights,
+        "video_data": df.to_dict(orient='records')
+    }
+
+
+@app.route('/jobs/creator_suggestions', methods=['POST'])
+def submit_creator_suggestions_job():
+    """
+    Queues the creator-suggestions pipeline and returns a job id right away (202).
+    Poll /jobs/<id> or subscribe to /jobs/<id>/events for progress and the result.
+    """
+    params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+    region = str(params.get('country', 'US'))
+    max_results = int(params.get('max_results', 50))
+    bypass_cache = str(params.get('bypass_cache')) == '1'
+
+    try:
+        job_id = job_manager.submit(
+            'creator_suggestions', run_creator_suggestions_job, region, max_results, bypass_cache,
+            params={"country": region, "max_results": max_results, "bypass_cache": bypass_cache}
+        )
+    except JobQueueFull as e:
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events"
+    }), 202
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Current state, stage history and (once done) the result of a job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown or expired job: {job_id}"}), 404
+    return jsonify({"success": True, **job})
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with the job's state on every change, ending once it finishes."""
+    if job_manager.get(job_id, include_result=False) is None:
+        return jsonify({"success": False, "error": f"Unknown or expired job: {job_id}"}), 404
+
+    def events():
+        # updates() gives up after 15s without a change; re-sending the current
+        # state then doubles as a keep-alive for slow stages
+        while True:
+            job = None
+            for job in job_manager.updates(job_id, timeout=15):
+                yield sse_event(job['state'] if job['state'] in ('done', 'failed') else 'progress', job)
+            if job is None or job['state'] in ('done', 'failed'):
+                return
+
+    return sse_response(events())
+
+
+@app.route('/job_stats')
+def job_stats():
+    """Reports queue depth and completion counters for the background job pool."""
+    return jsonify({
+        "success": True,
+        "jobs": job_manager.stats()
+    })
+
+# --- 8. Watchlist ---
+
+# Polled on its own schedule and quota share (see watchlist.py)
+watchlist_poller = WatchlistPoller(watchlist_store, youtube_service)
+
+def requested_video_ids():
+    """Video ids from a JSON body's "video_ids" list or a comma-separated ?ids=."""
+    body = request.get_json(silent=True) or {}
+    ids = body.get('video_ids') if isinstance(body, dict) else None
+    if ids is None:
+        ids = request.args.get('ids', '').split(',')
+    if not isinstance(ids, list):
+        return []
+    return list(dict.fromkeys(str(video_id).strip() for video_id in ids if str(video_id).strip()))
+
+
+@app.route('/watchlist', methods=['GET'])
+def get_watchlist():
+    """Tracked videos with their latest counts (params: limit, offset), and the poller's counters."""
+    limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+    offset = max(0, int(request.args.get('offset', 0)))
+    return jsonify({
+        "success": True,
+        "videos": watchlist_store.videos(limit=limit, offset=offset),
+        "poller": watchlist_poller.stats()
+    })
+
+
+@app.route('/watchlist', methods=['POST'])
+def add_to_watchlist():
+    """Starts tracking videos: {"video_ids": [...]} or ?ids=a,b,c. They are picked up on the next poll."""
+    video_ids = requested_video_ids()
+    if not video_ids:
+        return jsonify({"success": False, "error": "Give video ids as 'video_ids' or '?ids='"}), 400
+    invalid = [video_id for video_id in video_ids if not VIDEO_ID.match(video_id)]
+    if invalid:
+        return jsonify({"success": False, "error": "Invalid video ids", "invalid": invalid[:20]}), 400
+    # Re-submitting tracked videos must not count against the limit
+    tracked = watchlist_store.tracked(video_ids)
+    new_ids = [video_id for video_id in video_ids if video_id not in tracked]
+    if watchlist_store.count() + len(new_ids) > WATCHLIST_MAX_VIDEOS:
+        return jsonify({"success": False, "error": f"The watchlist is limited to {WATCHLIST_MAX_VIDEOS} videos"}), 400
+
+    added = watchlist_store.add(new_ids)
+    return jsonify({
+        "success": True,
+        "added": added,
+        "already_tracked": len(video_ids) - added,
+        "tracked": watchlist_store.count()
+    })
+
+
+@app.route('/watchlist/<video_id>', methods=['DELETE'])
+def remove_from_watchlist(video_id):
+    """Stops tracking a video and drops its history."""
+    if not watchlist_store.remove([video_id]):
+        return jsonify({"success": False, "error": f"Not on the watchlist: {video_id}"}), 404
+    return jsonify({"success": True, "removed": video_id})
+
+
+@app.route('/watchlist/velocity')
+def watchlist_velocity():
+    """
+    Views, views per hour and engagement (likes + comments) per hour at each
+    poll over the last `hours` (default 24). Params: ids (comma-separated;
+    omit for the `limit` fastest-growing tracked videos, default 20).
+    """
+    ids = [video_id.strip() for video_id in request.args.get('ids', '').split(',') if video_id.strip()]
+    hours = float(request.args.get('hours', 24))
+    limit = max(1, min(int(request.args.get('limit', 20)), 500))
+    if hours <= 0:
+        return jsonify({"success": False, "error": "'hours' must be positive"}), 400
+
+    series = velocity(watchlist_store, video_ids=ids or None, since=time.time() - hours * 3600, limit=limit)
+    return jsonify({
+        "success": True,
+        "hours": hours,
+        "videos": series
+    })
+
+# --- 9. Main Server Execution ---
 
 
 # This makes the server run when we execute 'python app.py'
+# (the development server; for production see wsgi.py / gunicorn.conf.py, or asgi.py)
 if __name__ == '__main__':
+    # With debug=True the reloader imports this file twice; only the child serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_collector()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+asgi.py
+ASGI variant of the production server, for an event loop that awaits the
+upstream calls instead of parking a thread on each one.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker -c gunicorn.conf.py asgi:app
+
+Every request is served by the Flask app (through a2wsgi, on a pool of
+ASGI_THREADS threads), so routes, request hooks, metrics and profiling are
+the same as under wsgi.py. Two routes first await their upstream calls on
+the event loop, into the shared caches the Flask view then reads:
+
+    /get_trending_data    the YouTube pages of every requested region,
+                          concurrently
+    /get_creator_coach    the YouTube page, then the Gemini report
+                          (not with stream=1 or bypass_cache=1, which the
+                          view has to call itself)
+
+On one core it is slower than wsgi.py (see the numbers there): the event
+loop and the a2wsgi hand-off cost more than the threads they save. It pays
+off when many requests wait on upstream calls at once.
+
+YouTube calls are only truly awaited when httpx is installed, Gemini calls
+only on the SDK's gRPC client (no GEMINI_API_ENDPOINT); otherwise, and while
+TRANSPORT_MODE records or replays, they fall back to a worker thread (see
+youtube_api.py and gemini_api.py). Startup preloads like wsgi.create_app();
+the lifespan shutdown runs wsgi.shutdown().
+"""
+
+import asyncio
+import os
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from dotenv import load_dotenv
+
+import wsgi
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 16))
+
+
+# -----------------------
+# 2. Awaited prefetches
+# -----------------------
+async def prefetch_trending(args):
+    """Await the trending pages /get_trending_data is about to read, every region at once."""
+    from app import MAX_REGIONS, parse_country_list, youtube_service
+    from snapshot_store import TRENDING_CHART_SIZE
+    from youtube_api import most_popular_async
+
+    if args.get('source') == 'store':
+        return
+    countries = parse_country_list(args.get('country', 'US'))[:MAX_REGIONS]
+    # Failures are left for the view to hit (and report) itself
+    await asyncio.gather(*(most_popular_async(youtube_service, region=country, limit=TRENDING_CHART_SIZE,
+                                              part="snippet,statistics")
+                           for country in countries), return_exceptions=True)
+
+
+async def prefetch_creator_coach(args):
+    """Await the chart page and Gemini report /get_creator_coach is about to read (same arguments as the view)."""
+    from creator_coach_ai import analyze_trends_with_gemini_async, fetch_trending_videos_async
+
+    if args.get('stream') == '1' or args.get('bypass_cache') == '1':
+        return
+    country = args.get('country', 'US').upper()
+    genre = args.get('genre', None)
+    try:
+        videos_df = await fetch_trending_videos_async(region=country, genre=genre, max_results=20)
+        if not videos_df.empty:
+            await analyze_trends_with_gemini_async(videos_df, country=country, genre=genre)
+    except Exception:
+        pass  # left for the view to hit (and report) itself
+
+
+PREFETCH = {
+    "/get_trending_data": prefetch_trending,
+    "/get_creator_coach": prefetch_creator_coach,
+}
+
+
+# -----------------------
+# 3. The ASGI app
+# -----------------------
+class AsgiApp:
+    def __init__(self, wsgi_app):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=ASGI_THREADS)
+
+    async def lifespan(self, receive, send):
+        from youtube_api import close_async_client
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await asyncio.to_thread(wsgi.start_collector_once)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.to_thread(wsgi.shutdown)
+                await close_async_client()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        prefetch = PREFETCH.get(scope["path"]) if scope["method"] == "GET" else None
+        if prefetch is not None:
+            args = {}
+            for name, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True):
+                args.setdefault(name, value)  # first value wins, as with request.args.get()
+            await prefetch(args)
+        await self.wsgi(scope, receive, send)
+
+
+def create_asgi_app(preload_models=wsgi.PRELOAD):
+    return AsgiApp(wsgi.create_app(preload_models))
+
+
+app = create_asgi_app()
@@ -0,0 +1,36 @@
+"""
+_common.py
+Setup shared by the benchmark scripts. Imported first, it puts the repo
+(and benchmarks/) on sys.path and gives the process dummy API keys and
+scratch databases, so a benchmark never touches ./trends.db or ./cache.db.
+Settings already in the environment win.
+
+    import _common  # noqa: F401
+"""
+
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+for _path in (BENCH_DIR, ROOT):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+def scratch_env(scratch):
+    """Dummy API keys and databases under `scratch`, for a process that imports the app."""
+    return {
+        "YOUTUBE_API_KEY": os.environ.get("YOUTUBE_API_KEY", "benchmark"),
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"),
+        "TRENDS_DB_PATH": os.path.join(scratch, "trends.db"),
+        "CACHE_DB_PATH": os.path.join(scratch, "cache.db"),
+    }
+
+
+# Removed at interpreter exit
+SCRATCH = tempfile.TemporaryDirectory(prefix="bench_")
+for _name, _value in scratch_env(SCRATCH.name).items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,152 @@
+"""
+bench_analytics.py
+Scaling benchmark for the vectorized analyzers in app.py
+(analyze_upload_vs_popularity, analyze_upload_times and the category
+averaging in generate_upload_recommendations) from 10^2 to 10^6 rows.
+
+Each size is also run through the previous row-by-row implementations to
+check the vectorized output (points, hours and per-category view totals)
+is identical.
+
+Usage:
+    python benchmarks/bench_analytics.py [--max-exp 6] [--no-reference]
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+import app
+from video_batch import VideoBatch, engagement_rates_vectorized
+
+
+# -----------------------
+# 1. Synthetic data
+# -----------------------
+def synthetic_batch(n, seed=42):
+    """Build a VideoBatch of n rows directly from arrays (no JSON parsing)."""
+    rng = np.random.default_rng(seed)
+    views = rng.integers(0, 50_000_000, n)
+    likes = rng.integers(0, 500_000, n)
+    comments = rng.integers(0, 50_000, n)
+    now = int(time.time())
+    published_at = now - rng.integers(0, 400 * 86400, n)
+    published_valid = rng.random(n) > 0.02
+    categories = ["1", "10", "17", "20", "22", "24", "25", "28"]
+    category_codes = rng.integers(-1, len(categories), n).astype(np.int32)
+    ids = [f"vid{i:07d}" for i in range(n)]
+    titles = [f"Synthetic trending video {i}" for i in range(n)]
+    empty = [""] * n
+    return VideoBatch(
+        ids, titles, empty, empty, empty, [[]] * n,
+        views, likes, comments, engagement_rates_vectorized(views, likes, comments),
+        published_at, published_valid, category_codes, categories
+    )
+
+
+# -----------------------
+# 2. Row-by-row reference implementations
+# -----------------------
+def reference_upload_vs_popularity(batch, now_seconds):
+    data_points = []
+    for i in np.flatnonzero(batch.published_valid):
+        days = (now_seconds - int(batch.published_at[i])) // 86400
+        if days >= 0:
+            title = batch.titles[i]
+            data_points.append({
+                "x": days,
+                "y": int(batch.views[i]),
+                "engagement_rate": float(batch.engagement_rates[i]),
+                "title": title if title is not None else 'Unknown Video',
+                "video_id": batch.ids[i]
+            })
+    for point in data_points:
+        point["r"] = 8
+    return data_points
+
+
+def reference_upload_times(batch):
+    hour_data = defaultdict(lambda: {"total_views": 0, "count": 0, "total_engagement": 0.0})
+    for i in np.flatnonzero(batch.published_valid):
+        hour = int(batch.published_at[i]) % 86400 // 3600
+        hour_data[hour]["total_views"] += int(batch.views[i])
+        hour_data[hour]["count"] += 1
+        hour_data[hour]["total_engagement"] += float(batch.engagement_rates[i])
+    out = []
+    for hour in range(24):
+        if hour in hour_data:
+            avg_views = hour_data[hour]["total_views"] / hour_data[hour]["count"]
+            avg_engagement = hour_data[hour]["total_engagement"] / hour_data[hour]["count"]
+            count = hour_data[hour]["count"]
+        else:
+            avg_views, avg_engagement, count = 0, 0, 0
+        out.append({
+            "hour": hour,
+            "hour_label": f"{hour % 12 if hour % 12 != 0 else 12}{'AM' if hour < 12 else 'PM'}",
+            "average_views": round(avg_views, 0),
+            "average_engagement": round(avg_engagement, 2),
+            "video_count": count
+        })
+    return out
+
+
+def reference_category_views(batch):
+    category_views = {}
+    for i in range(len(batch)):
+        category_id = batch.category_id(i)
+        if category_id:
+            entry = category_views.setdefault(category_id, {"total_views": 0, "count": 0})
+            entry["total_views"] += int(batch.views[i])
+            entry["count"] += 1
+    return category_views
+
+
+# -----------------------
+# 3. Runner
+# -----------------------
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-exp", type=int, default=6, help="largest size as a power of ten")
+    parser.add_argument("--no-reference", action="store_true", help="skip the row-by-row comparison")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} | {'vs_popularity ms':>16} | {'upload_times ms':>15} | {'recommend ms':>12} | {'ref total ms':>12} | identical")
+    print("-" * 90)
+    for exp in range(2, args.max_exp + 1):
+        n = 10 ** exp
+        batch = synthetic_batch(n)
+        category_analysis = app.analyze_categories(batch)
+
+        now_seconds = int(time.time())
+        points, t_points = timed(app.analyze_upload_vs_popularity, batch, now_seconds)
+        hours, t_hours = timed(app.analyze_upload_times, batch)
+        _, t_recs = timed(app.generate_upload_recommendations, batch, hours, category_analysis)
+
+        if args.no_reference:
+            print(f"{n:>9} | {t_points:>16.2f} | {t_hours:>15.2f} | {t_recs:>12.2f} | {'-':>12} | -")
+            continue
+
+        ref_points, r1 = timed(reference_upload_vs_popularity, batch, now_seconds)
+        ref_hours, r2 = timed(reference_upload_times, batch)
+        ref_categories, r3 = timed(reference_category_views, batch)
+        identical = (
+            json.dumps(points, sort_keys=True) == json.dumps(ref_points, sort_keys=True)
+            and json.dumps(hours, sort_keys=True) == json.dumps(ref_hours, sort_keys=True)
+            and app.category_view_totals(batch) == ref_categories
+        )
+        print(f"{n:>9} | {t_points:>16.2f} | {t_hours:>15.2f} | {t_recs:>12.2f} | {r1 + r2 + r3:>12.2f} | {identical}")
+
+
+if __name__ == "__main__":
+    main()
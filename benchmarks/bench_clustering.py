@@ -0,0 +1,115 @@
+"""
+bench_clustering.py
+Compares the full TF-IDF + KMeans(n_init=10) refit in
+creator_suggestions.cluster_titles with the incremental, warm-started
+clusterer in topic_clusters.py over a sequence of chart refreshes.
+
+Each refresh replaces a fraction (--churn) of the chart with new titles, the
+way consecutive trending snapshots overlap. Reported per chart size:
+mean time per refresh and label stability, i.e. the share of titles kept
+from the previous refresh that stay in the same cluster id.
+
+Usage:
+    python benchmarks/bench_clustering.py [--sizes 200,1000,5000] [--refreshes 10] [--churn 0.1]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from creator_suggestions import cluster_titles, preprocess_text
+from stub_server import synthetic_items
+from topic_clusters import IncrementalTopicClusterer
+
+
+def title_stream(seed=7):
+    """Endless supply of synthetic trending titles."""
+    n = 0
+    while True:
+        for item in synthetic_items("BENCH", 1000, seed=seed + n):
+            yield item["snippet"]["title"]
+        n += 1
+
+
+def refreshes(size, count, churn, seed=7):
+    """Yield `count` charts of `size` titles, each replacing `churn` of the previous one."""
+    rng = random.Random(seed)
+    titles = title_stream(seed)
+    chart = [next(titles) for _ in range(size)]
+    for _ in range(count):
+        yield list(chart)
+        for position in rng.sample(range(size), int(size * churn)):
+            chart[position] = next(titles)
+
+
+def stability(previous, current):
+    """Share of titles in both charts whose cluster id did not change."""
+    if previous is None:
+        return None
+    kept = [title for title in current if title in previous]
+    if not kept:
+        return None
+    return float(np.mean([previous[title] == current[title] for title in kept]))
+
+
+def run(size, count, churn):
+    clusterer = IncrementalTopicClusterer()
+    full_times, incremental_times = [], []
+    full_stable, incremental_stable = [], []
+    prev_full = prev_incremental = None
+
+    for chart in refreshes(size, count, churn):
+        df = pd.DataFrame({"title": chart})
+        start = time.perf_counter()
+        df, _ = cluster_titles(df, num_clusters=5)
+        full_times.append(time.perf_counter() - start)
+        labels_full = dict(zip(chart, df["cluster"]))
+
+        clean = [preprocess_text(title) for title in chart]
+        start = time.perf_counter()
+        labels, _ = clusterer.fit_predict("BENCH", clean, 5)
+        incremental_times.append(time.perf_counter() - start)
+        labels_incremental = dict(zip(chart, labels))
+
+        for stable, prev, labels_now in ((full_stable, prev_full, labels_full),
+                                         (incremental_stable, prev_incremental, labels_incremental)):
+            value = stability(prev, labels_now)
+            if value is not None:
+                stable.append(value)
+        prev_full, prev_incremental = labels_full, labels_incremental
+
+    # The first incremental call is a cold start; report it apart from the warm refreshes
+    return {
+        "full_ms": np.mean(full_times) * 1000,
+        "cold_ms": incremental_times[0] * 1000,
+        "warm_ms": np.mean(incremental_times[1:]) * 1000 if count > 1 else float("nan"),
+        "full_stable": np.mean(full_stable) if full_stable else float("nan"),
+        "incremental_stable": np.mean(incremental_stable) if incremental_stable else float("nan"),
+        "trained": clusterer.stats()["titles_trained"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="200,1000,5000", help="comma-separated chart sizes")
+    parser.add_argument("--refreshes", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.1, help="share of titles replaced per refresh")
+    args = parser.parse_args()
+
+    print(f"{'titles':>7} | {'full refit ms':>13} | {'incr cold ms':>12} | {'incr warm ms':>12} | "
+          f"{'speedup':>7} | {'full stable':>11} | {'incr stable':>11} | trained")
+    print("-" * 100)
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = run(size, args.refreshes, args.churn)
+        print(f"{size:>7} | {r['full_ms']:>13.1f} | {r['cold_ms']:>12.1f} | {r['warm_ms']:>12.1f} | "
+              f"{r['full_ms'] / r['warm_ms']:>6.1f}x | {r['full_stable']:>11.1%} | {r['incremental_stable']:>11.1%} | "
+              f"{r['trained']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+bench_keywords.py
+Accuracy and cost of the streaming keyword statistics (keyword_trends.py).
+
+Feeds a synthetic multi-region, multi-day stream of chart snapshots (titles
+over a Zipf vocabulary of --vocabulary words) into KeywordTrends, next to an
+exact, unbounded decayed count of every keyword. One keyword is planted in a
+growing share of titles over the last few hours, as a rising trend.
+
+Reported: time per snapshot, keywords tracked vs distinct keywords seen
+(memory stays fixed), global and per-region top-k recall against the exact
+counts, the largest presence error among the top-k, and where the planted
+keyword ranks by velocity.
+
+Usage:
+    python benchmarks/bench_keywords.py [--regions 10] [--days 7] [--per-hour 12] [--k 15]
+"""
+
+import argparse
+import math
+import random
+import time
+from collections import Counter, defaultdict
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from keyword_trends import KeywordTrends, title_keywords
+
+REGIONS = ["US", "IN", "GB", "JP", "BR", "DE", "FR", "KR", "MX", "CA", "AU", "ES", "IT", "ID", "RU", "NL"]
+RISING = "zephyrquake"
+
+
+def vocabulary(size, seed=3):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+class ExactDecayed:
+    """Unbounded reference: every keyword's decayed presence, the same weighting as KeywordTrends."""
+
+    def __init__(self, half_life, start):
+        self.rate = math.log(2) / half_life
+        self.start = start
+        self.counts = defaultdict(float)  # scaled by exp(rate * (t - start))
+        self.coverage = 0.0
+
+    def add(self, weights, t, span):
+        scale = math.exp(self.rate * (t - self.start))
+        self.coverage += span * scale
+        for key, weight in weights.items():
+            self.counts[key] += weight * scale
+
+    def top(self, k):
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [(key, value / self.coverage) for key, value in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--per-hour", type=int, default=12, help="snapshots per region per hour")
+    parser.add_argument("--chart", type=int, default=50, help="titles per snapshot")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--k", type=int, default=15)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    words = vocabulary(args.vocabulary)
+    regions = REGIONS[:args.regions]
+    trends = KeywordTrends()
+    step = 3600 / args.per_hour
+    rounds = int(args.days * 24 * args.per_hour)
+    end = time.time()
+    exact_global = ExactDecayed(trends.half_life, end - rounds * step)
+    exact_regions = {region: ExactDecayed(trends.half_life, end - rounds * step) for region in regions}
+    previous = {}
+    distinct = set()
+    rising_from = rounds - 6 * args.per_hour  # the last six hours
+    feed_seconds = 0.0
+
+    for r in range(rounds):
+        t = end - (rounds - r) * step
+        # Regional flavour: each region favours its own slice of the vocabulary
+        for n, region in enumerate(regions):
+            titles = []
+            for _ in range(args.chart):
+                title = [words[(int(len(words) ** rng.random()) - 1 + n * 37) % len(words)]
+                         for _ in range(rng.randint(3, 8))]
+                if r >= rising_from and rng.random() < 0.2 * (r - rising_from) / (rounds - rising_from):
+                    title.append(RISING)
+                titles.append(" ".join(title).title())
+
+            start = time.perf_counter()
+            trends.observe_titles(region, titles, t)
+            feed_seconds += time.perf_counter() - start
+
+            mentions = Counter()
+            for title in titles:
+                mentions.update(title_keywords(title))
+            distinct.update(mentions)
+            gap = 300 if region not in previous else min(t - previous[region], 3600)
+            previous[region] = t
+            weights = {word: count * 100 * gap / len(titles) for word, count in mentions.items()}
+            exact_global.add(weights, t, gap)
+            exact_regions[region].add(weights, t, gap)
+
+    snapshots = rounds * len(regions)
+    stats = trends.stats()
+    print(f"{snapshots} snapshots ({len(regions)} regions x {args.days:g} days x {args.per_hour}/hour), "
+          f"{snapshots * args.chart} titles")
+    print(f"feed: {feed_seconds / snapshots * 1e6:.0f} us per snapshot")
+    print(f"tracked: {stats['tracked_global']} global + {stats['tracked_regional']} regional counters "
+          f"for {len(distinct)} distinct keywords\n")
+
+    def compare(label, region, exact):
+        estimated = trends.top(args.k, region=region)
+        truth = exact.top(args.k)
+        truth_values = dict(exact.top(len(exact.counts)))
+        recall = len({row["keyword"] for row in estimated} & {key for key, _ in truth}) / args.k
+        worst = max(abs(row["presence"] - truth_values[row["keyword"]]) / truth_values[row["keyword"]]
+                    for row in estimated)
+        print(f"{label:>8} | {recall:>9.0%} | {worst:>13.2%}")
+
+    print(f"{'top-' + str(args.k):>8} | {'recall':>9} | {'max rel error':>13}")
+    print("-" * 37)
+    compare("global", None, exact_global)
+    for region in regions[:3]:
+        compare(region, region, exact_regions[region])
+
+    def rank(order):
+        ranked = [row["keyword"] for row in trends.top(stats["tracked_global"], order=order)]
+        return ranked.index(RISING) + 1 if RISING in ranked else None
+
+    print(f"\nplanted rising keyword: rank {rank('velocity')} by velocity, {rank('presence')} by presence")
+
+
+if __name__ == "__main__":
+    main()
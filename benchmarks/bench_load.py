@@ -0,0 +1,206 @@
+"""
+bench_load.py
+End-to-end load test of the three analytics endpoints against the local
+stub YouTube + Gemini server (stub_server.py), with no API keys needed.
+
+The app is served in-process by werkzeug's threaded server (as `python
+app.py` does) with YOUTUBE_API_ROOT and GEMINI_API_ENDPOINT pointing at the
+stub. --concurrency client threads, each on its own keep-alive connection,
+send a round-robin mix of
+
+    /get_trending_data?country=R
+    /get_creator_suggestions?country=R
+    /get_creator_coach?country=R
+
+over --regions regions for --duration seconds, after one warm-up request
+per endpoint and region. Reported per endpoint and overall: requests,
+errors, p50/p95/p99 latency and throughput, then the mean time per call of
+each pipeline stage as the app's /metrics endpoint recorded it. With
+--bypass-cache every creator request makes a fresh (stub) Gemini call;
+--profile-rate profiles that fraction of requests (profiler.py), to see
+what sampling costs under load. Run with TRANSPORT_MODE=record to capture
+the traffic for bench_replay.py.
+
+--url load-tests a server started separately instead (gunicorn, uvicorn;
+see wsgi.py and asgi.py), configured against a standalone stub:
+
+    python benchmarks/stub_server.py --port 8765 --latency-ms 50 --gemini-latency-ms 500 &
+    YOUTUBE_API_ROOT=http://127.0.0.1:8765/ GEMINI_API_ENDPOINT=http://127.0.0.1:8765 \
+        gunicorn -c gunicorn.conf.py "wsgi:create_app()" &
+    python benchmarks/bench_load.py --url http://127.0.0.1:8000
+
+Usage:
+    python benchmarks/bench_load.py [--concurrency 8] [--duration 20] [--regions 4]
+                                    [--latency-ms 50] [--gemini-latency-ms 500] [--bypass-cache]
+                                    [--profile-rate 0.1] [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import contextlib
+import http.client
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import _common
+
+from stub_server import start_stub_server
+
+REGIONS = ["US", "IN", "GB", "JP", "BR", "DE", "FR", "KR", "MX", "CA", "AU", "ES", "IT", "ID", "RU", "NL"]
+ENDPOINTS = ["/get_trending_data", "/get_creator_suggestions", "/get_creator_coach"]
+
+
+def start_app(stub_root, profile_rate=0):
+    """Import the app configured against the stub and serve it on a background thread. Returns its port."""
+    return serve_app({
+        "PROFILE_SAMPLE_RATE": str(profile_rate),
+        "YOUTUBE_API_ROOT": stub_root,
+        "GEMINI_API_ENDPOINT": stub_root.rstrip("/"),
+    })
+
+
+def serve_app(env):
+    """Import the app with `env` (plus dummy keys and scratch databases) and serve it. Returns its port."""
+    os.environ.update({**_common.scratch_env(tempfile.mkdtemp(prefix="bench_load_")), **env})
+    from werkzeug.serving import make_server
+
+    import app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="app-server", daemon=True).start()
+    return server.server_port
+
+
+class Client:
+    """One keep-alive connection to the app."""
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.host = host
+        self.port = port
+        self.conn = http.client.HTTPConnection(host, port, timeout=300)
+
+    def get(self, path):
+        """Returns (status, seconds); reconnects once if the server closed the connection."""
+        for attempt in range(2):
+            start = time.perf_counter()
+            try:
+                self.conn.request("GET", path)
+                response = self.conn.getresponse()
+                response.read()
+                return response.status, time.perf_counter() - start
+            except (http.client.HTTPException, ConnectionError):
+                self.conn.close()
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=300)
+                if attempt:
+                    raise
+
+
+def run_load(port, paths, concurrency, duration, host="127.0.0.1"):
+    """`concurrency` clients cycling through `paths` for `duration` seconds. Returns (latencies, errors, elapsed)."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        client = Client(port, host)
+        n = offset
+        while time.perf_counter() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            endpoint = path.split("?")[0]
+            status, seconds = client.get(path)
+            with lock:
+                latencies[endpoint].append(seconds)
+                if status >= 400:
+                    errors[endpoint] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def stage_totals(client):
+    """{stage: (count, seconds)} from the app's /metrics."""
+    client.conn.request("GET", "/metrics")
+    text = client.conn.getresponse().read().decode()
+    totals = defaultdict(lambda: [0, 0.0])
+    for match in re.finditer(r'^stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', text, re.M):
+        kind, name, value = match.groups()
+        totals[name][kind == "sum"] += float(value) if kind == "sum" else int(value)
+    return {name: tuple(values) for name, values in totals.items() if values[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub YouTube latency")
+    parser.add_argument("--gemini-latency-ms", type=float, default=500, help="stub Gemini latency")
+    parser.add_argument("--bypass-cache", action="store_true", help="force a Gemini call on every creator request")
+    parser.add_argument("--profile-rate", type=float, default=0, help="fraction of requests to profile")
+    parser.add_argument("--url", help="load-test this running server instead of an in-process one")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    if args.url:
+        stub = None
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        stub, stub_root = start_stub_server(latency_ms=args.latency_ms, gemini_latency_ms=args.gemini_latency_ms)
+        host, port = "127.0.0.1", start_app(stub_root, args.profile_rate)
+    suffix = "&bypass_cache=1" if args.bypass_cache else ""
+    paths = [f"{endpoint}?country={region}" + (suffix if endpoint != ENDPOINTS[0] else "")
+             for region in REGIONS[:args.regions] for endpoint in args.endpoints.split(",")]
+
+    # The creator pipelines print progress on every request; keep the report readable
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        warmup = Client(port, host)
+        warmups = [(path, *warmup.get(path)) for path in paths]
+        latencies, errors, elapsed = run_load(port, paths, args.concurrency, args.duration, host)
+
+    for path, status, seconds in warmups:
+        print(f"warm-up {path}: {status} in {seconds * 1000:.0f} ms")
+    target = args.url or f"stub latency YouTube {args.latency_ms:g} ms / Gemini {args.gemini_latency_ms:g} ms"
+    print(f"\n{args.concurrency} clients x {args.duration:g} s, {args.regions} regions, {target}"
+          f"{', bypass_cache' if args.bypass_cache else ''}"
+          f"{f', profiling {args.profile_rate:.0%} of requests' if args.profile_rate else ''}\n")
+    print(f"{'endpoint':>24} | {'requests':>8} | {'errors':>6} | {'p50 ms':>8} | {'p95 ms':>8} | "
+          f"{'p99 ms':>8} | {'req/s':>7}")
+    print("-" * 88)
+    rows = [(endpoint, latencies[endpoint]) for endpoint in args.endpoints.split(",")]
+    rows.append(("all", [s for samples in latencies.values() for s in samples]))
+    for endpoint, samples in rows:
+        if not samples:
+            continue
+        p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+        failed = sum(errors.values()) if endpoint == "all" else errors[endpoint]
+        print(f"{endpoint:>24} | {len(samples):>8} | {failed:>6} | {p50:>8.1f} | {p95:>8.1f} | "
+              f"{p99:>8.1f} | {len(samples) / elapsed:>7.1f}")
+    if stub is not None:
+        print(f"\nstub requests: {dict(sorted(stub.request_counts.items()))}")
+
+    # With several workers this is the one that answered the /metrics request
+    print(f"\n{'stage':>32} | {'calls':>7} | {'mean ms':>9}")
+    print("-" * 54)
+    for name, (count, total) in sorted(stage_totals(Client(port, host)).items(), key=lambda kv: -kv[1][1]):
+        print(f"{name:>32} | {count:>7} | {total / count * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+bench_micro.py
+Micro-benchmarks for the per-request analysis stages, from 10^2 to 10^6
+videos, with no network access (no API keys needed).
+
+    analyze_categories    app.py, category counts over a VideoBatch
+    analyze_keywords      app.py, top title keywords
+    analyze_upload_times  app.py, per-hour upload stats
+    cluster_titles        creator_suggestions.py, TF-IDF + KMeans (full refit)
+    add_sentiment         creator_suggestions.py, title polarity (cold memo: every title is new)
+    clean_gemini_output   creator_coach_ai.py, on n lines of markdown Gemini output
+
+Titles mix the stub server's word list with a Zipf-distributed pseudo-word
+vocabulary, like real trending titles. Each stage runs at sizes 10^2,
+10^3, ... up to 10^--max-exp; once a single run takes longer than
+--budget seconds the larger sizes of that stage are skipped.
+
+Usage:
+    python benchmarks/bench_micro.py [--max-exp 6] [--budget 30] [--only cluster_titles,add_sentiment]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+import app
+from creator_coach_ai import clean_gemini_output
+from creator_suggestions import add_sentiment, cluster_titles
+from stub_server import WORDS, gemini_text
+from video_batch import VideoBatch, engagement_rates_vectorized
+
+
+# -----------------------
+# 1. Synthetic data
+# -----------------------
+def vocabulary(size, seed=3):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def synthetic_titles(n, seed=7):
+    """n distinct titles: a few stub words, a few Zipf pseudo-words (rank r with probability ~1/r)."""
+    rng = random.Random(seed)
+    words = vocabulary(20_000)
+    titles = []
+    for i in range(n):
+        title = [rng.choice(WORDS) for _ in range(rng.randint(2, 4))]
+        title += [words[int(len(words) ** rng.random()) - 1] for _ in range(rng.randint(1, 4))]
+        titles.append(" ".join(title).title() + f" {seed}-{i}")
+    return titles
+
+
+def synthetic_batch(titles, seed=42):
+    """A VideoBatch over `titles`, built directly from arrays (no JSON parsing)."""
+    n = len(titles)
+    rng = np.random.default_rng(seed)
+    views = rng.integers(1_000, 50_000_000, n)
+    likes = rng.integers(10, 500_000, n)
+    comments = rng.integers(0, 50_000, n)
+    categories = ["1", "10", "17", "20", "22", "24", "25", "28"]
+    empty = [""] * n
+    return VideoBatch(
+        [f"vid{i:07d}" for i in range(n)], titles, empty, empty, empty, [[]] * n,
+        views, likes, comments, engagement_rates_vectorized(views, likes, comments),
+        int(time.time()) - rng.integers(0, 60 * 86400, n), rng.random(n) > 0.02,
+        rng.integers(0, len(categories), n).astype(np.int32), categories
+    )
+
+
+def gemini_output(lines):
+    """`lines` lines of markdown-flavoured model output."""
+    block = gemini_text("bench_micro", ideas=25).splitlines(keepends=True)
+    return "".join(block[i % len(block)] for i in range(lines))
+
+
+# -----------------------
+# 2. Stages
+# -----------------------
+def stages():
+    """name -> (setup(n, titles) -> input, run(input))"""
+    return {
+        "analyze_categories": (lambda n, titles: synthetic_batch(titles), app.analyze_categories),
+        "analyze_keywords": (lambda n, titles: synthetic_batch(titles), app.analyze_keywords),
+        "analyze_upload_times": (lambda n, titles: synthetic_batch(titles), app.analyze_upload_times),
+        "cluster_titles": (lambda n, titles: pd.DataFrame({"title": titles}), cluster_titles),
+        "add_sentiment": (lambda n, titles: pd.DataFrame({"title": titles}), add_sentiment),
+        "clean_gemini_output": (lambda n, titles: gemini_output(n), clean_gemini_output),
+    }
+
+
+def measure(setup, run, n, titles, repeat):
+    """Median seconds over up to `repeat` runs (fewer if a run is slow), each on fresh input."""
+    samples = []
+    while len(samples) < repeat:
+        data = setup(n, titles)
+        start = time.perf_counter()
+        run(data)
+        samples.append(time.perf_counter() - start)
+        if sum(samples) > 2:
+            break
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-exp", type=int, default=6)
+    parser.add_argument("--budget", type=float, default=30, help="skip larger sizes after a run this slow (s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated stage names")
+    args = parser.parse_args()
+
+    selected = {name: stage for name, stage in stages().items()
+                if not args.only or name in args.only.split(",")}
+    sizes = [10 ** e for e in range(2, args.max_exp + 1)]
+    print(f"{'stage':>20} | {'n':>9} | {'ms':>10} | {'us / item':>9}")
+    print("-" * 58)
+    for name, (setup, run) in selected.items():
+        for n in sizes:
+            # add_sentiment must see titles it hasn't scored yet, so each size gets its own
+            titles = synthetic_titles(n, seed=n)
+            seconds = measure(setup, run, n, titles, args.repeat if name != "add_sentiment" else 1)
+            print(f"{name:>20} | {n:>9,} | {seconds * 1000:>10.2f} | {seconds / n * 1e6:>9.2f}", flush=True)
+            if seconds > args.budget and n != sizes[-1]:
+                print(f"{name:>20} | {'larger sizes skipped (over --budget)':>33}")
+                break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+bench_replay.py
+Replays recorded traffic against the current build with no network access.
+
+Record first, on production or against the stub, by running the app with
+TRANSPORT_MODE=record (see transport.py):
+
+    TRANSPORT_MODE=record TRANSPORT_LOG=day.jsonl python app.py
+    TRANSPORT_MODE=record TRANSPORT_LOG=day.jsonl python benchmarks/bench_load.py
+
+This serves the app in-process with TRANSPORT_MODE=replay, so every
+YouTube and Gemini call is answered from the log after its recorded
+latency times --latency-scale. The recorded inbound requests for
+--endpoints are then re-sent by --concurrency keep-alive clients, either
+as fast as they go (--speed 0) or at the recorded pace sped up --speed
+times. Reported per endpoint: requests, status codes that differ from the
+recording, and p50/p95/p99 latency now vs as recorded; then how the
+upstream calls were matched.
+
+Usage:
+    python benchmarks/bench_replay.py [--log transport_log.jsonl] [--latency-scale 1]
+                                      [--speed 0] [--concurrency 8]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from bench_load import Client, serve_app
+
+ENDPOINTS = ["/get_trending_data", "/get_creator_suggestions", "/get_creator_coach"]
+
+
+def recorded_requests(path, endpoints):
+    """The log's inbound GET requests for `endpoints`, oldest first."""
+    # Read directly: importing transport.py here would fix TRANSPORT_MODE before serve_app() sets it
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line) if line.strip() else {}
+            if (entry.get("kind") == "inbound" and entry["method"] == "GET"
+                    and entry["path"].split("?")[0] in endpoints):
+                requests.append(entry)
+    return sorted(requests, key=lambda entry: entry["t"])
+
+
+def replay(port, requests, concurrency, speed):
+    """Send `requests` (paced by `speed`, 0 = no pacing). Returns ([(entry, status, seconds)], elapsed)."""
+    pending = queue.Queue()
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        client = Client(port)
+        while True:
+            entry = pending.get()
+            if entry is None:
+                return
+            status, seconds = client.get(entry["path"])
+            with lock:
+                results.append((entry, status, seconds))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    first = requests[0]["t"] if requests else 0
+    for entry in requests:
+        if speed > 0:
+            delay = (entry["t"] - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        pending.put(entry)
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=os.getenv("TRANSPORT_LOG", "transport_log.jsonl"))
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="times the recorded upstream latency")
+    parser.add_argument("--speed", type=float, default=0, help="recorded pace x speed (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    endpoints = args.endpoints.split(",")
+    requests = recorded_requests(args.log, endpoints)
+    if not requests:
+        sys.exit(f"No inbound requests for {args.endpoints} in {args.log}")
+
+    port = serve_app({
+        "TRANSPORT_MODE": "replay",
+        "TRANSPORT_LOG": os.path.abspath(args.log),
+        "TRANSPORT_LATENCY_SCALE": str(args.latency_scale),
+    })
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        results, elapsed = replay(port, requests, args.concurrency, args.speed)
+
+    print(f"{len(requests)} recorded requests from {args.log}, {args.concurrency} clients, "
+          f"upstream latency x{args.latency_scale:g}, "
+          f"{f'pace x{args.speed:g}' if args.speed else 'unpaced'}: {elapsed:.1f} s\n")
+    print(f"{'endpoint':>24} | {'requests':>8} | {'changed':>7} | {'p50 ms':>15} | {'p95 ms':>15} | "
+          f"{'p99 ms':>15} | {'req/s':>7}")
+    print(f"{'':>24} | {'':>8} | {'status':>7} | {'now / recorded':>15} | {'now / recorded':>15} | "
+          f"{'now / recorded':>15} |")
+    print("-" * 108)
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result[0]["path"].split("?")[0]].append(result)
+    rows = [(endpoint, by_endpoint[endpoint]) for endpoint in endpoints] + [("all", results)]
+    for endpoint, rows_for in rows:
+        if not rows_for:
+            continue
+        now = np.percentile([seconds * 1000 for _, _, seconds in rows_for], [50, 95, 99])
+        recorded = np.percentile([entry["latency"] * 1000 for entry, _, _ in rows_for], [50, 95, 99])
+        changed = sum(status != entry["status"] for entry, status, _ in rows_for)
+        cells = " | ".join(f"{a:>6.1f} / {b:>6.1f}" for a, b in zip(now, recorded))
+        print(f"{endpoint:>24} | {len(rows_for):>8} | {changed:>7} | {cells} | {len(rows_for) / elapsed:>7.1f}")
+
+    from transport import transport_stats
+    stats = transport_stats()
+    print(f"\nupstream calls: {stats['exact']} matched exactly, {stats['fallback']} by model only "
+          f"(Gemini prompt changed), {stats['repeated']} repeated, {stats['misses']} missing "
+          f"({stats['recorded_calls']} recorded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+bench_search.py
+Keyword query latency for the inverted indexes in search_index.py.
+
+Chart filter: the dashboard's `keyword in title/description` filter over one
+chart, as a linear scan vs SnapshotIndex.rows_containing (results must be
+identical).
+
+Corpus search: a synthetic multi-region, multi-day trends.db (each region's
+chart keeps most of its videos between snapshots). Reports the initial
+CorpusIndex build, an incremental refresh after one more round of
+snapshots, and per-query latency for AND / OR / prefix / filtered queries,
+cold (term matches recomputed) and repeated (matches memoized until the
+next refresh). The stub's own word list appears in most titles, so terms
+like "music" are a worst case; the appended Zipf words behave like real
+title vocabulary.
+
+Usage:
+    python benchmarks/bench_search.py [--regions 10] [--days 14] [--per-day 4] [--chart 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from search_index import CorpusIndex, SnapshotIndex
+from snapshot_store import SnapshotStore
+from stub_server import synthetic_items
+from video_batch import VideoBatch
+
+REGIONS = ["US", "IN", "GB", "JP", "BR", "DE", "FR", "KR", "MX", "CA", "AU", "ES", "IT", "ID", "RU", "NL"]
+
+
+def timed_us(fn, repeat):
+    """Median microseconds per call over `repeat` calls, plus the last result."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples), result
+
+
+def vocabulary(size, seed=3):
+    """Pseudo-words to mix into the stub's small word list, so term frequencies look like real titles."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def enrich(items, words, rng):
+    """Append Zipf-distributed words (rank r drawn with probability ~1/r) to each title and description."""
+    def draw(k):
+        return " ".join(words[int(len(words) ** rng.random()) - 1] for _ in range(k))
+
+    for item in items:
+        snippet = item["snippet"]
+        snippet["title"] += " " + draw(rng.randint(2, 5)).title()
+        snippet["description"] += " " + draw(rng.randint(8, 25))
+    return items
+
+
+def chart_rounds(region, rounds, size, churn, seed, words):
+    """`rounds` consecutive charts for a region, each replacing `churn` of the previous one."""
+    rng = random.Random(seed)
+    pool = iter(enrich(synthetic_items(region, size * (1 + rounds), seed=seed), words, rng))
+    chart = [next(pool) for _ in range(size)]
+    for _ in range(rounds):
+        yield list(chart)
+        for position in rng.sample(range(size), int(size * churn)):
+            chart[position] = next(pool)
+
+
+def bench_chart_filter(size, words, repeat):
+    batch = VideoBatch.from_items(enrich(synthetic_items("US", size, seed=1), words, random.Random(1)))
+    titles = [(t or "").lower() for t in batch.titles]
+    descriptions = [(d or "").lower() for d in batch.descriptions]
+    start = time.perf_counter()
+    index = SnapshotIndex(batch.ids, batch.titles, batch.descriptions, batch.tags)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"chart filter ({size} videos, index build {build_ms:.1f} ms)")
+    print(f"{'keyword':>10} | {'scan us':>8} | {'first us':>8} | {'repeat us':>9} | {'rows':>5} | identical")
+    print("-" * 64)
+    for keyword in ["music", "ai", "trailer", words[40], words[400][:4], "zzzq"]:
+        scan_us, scanned = timed_us(
+            lambda: [i for i in range(size) if keyword in titles[i] or keyword in descriptions[i]], repeat)
+        start = time.perf_counter()
+        found = index.rows_containing(keyword, ("title", "description"))
+        first_us = (time.perf_counter() - start) * 1e6
+        repeat_us, _ = timed_us(lambda: index.rows_containing(keyword, ("title", "description")), repeat)
+        print(f"{keyword:>10} | {scan_us:>8.1f} | {first_us:>8.1f} | {repeat_us:>9.1f} | {len(found):>5} | "
+              f"{found == scanned}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--per-day", type=int, default=4, help="snapshots per region per day")
+    parser.add_argument("--chart", type=int, default=200, help="videos per snapshot")
+    parser.add_argument("--churn", type=float, default=0.1)
+    parser.add_argument("--vocabulary", type=int, default=20_000, help="extra pseudo-words in titles")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    words = vocabulary(args.vocabulary)
+    bench_chart_filter(args.chart, words, args.repeat)
+
+    regions = REGIONS[:args.regions]
+    rounds = args.days * args.per_day + 1
+    now = time.time()
+    step = 86400 / args.per_day
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(os.path.join(tmp, "trends.db"))
+        charts = {region: list(chart_rounds(region, rounds, args.chart, args.churn, n, words))
+                  for n, region in enumerate(regions)}
+        for r in range(rounds - 1):
+            captured_at = now - (rounds - 1 - r) * step
+            store.record_snapshots([(region, None, charts[region][r], captured_at) for region in regions])
+        rows = (rounds - 1) * len(regions) * args.chart
+
+        index = CorpusIndex(store, refresh_interval=0)
+        start = time.perf_counter()
+        index.refresh(force=True)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        store.record_snapshots([(region, None, charts[region][-1], now) for region in regions])
+        start = time.perf_counter()
+        added = index.refresh(force=True)
+        refresh_ms = (time.perf_counter() - start) * 1000
+
+        # Measure queries alone, not the (throttled) refresh check
+        index.refresh_interval = float("inf")
+        corpus = index.stats()
+        print(f"\ncorpus: {len(regions)} regions x {args.days} days x {args.per_day}/day, "
+              f"{rows} snapshot rows -> {corpus['videos']} videos, {corpus['tokens']} tokens")
+        print(f"initial build {build_ms:.0f} ms, incremental refresh ({added} snapshots) {refresh_ms:.1f} ms\n")
+
+        week_ago = now - 7 * 86400
+        queries = [
+            ("single term", dict(query="music")),
+            ("rare term", dict(query=words[300])),
+            ("AND 2 terms", dict(query="music live")),
+            ("AND common+rare", dict(query=f"music {words[20]}")),
+            ("AND 3 terms", dict(query="official trailer season")),
+            ("OR 2 terms", dict(query="cricket football", op="or")),
+            ("prefix", dict(query="tra*")),
+            ("prefix AND", dict(query="mus* live")),
+            ("prefix, rare stem", dict(query=words[500][:3] + "*")),
+            ("2 regions, 7 days", dict(query="music live", regions=regions[:2], since=week_ago)),
+            ("no match", dict(query="zzzq")),
+        ]
+        def cold_search(kwargs):
+            index._matches.clear()
+            return index.search(limit=20, **kwargs)
+
+        print(f"{'query':>20} | {'cold us':>8} | {'memo us':>8} | {'matches':>7}")
+        print("-" * 54)
+        for label, kwargs in queries:
+            cold_us, (total, _) = timed_us(lambda: cold_search(kwargs), args.repeat)
+            memo_us, _ = timed_us(lambda: index.search(limit=20, **kwargs), args.repeat)
+            print(f"{label:>20} | {cold_us:>8.1f} | {memo_us:>8.1f} | {total:>7}")
+
+
+if __name__ == "__main__":
+    main()
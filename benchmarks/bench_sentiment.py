@@ -0,0 +1,82 @@
+"""
+bench_sentiment.py
+Micro-benchmark for the memoized title sentiment stage (title_sentiment.py)
+against the original per-row `df["title"].apply(TextBlob(...))`.
+
+Titles are drawn with repeats from a smaller pool, the way trending titles
+recur across refreshes and regions. Four runs over the same titles:
+    apply       - the original DataFrame.apply
+    memo cold   - empty memo, every distinct title scored once
+    memo warm   - same memo again (in-process hits)
+    shared      - a fresh memo on the same trends.db (another worker's view)
+Every run must produce polarity values identical to `apply`.
+
+Usage:
+    python benchmarks/bench_sentiment.py [--titles 10000] [--distinct 4000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from snapshot_store import SnapshotStore
+from textblob import TextBlob
+from title_sentiment import SentimentMemo
+
+WORDS = (
+    "amazing best worst funny sad official live new insane epic terrible happy crazy beautiful "
+    "trailer highlights reaction challenge vlog cooking travel news update review song remix "
+    "football cricket season episode shorts comedy prank ai tech iphone minecraft music"
+).split()
+
+
+def synthetic_titles(count, distinct, seed=42):
+    rng = random.Random(seed)
+    pool = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))).title() + f" #{i}"
+            for i in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=10_000)
+    parser.add_argument("--distinct", type=int, default=4_000, help="distinct titles among them")
+    args = parser.parse_args()
+
+    titles = synthetic_titles(args.titles, args.distinct)
+    df = pd.DataFrame({"title": titles})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(os.path.join(tmp, "trends.db"))
+        memo = SentimentMemo(store)
+
+        reference, t_apply = timed(lambda: df["title"].apply(lambda x: TextBlob(str(x)).sentiment.polarity))
+        reference = reference.to_numpy()
+        cold, t_cold = timed(memo.polarities, titles)
+        warm, t_warm = timed(memo.polarities, titles)
+        shared, t_shared = timed(SentimentMemo(store).polarities, titles)
+
+    print(f"{args.titles} titles, {len(set(titles))} distinct")
+    print(f"{'run':>10} | {'ms':>9} | {'speedup':>7} | identical")
+    print("-" * 44)
+    for name, values, ms in (("apply", reference, t_apply), ("memo cold", cold, t_cold),
+                             ("memo warm", warm, t_warm), ("shared", shared, t_shared)):
+        identical = np.array_equal(np.asarray(values, dtype=np.float64), reference)
+        print(f"{name:>10} | {ms:>9.1f} | {t_apply / ms:>6.1f}x | {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+bench_serialization.py
+Encode time and payload size per response format (serialization.py).
+
+Builds a frame shaped like /get_creator_suggestions' video_data (titles,
+ids, dates, counts, ratios, cluster labels, a few missing values) and
+encodes it as:
+
+    to_dict+jsonify   the old path: df.to_dict(orient="records") through Flask's JSON provider
+    to_dict+dumps     the same records through serialization.dumps (orjson when installed)
+    records           encode_records, built column by column
+    columnar          encode_columns
+    arrow             encode_arrow (skipped without pyarrow)
+
+Reported per size: median encode time, body size and gzip'd size.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 100,1000,10000,100000] [--repeat 5]
+"""
+
+import argparse
+import gzip
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from flask import Flask
+
+import serialization
+from stub_server import WORDS
+
+
+def creator_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    views = rng.integers(1_000, 50_000_000, n)
+    likes = (views * rng.uniform(0.005, 0.08, n)).astype(np.int64)
+    comments = (views * rng.uniform(0.0005, 0.01, n)).astype(np.int64)
+    titles = [" ".join(row) for row in words[rng.integers(0, len(words), (n, 6))]]
+    published = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 90 * 86400, n), unit="s")
+    df = pd.DataFrame({
+        "title": titles,
+        "categoryId": rng.choice(["1", "10", "17", "20", "24", "28"], n),
+        "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "viewCount": views,
+        "likeCount": likes,
+        "commentCount": comments,
+        "like_ratio": likes / views,
+        "comment_ratio": comments / views,
+        "engagement_score": (likes + 2 * comments) / views,
+        "sentiment": rng.uniform(-1, 1, n),
+        "clean_title": [title.lower() for title in titles],
+        "cluster": rng.integers(0, 5, n).astype(np.int32),
+    })
+    df.loc[df.sample(frac=0.01, random_state=seed).index, "sentiment"] = np.nan
+    return df
+
+
+def timed_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    flask_json = Flask(__name__).json
+    encoders = [
+        ("to_dict+jsonify", lambda df: flask_json.dumps(df.to_dict(orient="records")).encode()),
+        ("to_dict+dumps", lambda df: serialization.dumps(df.to_dict(orient="records"))),
+        ("records", serialization.encode_records),
+        ("columnar", serialization.encode_columns),
+        ("arrow", serialization.encode_arrow),
+    ]
+    print(f"JSON encoder: {'orjson' if serialization.orjson is not None else 'stdlib json'}, "
+          f"arrow: {'pyarrow ' + serialization.pyarrow.__version__ if serialization.pyarrow else 'not installed'}\n")
+
+    for n in [int(size) for size in args.sizes.split(",")]:
+        df = creator_frame(n)
+        print(f"{n} rows")
+        print(f"{'format':>16} | {'encode ms':>9} | {'speedup':>7} | {'bytes':>11} | {'gzip bytes':>11}")
+        print("-" * 68)
+        baseline = None
+        for label, encode in encoders:
+            if label == "arrow" and serialization.pyarrow is None:
+                print(f"{label:>16} | {'skipped (pyarrow not installed)':>45}")
+                continue
+            # Flask's encoder writes NaN, which isn't JSON, but time it as it was
+            encode_ms, body = timed_ms(lambda: encode(df), args.repeat if n < 100_000 else max(1, args.repeat // 2))
+            baseline = baseline or encode_ms
+            print(f"{label:>16} | {encode_ms:>9.2f} | {baseline / encode_ms:>6.1f}x | {len(body):>11,} | "
+                  f"{len(gzip.compress(body, compresslevel=6)):>11,}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+bench_startup.py
+Startup-time benchmark: how long `import app` takes in a fresh interpreter,
+and which imports that time goes to (from `python -X importtime`).
+
+Also times the work that is now deferred to first use, each in its own
+fresh interpreter after `import app`: building the YouTube client from the
+bundled discovery document, and importing the creator modules (pandas,
+sklearn, textblob, Gemini) on the first creator request.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 12]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import ROOT, scratch_env
+
+DEFERRED = {
+    "youtube client build": "app.youtube_service.videos",
+    "import creator_suggestions": "import creator_suggestions",
+    "import creator_coach_ai": "import creator_coach_ai",
+}
+
+
+def run_python(code, tmp, importtime=False):
+    env = dict(os.environ, **scratch_env(tmp))
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return result.stdout, result.stderr
+
+
+def timed_after_import(statement, tmp):
+    """Milliseconds `statement` takes in a fresh interpreter that already imported app."""
+    code = (
+        "import time, app\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    stdout, _ = run_python(code, tmp)
+    return float(stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(stderr):
+    """
+    Parse -X importtime output into {module: cumulative_us} for `app` and its
+    direct imports. Children are printed before their parent, one indent deeper.
+    """
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 1:
+            children[name] = int(cum)
+        elif depth == 0:
+            if name == "app":
+                return {"app": int(cum), **children}
+            children = {}
+    raise RuntimeError("`import app` not found in -X importtime output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="imports to list in the breakdown")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        totals, runs = [], []
+        for _ in range(args.runs):
+            _, stderr = run_python("import app", tmp, importtime=True)
+            breakdown = import_breakdown(stderr)
+            totals.append(breakdown["app"] / 1000)
+            runs.append(breakdown)
+
+        print(f"import app: median {statistics.median(totals):.1f} ms over {args.runs} runs "
+              f"(min {min(totals):.1f}, max {max(totals):.1f})\n")
+
+        modules = [name for name in runs[0] if name != "app"]
+        medians = {name: statistics.median(run.get(name, 0) for run in runs) / 1000 for name in modules}
+        print(f"{'import (first importer attributed)':<40} | {'cumulative ms':>13}")
+        print("-" * 57)
+        for name, ms in sorted(medians.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+            print(f"{name:<40} | {ms:>13.1f}")
+
+        print(f"\n{'deferred to first use':<40} | {'ms':>13}")
+        print("-" * 57)
+        for label, statement in DEFERRED.items():
+            ms = statistics.median(timed_after_import(statement, tmp) for _ in range(max(1, args.runs // 2)))
+            print(f"{label:<40} | {ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
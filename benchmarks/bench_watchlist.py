@@ -0,0 +1,145 @@
+"""
+bench_watchlist.py
+Storage and query cost of the watchlist (watchlist.py) as it grows.
+
+For each --videos size, a scratch WatchlistStore is filled with --days of
+synthetic 50-id lookups: a pass every --poll-minutes, or as often as the
+default quota budget allows (so larger watchlists get fewer passes). On
+each pass only --active of the videos have new views, likes or comments
+(older videos barely move). Then velocity() builds the last day's series,
+once for 50 given videos and once to rank every tracked video, next to a
+reference that queries and walks each video's rows in Python.
+
+Reported: quota units and passes per day, time to store a pass, delta rows
+kept vs one row per video per pass, and velocity() time vs the per-video
+loop (whose output it must match).
+
+Usage:
+    python benchmarks/bench_watchlist.py [--videos 1000,10000,50000] [--days 2] [--active 0.6]
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+import _common  # noqa: F401  (repo on sys.path, dummy keys, scratch databases)
+
+from collector import YOUTUBE_DAILY_QUOTA
+from watchlist import WATCHLIST_QUOTA_SHARE, WatchlistStore, chunks, velocity
+from youtube_api import PAGE_SIZE
+
+
+def video_ids(n):
+    return [f"bench{i:06d}".ljust(11, "_") for i in range(n)]
+
+
+def fill(store, ids, polls, step, active, rng):
+    """Record `polls` passes over `ids`, `step` seconds apart and ending now. Returns seconds per pass."""
+    counts = {video_id: [rng.randint(1_000, 5_000_000), rng.randint(10, 50_000), rng.randint(0, 5_000)]
+              for video_id in ids}
+    t = time.time() - polls * step
+    elapsed = 0.0
+    for _ in range(polls):
+        for video_id, count in counts.items():
+            if rng.random() < active:
+                count[0] += rng.randint(1, 20_000)
+                count[1] += rng.randint(0, 500)
+                count[2] += rng.randint(0, 50)
+        started = time.perf_counter()
+        for batch in chunks(ids, PAGE_SIZE):
+            items = {video_id: {"id": video_id, "statistics": {
+                "viewCount": str(counts[video_id][0]),
+                "likeCount": str(counts[video_id][1]),
+                "commentCount": str(counts[video_id][2]),
+            }} for video_id in batch}
+            store.record_poll(items, batch, t)
+        elapsed += time.perf_counter() - started
+        t += step
+    return elapsed / polls
+
+
+def reference_velocity(store, ids, since):
+    """velocity() one video at a time: a query and a Python walk per video."""
+    conn = store._connect()
+    series = {}
+    for video_id in ids:
+        watch_id, views, polled_at = conn.execute("SELECT id, views, polled_at FROM watchlist WHERE video_id = ?",
+                                                  (video_id,)).fetchone()
+        rows = conn.execute("SELECT t, views, likes, comments FROM watchlist_deltas "
+                            "WHERE watch_id = ? AND t >= ? ORDER BY t", (watch_id, since)).fetchall()
+        if not rows:
+            continue
+        if polled_at > rows[-1][0]:
+            rows.append((polled_at, 0, 0, 0))  # the polls since the last change gained nothing
+        views -= sum(row[1] for row in rows)
+        points = {"t": [], "views": [], "views_per_hour": [], "engagement_per_hour": []}
+        previous_t = None
+        for t, d_views, d_likes, d_comments in rows:
+            views += d_views
+            hours = (t - previous_t) / 3600 if previous_t is not None else None
+            points["t"].append(t)
+            points["views"].append(views)
+            points["views_per_hour"].append(round(d_views / hours, 2) if hours else None)
+            points["engagement_per_hour"].append(round((d_likes + d_comments) / hours, 2) if hours else None)
+            previous_t = t
+        series[video_id] = points
+    return series
+
+
+def timed(fn, repeat=3):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", default="1000,10000,50000", help="comma-separated watchlist sizes")
+    parser.add_argument("--days", type=float, default=2)
+    parser.add_argument("--poll-minutes", type=float, default=15)
+    parser.add_argument("--active", type=float, default=0.6, help="share of videos that change per poll")
+    args = parser.parse_args()
+
+    units_per_day = YOUTUBE_DAILY_QUOTA * WATCHLIST_QUOTA_SHARE
+    print(f"{args.days:g} days of passes every {args.poll_minutes:g} min (or as the budget of "
+          f"{units_per_day:,.0f} units/day allows), {args.active:.0%} of videos changing per pass\n")
+    print(f"{'videos':>7} | {'units':>5} | {'passes':>6} | {'store pass':>10} | {'delta rows':>10} | {'of full':>7} | "
+          f"{'50 ids ms':>18} | {'rank all ms':>18}")
+    print(f"{'':>7} | {'/pass':>5} | {'/day':>6} | {'ms':>10} | {'':>10} | {'':>7} | "
+          f"{'vectorized / loop':>18} | {'vectorized / loop':>18}")
+    print("-" * 103)
+
+    for n in [int(value) for value in args.videos.split(",")]:
+        rng = random.Random(n)
+        ids = video_ids(n)
+        units = math.ceil(n / PAGE_SIZE)
+        per_day = min(units_per_day / units, 1440 / args.poll_minutes)
+        polls = max(2, round(args.days * per_day))
+        since = int(time.time() - 86400)
+        with tempfile.TemporaryDirectory(prefix="bench_watchlist_") as scratch:
+            store = WatchlistStore(os.path.join(scratch, "trends.db"))
+            store.add(ids)
+            per_pass = fill(store, ids, polls, 86400 / per_day, args.active, rng)
+            rows = store._connect().execute("SELECT COUNT(*) FROM watchlist_deltas").fetchone()[0]
+
+            sample = sorted(rng.sample(ids, min(50, n)))
+            few, few_ms = timed(lambda: velocity(store, sample, since))
+            few_ref, few_ref_ms = timed(lambda: reference_velocity(store, sample, since), repeat=1)
+            top, all_ms = timed(lambda: velocity(store, since=since, limit=20))
+            everything, all_ref_ms = timed(lambda: reference_velocity(store, ids, since), repeat=1)
+            assert few == few_ref, "velocity() differs from the per-video reference"
+            assert all(top[video_id] == everything[video_id] for video_id in top)
+
+        print(f"{n:>7} | {units:>5} | {per_day:>6.1f} | "
+              f"{per_pass * 1000:>10.0f} | {rows:>10,} | {rows / (n * polls):>7.0%} | "
+              f"{few_ms:>7.1f} / {few_ref_ms:>8.1f} | {all_ms:>7.0f} / {all_ref_ms:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
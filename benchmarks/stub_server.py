@@ -0,0 +1,289 @@
+"""
+stub_server.py
+Local stand-in for the YouTube Data API and the Gemini API, for testing and
+benchmarks.
+
+Serves synthetic `videos().list` responses (mostPopular chart pages with
+nextPageToken, and `id=` lookups) and Gemini `generateContent` /
+`streamGenerateContent` responses (REST, v1beta), each with a configurable
+artificial latency. Point the app at it with:
+
+    YOUTUBE_API_ROOT=http://127.0.0.1:8765/ GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+
+Usage:
+    python benchmarks/stub_server.py [--port 8765] [--latency-ms 300] [--gemini-latency-ms 2000]
+                                     [--gemini-chunk-ms 50] [--chart-size 200]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "music official video trailer live highlights gaming minecraft reaction funny "
+    "challenge vlog cooking travel news update review unboxing tutorial remix song "
+    "football cricket season episode shorts comedy prank ai tech iphone"
+).split()
+CATEGORIES = ["1", "2", "10", "15", "17", "20", "22", "23", "24", "25", "26", "27", "28"]
+
+
+# -----------------------
+# 1. Synthetic data
+# -----------------------
+def synthetic_items(region="US", n=200, seed=None):
+    """Deterministic fake `mostPopular` items for a region."""
+    rng = random.Random(zlib.crc32(region.encode()) if seed is None else seed)
+    now = int(time.time())
+    items = []
+    for i in range(n):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).title()
+        published = time.gmtime(now - rng.randint(3600, 60 * 86400))
+        items.append({
+            "kind": "youtube#video",
+            "id": f"{region}{i:06d}{rng.randint(0, 9999):04d}",
+            "snippet": {
+                "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", published),
+                "title": title,
+                "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))),
+                "channelTitle": f"Channel {rng.randint(1, 60)}",
+                "categoryId": rng.choice(CATEGORIES),
+                "tags": rng.sample(WORDS, 4),
+                "thumbnails": {
+                    "default": {"url": f"https://i.ytimg.com/vi/{i}/default.jpg"},
+                    "high": {"url": f"https://i.ytimg.com/vi/{i}/hqdefault.jpg"},
+                },
+            },
+            "statistics": {
+                "viewCount": str(rng.randint(1_000, 50_000_000)),
+                "likeCount": str(rng.randint(10, 500_000)),
+                "commentCount": str(rng.randint(0, 50_000)),
+            },
+        })
+    return items
+
+
+def video_stats(video_id):
+    """Deterministic, slowly growing statistics for an `id=` lookup."""
+    base = zlib.crc32(video_id.encode()) % 1_000_000
+    minutes = int(time.time() // 60)
+    return {
+        "kind": "youtube#video",
+        "id": video_id,
+        "statistics": {
+            "viewCount": str(base * 10 + minutes % 100_000 * (base % 50 + 1)),
+            "likeCount": str(base // 10 + minutes % 10_000),
+            "commentCount": str(base // 100 + minutes % 1_000),
+        },
+    }
+
+
+IDEA_TEMPLATE = """## **Idea {n}: {title}**
+* **Description:** {description}
+* **Hook:** "{hook}"
+* **Thumbnail Text:** `{thumbnail}`
+
+"""
+
+
+def gemini_text(prompt, ideas=5):
+    """Deterministic fake Gemini answer for a prompt: markdown-ish ideas, like the real model writes."""
+    rng = random.Random(hashlib.sha1(prompt.encode()).digest())
+
+    def words(low, high):
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+    return "".join(
+        IDEA_TEMPLATE.format(n=n, title=words(3, 7).title(), description=words(12, 24),
+                             hook=words(8, 14).capitalize(), thumbnail=words(2, 4).upper())
+        for n in range(1, ideas + 1)
+    )
+
+
+def gemini_response(text, prompt, generated=None):
+    """
+    One GenerateContentResponse (a whole answer, or one streamed chunk of it).
+    Streamed chunks report token counts for everything `generated` so far, as the real API does.
+    """
+    generated = text if generated is None else generated
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            # Roughly four characters per token
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(generated) // 4,
+            "totalTokenCount": (len(prompt) + len(generated)) // 4,
+        },
+    }
+
+
+# -----------------------
+# 2. HTTP handler
+# -----------------------
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "StubYouTube/1.0"
+    # Keep-alive, like the real API, so client connection pooling can be measured
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _sleep(self, latency_ms=None):
+        latency_ms = self.server.latency_ms if latency_ms is None else latency_ms
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.count_request(url.path)
+        self._sleep()
+
+        if url.path.rstrip("/").endswith("/youtube/v3/videos"):
+            return self._send_json(200, self.videos_list(params))
+        return self._send_json(404, {"error": {"code": 404, "message": f"No stub for {url.path}"}})
+
+    def videos_list(self, params):
+        if "id" in params:
+            ids = [i for i in params["id"].split(",") if i][:50]
+            return {"kind": "youtube#videoListResponse", "items": [video_stats(i) for i in ids]}
+
+        region = params.get("regionCode", "US")
+        items = self.server.chart(region)
+        category_id = params.get("videoCategoryId")
+        if category_id:
+            items = [item for item in items if item["snippet"]["categoryId"] == category_id]
+
+        per_page = max(1, min(int(params.get("maxResults", 5)), 50))
+        start = int(params.get("pageToken") or 0)
+        page = items[start:start + per_page]
+        response = {
+            "kind": "youtube#videoListResponse",
+            "items": page,
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": per_page},
+        }
+        if start + per_page < len(items):
+            response["nextPageToken"] = str(start + per_page)
+        return response
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.server.count_request(url.path)
+        self._sleep(self.server.gemini_latency_ms)
+
+        if url.path.startswith("/v1beta/models/") and url.path.endswith(":generateContent"):
+            prompt = self.prompt_text(body)
+            return self._send_json(200, gemini_response(gemini_text(prompt), prompt))
+        if url.path.startswith("/v1beta/models/") and url.path.endswith(":streamGenerateContent"):
+            return self.stream_generate_content(self.prompt_text(body))
+        return self._send_json(404, {"error": {"code": 404, "message": f"No stub for {url.path}"}})
+
+    @staticmethod
+    def prompt_text(body):
+        return "".join(part.get("text", "") for content in body.get("contents", [])
+                       for part in content.get("parts", []))
+
+    def stream_generate_content(self, prompt):
+        """A JSON array of partial responses, one chunk every --gemini-chunk-ms (REST streaming)."""
+        text = gemini_text(prompt)
+        size = max(1, self.server.gemini_chunk_chars)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for n, piece in enumerate(pieces):
+            if n:
+                self._sleep(self.server.gemini_chunk_ms)
+            chunk = gemini_response(piece, prompt, generated=text[:(n + 1) * size])
+            data = (("[" if n == 0 else ",") + json.dumps(chunk)).encode()
+            self.wfile.write(b"%x\r\n%b\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"1\r\n]\r\n0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, chart_size=200, verbose=False,
+                 gemini_latency_ms=0, gemini_chunk_ms=0, gemini_chunk_chars=200):
+        super().__init__(address, StubHandler)
+        self.latency_ms = latency_ms
+        self.gemini_latency_ms = gemini_latency_ms
+        self.gemini_chunk_ms = gemini_chunk_ms
+        self.gemini_chunk_chars = gemini_chunk_chars
+        self.chart_size = chart_size
+        self.verbose = verbose
+        self.request_counts = {}
+        self.connections = 0
+        self._charts = {}
+        self._lock = threading.Lock()
+
+    def chart(self, region):
+        with self._lock:
+            if region not in self._charts:
+                self._charts[region] = synthetic_items(region, self.chart_size)
+            return self._charts[region]
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def count_request(self, path):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+
+def start_stub_server(port=0, latency_ms=0, chart_size=200, gemini_latency_ms=0, gemini_chunk_ms=0):
+    """Start the stub on a background thread. Returns (server, root_url)."""
+    server = StubServer(("127.0.0.1", port), latency_ms=latency_ms, chart_size=chart_size,
+                        gemini_latency_ms=gemini_latency_ms, gemini_chunk_ms=gemini_chunk_ms)
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300, help="artificial latency per YouTube request")
+    parser.add_argument("--gemini-latency-ms", type=float, default=2000, help="artificial latency per Gemini call")
+    parser.add_argument("--gemini-chunk-ms", type=float, default=50, help="delay between streamed Gemini chunks")
+    parser.add_argument("--chart-size", type=int, default=200, help="videos per region chart")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), args.latency_ms, args.chart_size, args.verbose,
+                        gemini_latency_ms=args.gemini_latency_ms, gemini_chunk_ms=args.gemini_chunk_ms)
+    print(f"Stub YouTube + Gemini API listening on http://127.0.0.1:{args.port}/ "
+          f"(latency {args.latency_ms} ms, Gemini {args.gemini_latency_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+cache.py
+Two-tier TTL cache: a small in-process LRU in front of a shared on-disk
+SQLite tier, so every gunicorn worker can reuse what another one fetched.
+Supports stale-while-revalidate and keeps simple hit/miss counters.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+CACHE_DB_PATH = os.getenv(
+    "CACHE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.db")
+)
+
+
+def _make_key(key):
+    """Turn a tuple key into a stable string usable as a SQLite primary key."""
+    return json.dumps(key, sort_keys=True, default=str)
+
+
+# -----------------------
+# 2. Two-tier cache
+# -----------------------
+class TwoTierCache:
+    """
+    In-process LRU (tier 1) backed by a SQLite table (tier 2).
+
+    Entries younger than `ttl` seconds are fresh. Entries older than `ttl` but
+    younger than `ttl + stale_ttl` are served as-is while a background thread
+    refreshes them (stale-while-revalidate). Anything older is a miss.
+    """
+
+    def __init__(self, namespace, ttl=300, stale_ttl=600, max_entries=256, db_path=CACHE_DB_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+        if self.db_path:
+            self._init_db()
+
+    # --- Disk tier ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        stored_at REAL NOT NULL,
+                        value TEXT NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )
+                    """
+                )
+        except sqlite3.Error as e:
+            print(f"Disk cache disabled ({self.db_path}): {e}")
+            self.db_path = None
+
+    def _disk_get(self, skey):
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT stored_at, value FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, skey)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_set(self, skey, stored_at, value):
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, stored_at, value) VALUES (?, ?, ?, ?)",
+                    (self.namespace, skey, stored_at, json.dumps(value))
+                )
+        except sqlite3.Error as e:
+            print(f"Disk cache write failed: {e}")
+
+    # --- Memory tier ---
+
+    def _memory_get(self, skey):
+        with self._lock:
+            entry = self._memory.get(skey)
+            if entry is not None:
+                self._memory.move_to_end(skey)
+            return entry
+
+    def _memory_set(self, skey, stored_at, value):
+        with self._lock:
+            self._memory[skey] = (stored_at, value)
+            self._memory.move_to_end(skey)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    # --- Public API ---
+
+    def get(self, key):
+        """Return (value, age_seconds, tier) for a cached key, or (None, None, None)."""
+        skey = _make_key(key)
+        entry = self._memory_get(skey)
+        source = "memory_hits"
+        if entry is None:
+            entry = self._disk_get(skey)
+            source = "disk_hits"
+            if entry is not None:
+                self._memory_set(skey, *entry)
+        if entry is None:
+            return None, None, None
+
+        stored_at, value = entry
+        return value, time.time() - stored_at, source
+
+    def set(self, key, value):
+        skey = _make_key(key)
+        stored_at = time.time()
+        self._memory_set(skey, stored_at, value)
+        self._disk_set(skey, stored_at, value)
+
+    def get_fresh(self, key):
+        """Return the value for `key` if it is still fresh (counted as a hit), else None (a miss)."""
+        value, age, source = self.get(key)
+        if value is not None and age < self.ttl:
+            self._count(source)
+            return value
+        self._count("misses")
+        return None
+
+    def get_or_fetch(self, key, fetch_fn):
+        """
+        Return the cached value for `key`, calling `fetch_fn()` on a miss.
+        Stale entries are returned immediately and refreshed in the background.
+        """
+        value, age, source = self.get(key)
+
+        if value is not None and age < self.ttl:
+            self._count(source)
+            return value
+
+        if value is not None and age < self.ttl + self.stale_ttl:
+            self._count("stale_hits")
+            self._refresh_in_background(key, fetch_fn)
+            return value
+
+        self._count("misses")
+        value = fetch_fn()
+        self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key, fetch_fn):
+        skey = _make_key(key)
+        with self._lock:
+            if skey in self._refreshing:
+                return
+            self._refreshing.add(skey)
+
+        def refresh():
+            try:
+                self.set(key, fetch_fn())
+                self._count("refreshes")
+            except Exception as e:
+                print(f"Background cache refresh failed for {key}: {e}")
+                self._count("refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(skey)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._memory)
+        hits = counters["memory_hits"] + counters["disk_hits"] + counters["stale_hits"]
+        lookups = hits + counters["misses"]
+        counters.update({
+            "namespace": self.namespace,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "memory_entries": size,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        })
+        return counters
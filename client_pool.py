@@ -0,0 +1,160 @@
+"""
+client_pool.py
+Bounded, thread-safe pools of API transports.
+
+httplib2.Http is not thread-safe, and a connection built per request thread
+never gets reused under Flask's threaded server. Instead each pool hands out
+a fixed number of long-lived resources (HTTP transports that keep their
+connections alive, or Gemini model handles): callers borrow one, use it,
+and give it back. When every resource is busy, callers wait (counted) up to
+a timeout instead of opening yet another connection.
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from transport import wrap_http
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+YOUTUBE_HTTP_POOL_SIZE = int(os.getenv("YOUTUBE_HTTP_POOL_SIZE", 10))
+YOUTUBE_HTTP_TIMEOUT = int(os.getenv("YOUTUBE_HTTP_TIMEOUT", 30))
+# How long a request waits for a free connection before failing
+YOUTUBE_POOL_WAIT_TIMEOUT = float(os.getenv("YOUTUBE_POOL_WAIT_TIMEOUT", 30))
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled resource became free within the wait timeout."""
+
+
+# -----------------------
+# 2. Resource pool
+# -----------------------
+class ResourcePool:
+    """
+    Up to `size` resources made by `factory()`, created on demand and reused
+    most-recently-used first (so the warmest connection is picked). If `reset`
+    is given it is called on a resource whose use raised, before it goes back.
+    """
+
+    def __init__(self, name, factory, size, wait_timeout=None, reset=None):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.reset = reset
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._counters = {
+            "acquired": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+        # Connections opened before a fork (gunicorn --preload) stay with the parent
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _acquire(self):
+        try:
+            resource = self._idle.get_nowait()
+        except queue.Empty:
+            resource = None
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    resource = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+        if resource is None:
+            # Every resource is busy: wait for one to come back
+            start = time.perf_counter()
+            try:
+                resource = self._idle.get(timeout=self.wait_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._counters["timeouts"] += 1
+                raise PoolTimeout(f"No free {self.name} connection after {self.wait_timeout}s (pool size {self.size})")
+            finally:
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self._counters["waits"] += 1
+                    self._counters["wait_seconds"] += waited
+                    self._counters["max_wait_seconds"] = max(self._counters["max_wait_seconds"], waited)
+
+        with self._lock:
+            self._counters["acquired"] += 1
+        return resource
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a resource for the duration of a `with` block."""
+        resource = self._acquire()
+        try:
+            yield resource
+        except Exception:
+            with self._lock:
+                self._counters["errors"] += 1
+            if self.reset is not None:
+                self.reset(resource)
+            raise
+        finally:
+            self._idle.put(resource)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            created = self._created
+        idle = self._idle.qsize()
+        counters.update({
+            "name": self.name,
+            "size": self.size,
+            "created": created,
+            "idle": idle,
+            "in_use": created - idle,
+            "wait_seconds": round(counters["wait_seconds"], 3),
+            "max_wait_seconds": round(counters["max_wait_seconds"], 3),
+        })
+        return counters
+
+
+# -----------------------
+# 3. YouTube HTTP transports
+# -----------------------
+def _new_http():
+    import httplib2
+    # Recording/replaying wrapper when TRANSPORT_MODE is set (see transport.py)
+    return wrap_http(lambda: httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT))
+
+
+def _close_http(http):
+    # Drop possibly half-read keep-alive connections; httplib2 reconnects on next use
+    http.close()
+
+
+youtube_http_pool = ResourcePool(
+    "youtube_http", _new_http, YOUTUBE_HTTP_POOL_SIZE,
+    wait_timeout=YOUTUBE_POOL_WAIT_TIMEOUT, reset=_close_http
+)
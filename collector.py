@@ -0,0 +1,205 @@
+"""
+collector.py
+Background collector that prefetches trending charts for every configured
+region x category and precomputes the /get_trending_data payloads, so the
+first dashboard visit per region is served warm.
+
+Upstream calls are paced by a token bucket sized to the YouTube daily quota
+and run on a small bounded thread pool.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+# The regions offered in index.html. The all-category chart is always collected
+# per region; genre charts (e.g. COLLECTOR_CATEGORIES=10,20,24) are opt-in since
+# 10 regions x 10 charts every 5 minutes would exceed the default daily quota.
+DEFAULT_REGIONS = "US,IN,GB,CA,AU,DE,BR,JP,KR,MX"
+
+COLLECTOR_REGIONS = [r.strip().upper() for r in os.getenv("COLLECTOR_REGIONS", DEFAULT_REGIONS).split(",") if r.strip()]
+COLLECTOR_CATEGORIES = [c.strip() for c in os.getenv("COLLECTOR_CATEGORIES", "").split(",") if c.strip()]
+COLLECTOR_INTERVAL = int(os.getenv("COLLECTOR_INTERVAL", 300))
+COLLECTOR_WORKERS = int(os.getenv("COLLECTOR_WORKERS", 4))
+
+# videos().list costs 1 quota unit; the default project quota is 10,000 units/day
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000))
+# Share of the daily quota the collector may spend (the rest is left for live traffic)
+COLLECTOR_QUOTA_SHARE = float(os.getenv("COLLECTOR_QUOTA_SHARE", 0.5))
+COLLECTOR_BURST = int(os.getenv("COLLECTOR_BURST", 50))
+
+
+# -----------------------
+# 2. Token Bucket
+# -----------------------
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None, stop_event=None):
+        """Block until `tokens` are available. Returns False on timeout or stop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    @property
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+def quota_bucket(daily_quota=YOUTUBE_DAILY_QUOTA, share=COLLECTOR_QUOTA_SHARE, burst=COLLECTOR_BURST):
+    """A token bucket that spends `share` of the daily quota evenly over 24h."""
+    return TokenBucket(rate=daily_quota * share / 86400, capacity=burst)
+
+
+# -----------------------
+# 3. Collector
+# -----------------------
+class TrendingCollector:
+    """
+    Walks regions x categories every `interval` seconds and calls
+    `precompute(region, category_id)` for each pair (category_id is None for
+    the all-category chart). Whatever precompute returns is kept as the warm
+    payload for that pair.
+    """
+
+    def __init__(self, precompute, regions=None, categories=None, interval=COLLECTOR_INTERVAL,
+                 workers=COLLECTOR_WORKERS, bucket=None, quota_cost=1):
+        self.precompute = precompute
+        self.regions = regions if regions is not None else COLLECTOR_REGIONS
+        self.categories = categories if categories is not None else COLLECTOR_CATEGORIES
+        self.interval = interval
+        self.workers = workers
+        self.bucket = bucket or quota_bucket()
+        self.quota_cost = quota_cost
+
+        self._payloads = {}  # (region, category_id) -> (computed_at, payload)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {
+            "cycles": 0,
+            "tasks_run": 0,
+            "tasks_failed": 0,
+            "tasks_skipped_quota": 0,
+            "last_cycle_seconds": 0.0,
+        }
+
+    def tasks(self):
+        for region in self.regions:
+            yield region, None
+            for category_id in self.categories:
+                yield region, category_id
+
+    def _run_task(self, region, category_id):
+        # Wait for quota, but never past the next cycle
+        if not self.bucket.acquire(self.quota_cost, timeout=self.interval, stop_event=self._stop):
+            with self._lock:
+                self._counters["tasks_skipped_quota"] += 1
+            return
+        try:
+            payload = self.precompute(region, category_id)
+        except Exception as e:
+            print(f"Collector failed for {region}/{category_id or 'all'}: {e}")
+            with self._lock:
+                self._counters["tasks_failed"] += 1
+            return
+        with self._lock:
+            self._counters["tasks_run"] += 1
+            if payload is not None:
+                self._payloads[(region, category_id)] = (time.time(), payload)
+
+    def run_once(self):
+        """Run one full pass over every region x category, in parallel."""
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="collector") as pool:
+            futures = [pool.submit(self._run_task, region, category_id) for region, category_id in self.tasks()]
+            for future in futures:
+                future.result()
+        with self._lock:
+            self._counters["cycles"] += 1
+            self._counters["last_cycle_seconds"] = round(time.monotonic() - start, 3)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="trending-collector", daemon=True)
+        self._thread.start()
+        print(f"📡 Trending collector started for {len(self.regions)} regions every {self.interval}s")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def warm_payload(self, region, category_id=None, max_age=None):
+        """Return the precomputed payload for a region if it is fresh enough."""
+        max_age = self.interval * 2 if max_age is None else max_age
+        with self._lock:
+            entry = self._payloads.get((region, category_id))
+        if entry is None or time.time() - entry[0] > max_age:
+            return None
+        return entry[1]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["warm_payloads"] = len(self._payloads)
+        counters.update({
+            "running": self._thread is not None and self._thread.is_alive(),
+            "regions": self.regions,
+            "categories": self.categories,
+            "interval": self.interval,
+            "workers": self.workers,
+            "quota_tokens_available": round(self.bucket.available, 2),
+        })
+        return counters
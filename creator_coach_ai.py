@@ -11,20 +11,21 @@ Dependencies:
 import os
 import json
 import pandas as pd
-from googleapiclient.discovery import build
 from dotenv import load_dotenv
-import google.generativeai as genai
 import re
 
+from gemini_api import generate_text, generate_text_async, stream_text
+from profiler import profiled
+from youtube_api import build_youtube_client, iter_most_popular, most_popular_async
+
 # ----------------------------
 # 1. Setup API Keys
 # ----------------------------
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-genai.configure(api_key=GEMINI_API_KEY)
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+# Built on first use; Gemini is configured lazily in gemini_api.py
+youtube = build_youtube_client(YOUTUBE_API_KEY)
 
 # ----------------------------
 # 2. Fetch trending videos
@@ -38,20 +39,19 @@ def fetch_trending_videos(region="US", genre="music", max_results=20):
         genre (str or int): Optional YouTube video category ID (e.g., '10' for Music, '20' for Gaming)
         max_results (int): Number of results to fetch (default 20)
     """
-    request_params = {
-        "part": "snippet,statistics",
-        "chart": "mostPopular",
-        "regionCode": region,
-        "maxResults": max_results
-    }
+    # Optional genre maps to videoCategoryId; pages come from the shared cache
+    return videos_frame(iter_most_popular(youtube, region=region, limit=max_results, category_id=genre))
+
 
-    if genre:
-        request_params["videoCategoryId"] = str(genre)
+async def fetch_trending_videos_async(region="US", genre="music", max_results=20):
+    """fetch_trending_videos() with the YouTube call awaited (ASGI server)."""
+    return videos_frame(await most_popular_async(youtube, region=region, limit=max_results, category_id=genre))
 
-    response = youtube.videos().list(**request_params).execute()
 
+def videos_frame(items):
+    """The columns the prompt uses, one row per trending item."""
     videos = []
-    for item in response.get("items", []):
+    for item in items:
         snippet = item.get("snippet", {})
         stats = item.get("statistics", {})
 
@@ -144,23 +144,106 @@ def clean_gemini_output(text: str) -> str:
     return text
 
 
+class IncrementalCleaner:
+    """
+    Applies clean_gemini_output() to a stream of chunks.
+    Characters the cleanup rules could still merge with the next chunk
+    (markdown symbols, whitespace, backslashes, a trailing "\\n") are held
+    back, so the concatenated output equals cleaning the full text at once.
+    """
+
+    HOLD_BACK = set("#*_` \n\\")
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+
+    def _safe_cut(self, text):
+        cut = len(text)
+        while cut > 0:
+            if text[cut - 1] in self.HOLD_BACK:
+                cut -= 1
+                continue
+            if text[cut - 1] == "n":
+                # "\\n" becomes a newline once markdown symbols in between are removed
+                start = cut - 2
+                while start >= 0 and text[start] in "#*_`":
+                    start -= 1
+                if start >= 0 and text[start] == "\\":
+                    cut = start
+                    continue
+            break
+        return cut
+
+    def _emit(self, text):
+        text = re.sub(r"[#*_`]+", "", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        text = re.sub(r" {2,}", " ", text)
+        text = text.replace("\\n", "\n").replace("\\", "")
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, chunk):
+        """Add a raw chunk; returns the cleaned text that is now safe to show."""
+        self._pending += chunk
+        cut = self._safe_cut(self._pending)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(ready) if ready else ""
+
+    def finish(self):
+        """Flush whatever was held back at the end of the stream."""
+        ready, self._pending = self._pending, ""
+        return self._emit(ready).rstrip()
+
+
 # ----------------------------
 # 5. Analyze via Gemini
 # ----------------------------
-def analyze_trends_with_gemini(videos_df: pd.DataFrame, country: str, genre: str = None):
+@profiled
+def analyze_trends_with_gemini(videos_df: pd.DataFrame, country: str, genre: str = None, bypass_cache: bool = False):
     """Send video data to Gemini API and return a cleaned, plain-text report."""
     prompt = build_prompt(videos_df, country, genre)
-    model = genai.GenerativeModel("gemini-2.5-flash")
 
     try:
-        response = model.generate_content(prompt)
-        raw_text = response.text.strip()
+        # Same snapshot -> same prompt -> cached response (see gemini_api.py)
+        raw_text = generate_text(prompt, model_name="gemini-2.5-flash", bypass_cache=bypass_cache,
+                                 prompt_kind="coach").strip()
         cleaned_text = clean_gemini_output(raw_text)
         return cleaned_text
     except Exception as e:
         return f"⚠️ Error analyzing with Gemini: {str(e)}"
 
 
+async def analyze_trends_with_gemini_async(videos_df: pd.DataFrame, country: str, genre: str = None,
+                                           bypass_cache: bool = False):
+    """analyze_trends_with_gemini() with the Gemini call awaited (asgi.py warms the cache with it)."""
+    prompt = build_prompt(videos_df, country, genre)
+
+    try:
+        raw_text = (await generate_text_async(prompt, model_name="gemini-2.5-flash",
+                                              bypass_cache=bypass_cache, prompt_kind="coach")).strip()
+        return clean_gemini_output(raw_text)
+    except Exception as e:
+        return f"⚠️ Error analyzing with Gemini: {str(e)}"
+
+
+def stream_trends_with_gemini(videos_df: pd.DataFrame, country: str, genre: str = None, bypass_cache: bool = False):
+    """Like analyze_trends_with_gemini(), but yields the cleaned report chunk by chunk as Gemini writes it."""
+    prompt = build_prompt(videos_df, country, genre)
+    cleaner = IncrementalCleaner()
+
+    for chunk in stream_text(prompt, model_name="gemini-2.5-flash", bypass_cache=bypass_cache,
+                             prompt_kind="coach"):
+        text = cleaner.feed(chunk)
+        if text:
+            yield text
+    text = cleaner.finish()
+    if text:
+        yield text
+
+
 # ----------------------------
 # 6. Main Runner
 # ----------------------------
@@ -8,37 +8,33 @@ import os
 import re
 import numpy as np
 import pandas as pd
-from googleapiclient.discovery import build
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
-from textblob import TextBlob
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from gemini_api import generate_text, stream_text
+from metrics import timed
+from profiler import profiled
+from topic_clusters import TOPIC_CLUSTERING, topic_clusterer
+from title_sentiment import sentiment_memo
+from youtube_api import build_youtube_client, iter_most_popular
 
 # -----------------------
 # 1. Setup
 # -----------------------
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-genai.configure(api_key=GEMINI_API_KEY)
+# Built on first use; Gemini is configured lazily in gemini_api.py
+youtube = build_youtube_client(YOUTUBE_API_KEY)
 
 # -----------------------
 # 2. Fetch Trending Videos
 # -----------------------
 def fetch_trending_videos(region="US", max_results=50):
-    """Fetch trending YouTube videos from a specific region."""
-    response = youtube.videos().list(
-        part="snippet,statistics",
-        chart="mostPopular",
-        regionCode=region,
-        maxResults=max_results
-    ).execute()
-
+    """Fetch trending YouTube videos from a specific region (follows pagination past 50)."""
     videos = []
-    for item in response.get("items", []):
+    for item in iter_most_popular(youtube, region=region, limit=max_results):
         snippet = item.get("snippet", {})
         stats = item.get("statistics", {})
         videos.append({
@@ -68,8 +64,19 @@ def compute_engagement_metrics(df):
 # -----------------------
 # 4. Clustering
 # -----------------------
-def cluster_titles(df, num_clusters=5):
+@timed
+def cluster_titles(df, num_clusters=5, region=None):
+    """
+    Group titles into topics. With TOPIC_CLUSTERING=incremental and a region,
+    the region's warm-started model is updated with the new titles only and
+    cluster ids stay stable between calls (see topic_clusters.py).
+    """
     df["clean_title"] = df["title"].apply(preprocess_text)
+    if TOPIC_CLUSTERING == "incremental" and region:
+        labels, cluster_keywords = topic_clusterer.fit_predict(region, df["clean_title"].tolist(), num_clusters)
+        df["cluster"] = labels
+        return df, cluster_keywords
+
     vectorizer = TfidfVectorizer(max_features=1000, ngram_range=(1, 2), stop_words="english")
     X = vectorizer.fit_transform(df["clean_title"])
 
@@ -107,16 +114,17 @@ def analyze_clusters(df, cluster_keywords):
 # -----------------------
 # 6. Sentiment Analysis
 # -----------------------
+@timed
 def add_sentiment(df):
-    df["sentiment"] = df["title"].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
+    # Same TextBlob polarity as before, but each distinct title is only scored once (see title_sentiment.py)
+    df["sentiment"] = sentiment_memo.polarities(df["title"].tolist())
     return df
 
 # -----------------------
 # 7. Generate Ideas with Gemini
 # -----------------------
-def generate_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment):
-    """Generate YouTube video ideas using Gemini LLM."""
-    prompt = f"""
+def build_ideas_prompt(top_keywords, sample_titles, avg_engagement, sentiment):
+    return f"""
 You are a YouTube content strategist who helps creators go viral.
 
 Use the analytics below to generate 5 creative video ideas.
@@ -144,39 +152,131 @@ Example format (keep the same style):
    - Hook: "What if your favorite YouTubers vanished on Halloween night?"
    - Thumbnail: "It Actually Happened... 😱"
 """
-    # 🚨 FIX: Changed model name from 'gemini-pro' to 'gemini-2.5-flash'
-    model = genai.GenerativeModel("gemini-2.5-flash") 
-    response = model.generate_content(prompt)
-    text = response.text.strip()
 
-    # --- Clean markdown formatting just in case ---
+
+def clean_ideas_output(text):
+    """Clean markdown formatting just in case."""
     text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)  # remove bold (** **)
     text = re.sub(r"---+", "", text)              # remove horizontal rules
     text = re.sub(r"^\s*-\s*", "   - ", text, flags=re.MULTILINE)  # uniform dashes
-
     return text
 
+
+def generate_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment, bypass_cache=False):
+    """Generate YouTube video ideas using Gemini LLM (cached per prompt, see gemini_api.py)."""
+    prompt = build_ideas_prompt(top_keywords, sample_titles, avg_engagement, sentiment)
+    # 🚨 FIX: Changed model name from 'gemini-pro' to 'gemini-2.5-flash'
+    text = generate_text(prompt, model_name="gemini-2.5-flash", bypass_cache=bypass_cache,
+                         prompt_kind="ideas").strip()
+    return clean_ideas_output(text)
+
+
+class IdeasStreamCleaner:
+    """
+    Applies clean_ideas_output() to a stream of chunks, a line at a time.
+    A line is only released once it can no longer be merged into the
+    "uniform dashes" rule by what follows (blank and lone-dash lines wait),
+    and trailing whitespace waits for more text, so the concatenated output
+    equals cleaning the full text at once.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._owed = ""  # whitespace after the last released line
+        self._started = False
+
+    @staticmethod
+    def _is_settled(line):
+        line = re.sub(r"---+", "", re.sub(r"\*\*(.*?)\*\*", r"\1", line)).strip()
+        return line not in ("", "-")
+
+    def _emit(self, raw):
+        if not self._started:
+            raw = raw.lstrip()
+        body = raw.rstrip()
+        if not body:
+            return ""
+        text = self._owed + clean_ideas_output(body)
+        self._owed = raw[len(body):]
+        self._started = True
+        return text
+
+    def feed(self, chunk):
+        """Add a raw chunk; returns the cleaned text that is now safe to show."""
+        self._pending += chunk
+        cut = 0
+        line_start = 0
+        for end in range(len(self._pending)):
+            if self._pending[end] == "\n":
+                if self._is_settled(self._pending[line_start:end]):
+                    cut = end + 1
+                line_start = end + 1
+        if not cut:
+            return ""
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(ready)
+
+    def finish(self):
+        """Flush the last line at the end of the stream."""
+        ready, self._pending = self._pending, ""
+        return self._emit(ready)
+
+
+def stream_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment, bypass_cache=False):
+    """Like generate_ai_ideas_with_gemini(), but yields the cleaned ideas chunk by chunk."""
+    prompt = build_ideas_prompt(top_keywords, sample_titles, avg_engagement, sentiment)
+    cleaner = IdeasStreamCleaner()
+    for chunk in stream_text(prompt, model_name="gemini-2.5-flash", bypass_cache=bypass_cache,
+                             prompt_kind="ideas"):
+        text = cleaner.feed(chunk)
+        if text:
+            yield text
+    text = cleaner.finish()
+    if text:
+        yield text
+
 # -----------------------
 # 8. Full Suggestion Pipeline
 # -----------------------
-def suggest_content(region="US", max_results=50):
+def _report(progress, stage):
+    if progress is not None:
+        progress(stage)
+
+
+def analyze_trending_topics(region="US", max_results=50, progress=None):
+    """
+    Fetch, score, and cluster the chart; returns the inputs for the Gemini prompt.
+    `progress(stage)` is called as each stage starts (used by the job API).
+    """
     print("📊 Fetching trending videos...")
+    _report(progress, "fetching")
     df = fetch_trending_videos(region, max_results)
     df = compute_engagement_metrics(df)
+    _report(progress, "sentiment")
     df = add_sentiment(df)
 
     print("🤖 Clustering trending topics...")
-    df, cluster_keywords = cluster_titles(df, num_clusters=5)
+    _report(progress, "clustering")
+    df, cluster_keywords = cluster_titles(df, num_clusters=5, region=region)
 
     print("🔍 Analyzing cluster performance...")
+    _report(progress, "analyzing")
     top_cluster_id, cluster_keywords, avg_engagement = analyze_clusters(df, cluster_keywords)
 
     top_keywords = cluster_keywords[top_cluster_id]
     sentiment = df["sentiment"].mean()
     sample_titles = df[df["cluster"] == top_cluster_id]["title"].head(5).tolist()
+    return df, top_keywords, sample_titles, avg_engagement, sentiment
+
+
+@profiled
+def suggest_content(region="US", max_results=50, bypass_cache=False, progress=None):
+    df, top_keywords, sample_titles, avg_engagement, sentiment = analyze_trending_topics(region, max_results, progress)
 
     print("💡 Generating AI-powered content ideas with Gemini...")
-    ai_output = generate_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment)
+    _report(progress, "generating")
+    ai_output = generate_ai_ideas_with_gemini(top_keywords, sample_titles, avg_engagement, sentiment,
+                                              bypass_cache=bypass_cache)
 
     print("\n✅ Suggested YouTube Ideas:\n")
     print(ai_output)
@@ -0,0 +1,245 @@
+"""
+gemini_api.py
+Shared access layer for Gemini text generation.
+Responses are cached by (model name, normalized prompt), so re-running the
+creator tools on an unchanged trending snapshot skips the multi-second call.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from cache import TwoTierCache
+from client_pool import ResourcePool
+from metrics import record_gemini_usage, stage
+from transport import TRANSPORT_MODE, prompt_kind as tagged, wrap_model
+
+# -----------------------
+# 1. Config & Cache Setup
+# -----------------------
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Alternative API root (e.g. the local stub in benchmarks/stub_server.py); talked to over REST
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# Concurrent Gemini calls per model; more callers wait for a free handle
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", 4))
+GEMINI_POOL_WAIT_TIMEOUT = float(os.getenv("GEMINI_POOL_WAIT_TIMEOUT", 60))
+# Per-request timeout passed to generate_content
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 120))
+
+gemini_cache = TwoTierCache(
+    namespace="gemini_responses",
+    ttl=int(os.getenv("GEMINI_CACHE_TTL", 3600)),
+    stale_ttl=0,
+    max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", 128)),
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "bypassed": 0,
+    "latency_saved_seconds": 0.0,
+}
+
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def _genai():
+    """Import and configure google.generativeai on first use (the import alone takes ~0.7s)."""
+    global _configured
+    import google.generativeai as genai
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                else:
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _configured = True
+    return genai
+
+
+_pools_lock = threading.Lock()
+_model_pools = {}  # model name -> ResourcePool of GenerativeModel handles
+
+
+def model_pool(model_name):
+    """The pool of reusable GenerativeModel handles for `model_name`."""
+    with _pools_lock:
+        pool = _model_pools.get(model_name)
+        if pool is None:
+            pool = _model_pools[model_name] = ResourcePool(
+                f"gemini:{model_name}",
+                lambda: wrap_model(model_name, lambda: _genai().GenerativeModel(model_name)),
+                GEMINI_POOL_SIZE, wait_timeout=GEMINI_POOL_WAIT_TIMEOUT
+            )
+        return pool
+
+
+def gemini_pool_stats():
+    with _pools_lock:
+        pools = list(_model_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so cosmetic differences don't change the cache key."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def prompt_cache_key(model_name, prompt):
+    digest = hashlib.sha256(f"{model_name}\n{normalize_prompt(prompt)}".encode()).hexdigest()
+    return (model_name, digest)
+
+
+# -----------------------
+# 2. Cached generation
+# -----------------------
+def generate_text(prompt, model_name=GEMINI_MODEL, bypass_cache=False, prompt_kind=None):
+    """
+    Return Gemini's response text for `prompt`.
+    Cached responses are reused until GEMINI_CACHE_TTL expires; pass
+    bypass_cache=True to force a fresh call (which then refreshes the cache).
+    `prompt_kind` names the prompt template ("coach", "ideas"); replays
+    only fall back to recordings of the same kind (see transport.py).
+    """
+    key = prompt_cache_key(model_name, prompt)
+
+    def call_gemini():
+        start = time.perf_counter()
+        # Set here, not by the caller: a stale-cache refresh runs this on another thread
+        with stage("gemini_generate"), tagged(prompt_kind), model_pool(model_name).acquire() as model:
+            response = model.generate_content(prompt, request_options={"timeout": GEMINI_TIMEOUT})
+        record_gemini_usage(model_name, "generate", getattr(response, "usage_metadata", None))
+        return {"text": response.text, "latency": time.perf_counter() - start}
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        if bypass_cache:
+            _stats["bypassed"] += 1
+
+    if bypass_cache:
+        result = call_gemini()
+        gemini_cache.set(key, result)
+        return result["text"]
+
+    called = []
+
+    def fetch():
+        called.append(True)
+        return call_gemini()
+
+    result = gemini_cache.get_or_fetch(key, fetch)
+    if not called:
+        with _stats_lock:
+            _stats["latency_saved_seconds"] += result["latency"]
+    return result["text"]
+
+
+def stream_text(prompt, model_name=GEMINI_MODEL, bypass_cache=False, prompt_kind=None):
+    """
+    Yield Gemini's response text chunk by chunk as it is generated.
+    A cached response is yielded as a single chunk; a completed stream is
+    written back to the cache like generate_text() would. `prompt_kind` as
+    in generate_text().
+    """
+    key = prompt_cache_key(model_name, prompt)
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        if bypass_cache:
+            _stats["bypassed"] += 1
+
+    if not bypass_cache:
+        cached = gemini_cache.get_fresh(key)
+        if cached is not None:
+            with _stats_lock:
+                _stats["latency_saved_seconds"] += cached["latency"]
+            yield cached["text"]
+            return
+
+    start = time.perf_counter()
+    parts = []
+    usage = None
+    # The handle stays borrowed while the stream is being read
+    with stage("gemini_stream"), model_pool(model_name).acquire() as model:
+        # Only around the call: the context must not stay changed across the yields below
+        with tagged(prompt_kind):
+            chunks = model.generate_content(prompt, stream=True, request_options={"timeout": GEMINI_TIMEOUT})
+        for chunk in chunks:
+            # Each chunk carries the running totals; the last one has the whole call's
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            text = chunk.text
+            if text:
+                parts.append(text)
+                yield text
+    record_gemini_usage(model_name, "stream", usage)
+
+    gemini_cache.set(key, {"text": "".join(parts), "latency": time.perf_counter() - start})
+
+
+def gemini_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["latency_saved_seconds"] = round(stats["latency_saved_seconds"], 3)
+    stats.update(gemini_cache.stats())
+    return stats
+
+
+# -----------------------
+# 3. Async generation (ASGI server)
+# -----------------------
+# Awaited on the SDK's gRPC async client. The REST transport used with
+# GEMINI_API_ENDPOINT has no async client, and recording/replaying goes
+# through the pooled handles, so those cases run generate_text on a thread.
+ASYNC_UPSTREAM = not GEMINI_API_ENDPOINT and TRANSPORT_MODE == "off"
+
+_async_models = {}  # model name -> (GenerativeModel, asyncio.Semaphore of GEMINI_POOL_SIZE)
+
+
+def _async_model(model_name):
+    entry = _async_models.get(model_name)
+    if entry is None:
+        entry = _async_models[model_name] = (
+            _genai().GenerativeModel(model_name), asyncio.Semaphore(GEMINI_POOL_SIZE)
+        )
+    return entry
+
+
+async def generate_text_async(prompt, model_name=GEMINI_MODEL, bypass_cache=False, prompt_kind=None):
+    """generate_text() for the event loop: same cache, the Gemini call is awaited."""
+    if not ASYNC_UPSTREAM:
+        return await asyncio.to_thread(generate_text, prompt, model_name, bypass_cache, prompt_kind)
+
+    key = prompt_cache_key(model_name, prompt)
+    with _stats_lock:
+        _stats["calls"] += 1
+        if bypass_cache:
+            _stats["bypassed"] += 1
+
+    if not bypass_cache:
+        cached = gemini_cache.get_fresh(key)
+        if cached is not None:
+            with _stats_lock:
+                _stats["latency_saved_seconds"] += cached["latency"]
+            return cached["text"]
+
+    start = time.perf_counter()
+    model, slots = _async_model(model_name)
+    # Same concurrency bound per model as the threaded pool
+    async with slots:
+        with stage("gemini_generate"):
+            response = await model.generate_content_async(prompt, request_options={"timeout": GEMINI_TIMEOUT})
+    record_gemini_usage(model_name, "generate", getattr(response, "usage_metadata", None))
+    gemini_cache.set(key, {"text": response.text, "latency": time.perf_counter() - start})
+    return response.text
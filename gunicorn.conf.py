@@ -0,0 +1,41 @@
+"""
+gunicorn.conf.py
+gunicorn settings for `gunicorn -c gunicorn.conf.py "wsgi:create_app()"`.
+Every value can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 8000)}")
+
+# Processes for the CPU-bound analyzers (one GIL each), threads for requests
+# waiting on YouTube / Gemini
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count() + 1, 8)))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Import and warm everything once in the master, then fork (see wsgi.py)
+preload_app = True
+
+# Above GEMINI_TIMEOUT (120s), so a slow Gemini call is not killed as a hung worker
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 150))
+# On SIGTERM/SIGHUP workers finish in-flight requests for this long
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers now and then to bound memory growth (model caches, pandas)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.start_collector_once()
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.shutdown()
@@ -0,0 +1,231 @@
+"""
+jobs.py
+Background job runner for slow ML/LLM pipelines (creator suggestions).
+Submitting returns a job id right away; the work runs on a small bounded
+thread pool and callers poll or subscribe for per-stage progress and the
+result, so Flask request threads stay free for the fast endpoints.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Jobs queued or running at once; submissions past this are rejected
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", 16))
+# How long finished jobs (and their results) stay retrievable
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 900))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", 256))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit() when the queue-depth limit is reached."""
+
+
+# -----------------------
+# 2. Job
+# -----------------------
+class Job:
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.state = QUEUED
+        self.stage = None
+        self.stages = []  # [{"stage", "started_at"}]
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.version = 0  # bumped on every change, for subscribers
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if self.started_at is not None:
+            end = self.finished_at or time.time()
+            data["queued_seconds"] = round(self.started_at - self.submitted_at, 3)
+            data["run_seconds"] = round(end - self.started_at, 3)
+        if include_result and self.state == DONE:
+            data["result"] = self.result
+        return data
+
+
+# -----------------------
+# 3. Job Manager
+# -----------------------
+class JobManager:
+    """
+    Runs `fn(*args, progress=callback, **kwargs)` jobs on `workers` threads.
+    `progress(stage)` records the stage a job has reached. At most `max_queue`
+    jobs may be queued or running; finished jobs are kept for `retention`
+    seconds (and at most `max_retained` of them).
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE, retention=JOB_RESULT_TTL,
+                 max_retained=JOB_MAX_RETAINED):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.max_retained = max_retained
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # job_id -> Job, in submission order
+        self._active = 0
+        self._closed = False
+        self._changed = threading.Condition()
+        self._counters = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "expired": 0,
+        }
+        # A forked worker (gunicorn --preload) inherits none of the pool's threads
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._changed = threading.Condition()
+
+    def submit(self, kind, fn, *args, params=None, **kwargs):
+        """Queue a job and return its id. Raises JobQueueFull when at capacity."""
+        job = Job(kind, params or {})
+        with self._changed:
+            self._purge()
+            if self._closed:
+                self._counters["rejected"] += 1
+                raise JobQueueFull("Shutting down; no new jobs accepted")
+            if self._active >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise JobQueueFull(f"{self._active} jobs already queued or running (limit {self.max_queue})")
+            self._active += 1
+            self._counters["submitted"] += 1
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _update(self, job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _run(self, job, fn, args, kwargs):
+        self._update(job, state=RUNNING, started_at=time.time())
+
+        def progress(stage):
+            with self._changed:
+                job.stages.append({"stage": stage, "started_at": time.time()})
+            self._update(job, stage=stage)
+
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            with self._changed:
+                self._active -= 1
+                self._counters["failed"] += 1
+            self._update(job, state=FAILED, error=str(e), finished_at=time.time())
+            return
+        with self._changed:
+            self._active -= 1
+            self._counters["completed"] += 1
+        self._update(job, state=DONE, result=result, finished_at=time.time())
+
+    def _purge(self):
+        # Caller holds self._changed
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_retained
+        for job in finished:
+            if excess > 0 or now - job.finished_at > self.retention:
+                del self._jobs[job.id]
+                self._counters["expired"] += 1
+                excess -= 1
+
+    def get(self, job_id, include_result=True):
+        """Return the job as a dict, or None if it is unknown or expired."""
+        with self._changed:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return job.to_dict(include_result) if job else None
+
+    def updates(self, job_id, timeout=None):
+        """
+        Yield the job dict each time it changes, until it finishes.
+        Stops early (yielding nothing more) after `timeout` seconds without a change.
+        """
+        seen = -1
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if job.version == seen and not self._changed.wait_for(lambda: job.version != seen, timeout):
+                    return
+                seen = job.version
+                data = job.to_dict()
+            yield data
+            if data["state"] in (DONE, FAILED):
+                return
+
+    def shutdown(self, timeout=None):
+        """
+        Stop accepting jobs and wait up to `timeout` seconds for queued and
+        running ones to finish. Returns False if some were abandoned.
+        """
+        with self._changed:
+            self._closed = True
+            finished = self._changed.wait_for(lambda: self._active == 0, timeout)
+        self._pool.shutdown(wait=finished, cancel_futures=True)
+        return finished
+
+    def stats(self):
+        with self._changed:
+            counters = dict(self._counters)
+            states = [job.state for job in self._jobs.values()]
+            active = self._active
+        counters.update({
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "retention_seconds": self.retention,
+            "active": active,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+            "retained": len(states),
+        })
+        return counters
+
+
+job_manager = JobManager()
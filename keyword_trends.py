@@ -0,0 +1,246 @@
+"""
+keyword_trends.py
+Streaming, bounded-memory keyword statistics across regions and time.
+
+Every freshly fetched chart snapshot is fed in (from the snapshot writer
+thread). Keywords are the same ones analyze_keywords counts: letters only,
+lowercased, stopwords and words of two letters or fewer dropped.
+
+Counts live in fixed-size Space-Saving summaries (one global, one per region)
+with exponential time decay, so the top keywords reflect roughly the last
+couple of half-lives no matter how many snapshots have been seen. Each
+keyword keeps two decayed counts, a slow one (the trend) and a fast one
+(the last few hours); their difference is the keyword's velocity.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from stopwords_en import ENGLISH_STOP_WORDS
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+KEYWORD_CAPACITY = int(os.getenv("KEYWORD_CAPACITY", 2000))
+KEYWORD_REGION_CAPACITY = int(os.getenv("KEYWORD_REGION_CAPACITY", 500))
+KEYWORD_MAX_REGIONS = int(os.getenv("KEYWORD_MAX_REGIONS", 120))
+KEYWORD_HALF_LIFE_HOURS = float(os.getenv("KEYWORD_HALF_LIFE_HOURS", 24))
+KEYWORD_FAST_HALF_LIFE_HOURS = float(os.getenv("KEYWORD_FAST_HALF_LIFE_HOURS", 3))
+# A snapshot stands for the time since the region's previous one, up to this long
+KEYWORD_MAX_GAP_SECONDS = float(os.getenv("KEYWORD_MAX_GAP_SECONDS", 3600))
+KEYWORD_FIRST_GAP_SECONDS = float(os.getenv("KEYWORD_FIRST_GAP_SECONDS", 300))
+
+NON_LETTERS = re.compile(r"[^a-zA-Z\s]")
+
+
+def title_keywords(title):
+    """Keywords of one title, exactly as analyze_keywords splits them."""
+    return [word for word in NON_LETTERS.sub("", title or "").lower().split()
+            if word not in ENGLISH_STOP_WORDS and len(word) > 2]
+
+
+# -----------------------
+# 2. Decayed Space-Saving summary
+# -----------------------
+class DecayedSpaceSaving:
+    """
+    Space-Saving heavy hitters over exponentially decayed weights.
+
+    At most `capacity` keys are tracked. An untracked key replaces the
+    smallest counter and inherits its count as `error` (an upper bound on
+    how much the key is overestimated), which is what keeps memory fixed.
+
+    Decay uses forward decay: a weight added at time t is stored scaled by
+    exp(rate * (t - landmark)), so adding is O(1) and every counter decays
+    by the same factor at read time. The landmark is moved forward (and the
+    counters rescaled) before the scale factors get large.
+
+    Each update also covers a `span` of time; counts are read back divided
+    by the decayed total span, i.e. as time-weighted averages, so a summary
+    that has only seen a few hours isn't read as everything rising.
+    """
+
+    def __init__(self, capacity, half_life, fast_half_life):
+        self.capacity = capacity
+        self.rate = math.log(2) / half_life
+        self.fast_rate = math.log(2) / fast_half_life
+        self.landmark = None
+        self.counters = {}  # key -> [slow, fast, error], scaled to the landmark
+        self.coverage = [0.0, 0.0]  # decayed total span, slow and fast
+
+    def _rebase(self, t):
+        if self.landmark is None:
+            self.landmark = t
+            return
+        age = t - self.landmark
+        if max(self.rate, self.fast_rate) * age < 30:
+            return
+        slow, fast = math.exp(-self.rate * age), math.exp(-self.fast_rate * age)
+        for counter in self.counters.values():
+            counter[0] *= slow
+            counter[1] *= fast
+            counter[2] *= slow
+        self.coverage[0] *= slow
+        self.coverage[1] *= fast
+        self.landmark = t
+
+    def update(self, weights, t, span):
+        """Add {key: weight} observed at time t (seconds), covering `span` seconds."""
+        self._rebase(t)
+        slow_scale = math.exp(self.rate * (t - self.landmark))
+        fast_scale = math.exp(self.fast_rate * (t - self.landmark))
+        self.coverage[0] += span * slow_scale
+        self.coverage[1] += span * fast_scale
+
+        new = []
+        for key, weight in weights.items():
+            counter = self.counters.get(key)
+            if counter is None:
+                new.append((weight, key))
+            else:
+                counter[0] += weight * slow_scale
+                counter[1] += weight * fast_scale
+
+        # Heaviest newcomers first; once full, each one replaces the current minimum
+        new.sort(reverse=True)
+        heap = None
+        for weight, key in new:
+            slow, fast, error = weight * slow_scale, weight * fast_scale, 0.0
+            if len(self.counters) >= self.capacity:
+                if heap is None:
+                    heap = [(counter[0], evictable) for evictable, counter in self.counters.items()]
+                    heapq.heapify(heap)
+                error, evicted = heapq.heappop(heap)
+                del self.counters[evicted]
+                slow += error
+            self.counters[key] = [slow, fast, error]
+            if heap is not None:
+                heapq.heappush(heap, (slow, key))
+
+    def entries(self):
+        """Yield (key, slow, fast, error) as decayed averages over the covered time."""
+        if not self.coverage[0]:
+            return
+        slow_total, fast_total = self.coverage
+        for key, (slow, fast, error) in self.counters.items():
+            yield key, slow / slow_total, fast / fast_total, error / slow_total
+
+
+# -----------------------
+# 3. Keyword trends engine
+# -----------------------
+class KeywordTrends:
+    """
+    Global and per-region keyword heavy hitters, fed one chart snapshot at a
+    time.
+
+    A snapshot counts as the share of its titles mentioning each keyword,
+    held for the time since that region's previous snapshot. That makes a
+    keyword's `presence` its time-weighted, decayed average of mentions per
+    100 trending titles (averaged over regions for the global view), however
+    often or with however many items a chart was fetched. `recent` is the
+    same over the fast half-life, and `velocity` = recent - presence (less the
+    Space-Saving error), positive for rising keywords.
+    """
+
+    def __init__(self, capacity=KEYWORD_CAPACITY, region_capacity=KEYWORD_REGION_CAPACITY,
+                 half_life_hours=KEYWORD_HALF_LIFE_HOURS, fast_half_life_hours=KEYWORD_FAST_HALF_LIFE_HOURS,
+                 max_regions=KEYWORD_MAX_REGIONS):
+        self.region_capacity = region_capacity
+        self.half_life = half_life_hours * 3600
+        self.fast_half_life = fast_half_life_hours * 3600
+        self.max_regions = max_regions
+
+        self._global = DecayedSpaceSaving(capacity, self.half_life, self.fast_half_life)
+        self._regions = {}       # region -> DecayedSpaceSaving
+        self._last_seen = {}     # region -> captured_at of its previous snapshot
+        self._lock = threading.Lock()
+        self._counters = {"snapshots": 0, "skipped_category_charts": 0, "titles": 0}
+
+    def observe(self, region, category_id, items, captured_at=None):
+        """
+        Feed one snapshot (a SnapshotWriter subscriber). Genre charts
+        overlap the all-category chart, so only the latter is counted.
+        """
+        if category_id:
+            with self._lock:
+                self._counters["skipped_category_charts"] += 1
+            return
+        titles = [item.get("snippet", {}).get("title") for item in items]
+        self.observe_titles(region, titles, captured_at)
+
+    def observe_titles(self, region, titles, captured_at=None):
+        captured_at = captured_at or time.time()
+        if not titles:
+            return
+        mentions = Counter()
+        for title in titles:
+            mentions.update(title_keywords(title))
+
+        with self._lock:
+            previous = self._last_seen.get(region)
+            if previous is not None and captured_at <= previous:
+                return  # out of order or duplicate; its time is already covered
+            gap = KEYWORD_FIRST_GAP_SECONDS if previous is None else min(captured_at - previous,
+                                                                         KEYWORD_MAX_GAP_SECONDS)
+            self._last_seen[region] = captured_at
+            weight = 100 * gap / len(titles)
+            weights = {word: count * weight for word, count in mentions.items()}
+
+            self._global.update(weights, captured_at, gap)
+            summary = self._regions.get(region)
+            if summary is None and len(self._regions) < self.max_regions:
+                summary = self._regions[region] = DecayedSpaceSaving(
+                    self.region_capacity, self.half_life, self.fast_half_life
+                )
+            if summary is not None:
+                summary.update(weights, captured_at, gap)
+            self._counters["snapshots"] += 1
+            self._counters["titles"] += len(titles)
+
+    def top(self, k=15, region=None, order="presence"):
+        """
+        The k strongest (order="presence") or fastest-rising (order="velocity")
+        keywords, globally or for one region.
+        """
+        with self._lock:
+            summary = self._global if region is None else self._regions.get(region)
+            if summary is None:
+                return []
+            rows = []
+            for word, slow, fast, error in summary.entries():
+                guaranteed = slow - error
+                rows.append({
+                    "keyword": word,
+                    "presence": round(slow, 3),
+                    "recent": round(fast, 3),
+                    # Compare against the guaranteed part, so a newcomer's inherited error doesn't hide it
+                    "velocity": round(fast - guaranteed, 3),
+                    "error": round(error, 3),
+                })
+        key = "velocity" if order == "velocity" else "presence"
+        return heapq.nlargest(k, rows, key=lambda row: row[key])
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters.update({
+                "tracked_global": len(self._global.counters),
+                "regions": len(self._regions),
+                "tracked_regional": sum(len(summary.counters) for summary in self._regions.values()),
+                "half_life_hours": self.half_life / 3600,
+                "fast_half_life_hours": self.fast_half_life / 3600,
+            })
+        return counters
+
+
+keyword_trends = KeywordTrends()
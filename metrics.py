@@ -0,0 +1,193 @@
+"""
+metrics.py
+In-process counters and latency histograms, exposed in the Prometheus text
+format on /metrics.
+
+- stage_duration_seconds{stage}: time spent in each pipeline stage (upstream
+  fetch, each analyzer, clustering, sentiment, Gemini, serialization).
+  Record with `with stage("name"):` or the @timed decorator.
+- http_request_duration_seconds{endpoint,method,status}: whole requests.
+- youtube_quota_units_total{method}: Data API quota spent (videos.list = 1).
+- gemini_tokens_total{model,type}: prompt and candidate tokens, from the
+  responses' usage metadata; gemini_requests_total{model,mode}.
+
+Recording is a perf_counter() pair, a bisect and a locked increment, so it
+stays on for every request; the text is only built when /metrics is read.
+"""
+
+import bisect
+import functools
+import threading
+from time import perf_counter
+
+# -----------------------
+# 1. Metric types
+# -----------------------
+# Analyzers take microseconds, Gemini calls take seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing total per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Observation counts per bucket (plus sum and count) per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (+ overflow), sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels):
+        """(count, sum) for one label combination."""
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series, key=lambda s: s[0]):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_label_text(self.labelnames, labels)} {count}"
+
+
+def render_metrics():
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------
+# 2. The app's metrics
+# -----------------------
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to build each HTTP response.",
+                            ("endpoint", "method", "status"))
+YOUTUBE_QUOTA_UNITS = Counter("youtube_quota_units_total", "YouTube Data API quota units spent.", ("method",))
+GEMINI_REQUESTS = Counter("gemini_requests_total", "Gemini generate calls made (cache misses).", ("model", "mode"))
+GEMINI_TOKENS = Counter("gemini_tokens_total", "Gemini tokens, from response usage metadata.", ("model", "type"))
+
+# videos().list costs 1 unit per call, whatever the part or page size
+YOUTUBE_QUOTA_COST = {"videos.list": 1}
+
+
+class stage:
+    """Context manager timing one stage into stage_duration_seconds."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(perf_counter() - self.start, self.name)
+        return False
+
+
+def timed(fn):
+    """Decorator: time every call of `fn` as the stage named after it."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            STAGE_SECONDS.observe(perf_counter() - start, name)
+
+    return wrapper
+
+
+def record_youtube_call(method="videos.list"):
+    YOUTUBE_QUOTA_UNITS.inc(method, amount=YOUTUBE_QUOTA_COST.get(method, 1))
+
+
+def record_gemini_usage(model_name, mode, usage):
+    """Count one Gemini call and the tokens in its usage metadata (None if the response had none)."""
+    GEMINI_REQUESTS.inc(model_name, mode)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    candidate_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    if prompt_tokens:
+        GEMINI_TOKENS.inc(model_name, "prompt", amount=prompt_tokens)
+    if candidate_tokens:
+        GEMINI_TOKENS.inc(model_name, "candidates", amount=candidate_tokens)
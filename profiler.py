@@ -0,0 +1,254 @@
+"""
+profiler.py
+Opt-in profiling of live requests.
+
+A request is profiled when it carries the admin token (header
+`X-Profile: <ADMIN_TOKEN>` or `?profile=<ADMIN_TOKEN>`), or at random for
+a PROFILE_SAMPLE_RATE fraction of requests. Only functions marked
+@profiled are captured (the /get_trending_data handler, suggest_content,
+analyze_trends_with_gemini), one per request.
+
+Two modes (header `X-Profile-Mode` or `?profile_mode=`):
+    sample   (default) a background thread samples the handler thread's
+             stack every PROFILE_INTERVAL_MS; stored as collapsed stacks
+             ("outer;inner;leaf count", what flamegraph.pl and speedscope read).
+    cprofile deterministic cProfile; stored as pstats (text report, or the
+             raw file for snakeviz/pstats).
+
+The last PROFILE_MAX_STORED profiles are kept in trends.db and served
+from /admin/profiles; every gunicorn worker writes to and reads from the
+same table, so an X-Profile-Id can be fetched from whichever worker serves
+the lookup. With no ADMIN_TOKEN and a zero sample rate, @profiled
+returns functions unchanged; otherwise an unprofiled call costs one
+thread-local lookup.
+"""
+
+import cProfile
+import functools
+import hmac
+import io
+import marshal
+import os
+import pstats
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from snapshot_store import TRENDS_DB_PATH
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", 50))
+
+PROFILING_AVAILABLE = bool(ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+MODES = ("sample", "cprofile")
+
+
+def token_matches(candidate):
+    return bool(ADMIN_TOKEN) and bool(candidate) and hmac.compare_digest(candidate, ADMIN_TOKEN)
+
+
+# -----------------------
+# 2. Per-request switch
+# -----------------------
+_request = threading.local()  # .mode: None or a MODES entry; .profile_id: id of the profile taken
+
+
+def begin_request(token=None, mode=None):
+    """
+    Decide whether this request is profiled (call at the start of every
+    request). Returns the mode, or None.
+    """
+    _request.profile_id = None
+    if token_matches(token):
+        _request.mode = mode if mode in MODES else "sample"
+    elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        _request.mode = "sample"
+    else:
+        _request.mode = None
+    return _request.mode
+
+
+def end_request():
+    """Clear the switch (threads are reused across requests). Returns the id of the profile taken, if any."""
+    profile_id = getattr(_request, "profile_id", None)
+    _request.mode = None
+    _request.profile_id = None
+    return profile_id
+
+
+# -----------------------
+# 3. Profilers
+# -----------------------
+class StackSampler:
+    """
+    Samples one thread's Python stack on a background thread into
+    collapsed-stack counts. Frames from `root` outwards (the server
+    machinery the profiled call runs under) are left out.
+    """
+
+    def __init__(self, thread_id, interval, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """
+    The most recent profiles, newest first, in a trends.db table shared by
+    every worker (ids come from SQLite, so they are unique across processes).
+    """
+
+    COLUMNS = ("id", "function", "mode", "started_at", "duration_ms", "samples")
+
+    def __init__(self, max_entries=PROFILE_MAX_STORED, db_path=TRENDS_DB_PATH):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    function TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    duration_ms REAL NOT NULL,
+                    samples INTEGER,
+                    data BLOB NOT NULL
+                )
+                """
+            )
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread, as in snapshot_store.py
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, name, mode, started, duration, data, samples=None):
+        conn = self._connect()
+        with conn:
+            profile_id = conn.execute(
+                "INSERT INTO profiles (function, mode, started_at, duration_ms, samples, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, mode, started, round(duration * 1000, 2), samples, data)
+            ).lastrowid
+            conn.execute("DELETE FROM profiles WHERE id <= ?", (profile_id - self.max_entries,))
+        return profile_id
+
+    def list(self):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM profiles ORDER BY id DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def get(self, profile_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)}, data FROM profiles WHERE id = ?", (profile_id,)
+        ).fetchone()
+        return dict(zip(self.COLUMNS + ("data",), row)) if row else None
+
+
+profile_store = ProfileStore()
+
+
+def pstats_text(data, limit=40):
+    """A cumulative-time pstats report from a stored cprofile profile."""
+    stream = io.StringIO()
+    stats = pstats.Stats(stream=stream)
+    stats.stats = marshal.loads(data)
+    stats.get_top_level_stats()
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def _run_profiled(fn, mode, args, kwargs):
+    started = time.time()
+    start = time.perf_counter()
+    if mode == "cprofile":
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already active in this thread
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            profile.create_stats()
+            _request.profile_id = profile_store.add(
+                fn.__qualname__, mode, started, time.perf_counter() - start, marshal.dumps(profile.stats)
+            )
+    sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000, root=sys._getframe())
+    sampler.start()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sampler.stop()
+        _request.profile_id = profile_store.add(
+            fn.__qualname__, mode, started, time.perf_counter() - start, sampler.collapsed(), sampler.samples
+        )
+
+
+def profiled(fn):
+    """Profile calls of `fn` made while the current request has profiling switched on."""
+    if not PROFILING_AVAILABLE:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        mode = getattr(_request, "mode", None)
+        if mode is None:
+            return fn(*args, **kwargs)
+        # One profile per request; nested @profiled calls are part of this one
+        _request.mode = None
+        return _run_profiled(fn, mode, args, kwargs)
+
+    return wrapper
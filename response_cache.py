@@ -0,0 +1,248 @@
+"""
+response_cache.py
+Cheap repeat responses for the analytics endpoints.
+
+- `fields=` projection, in the YouTube Data API's partial-response syntax
+  (e.g. fields=videos(video_id,title),keyword_analysis).
+- gzip, or brotli when the `brotli` package is installed, negotiated from
+  Accept-Encoding.
+- Rendered bodies are cached per (request variant, snapshot hash). The strong
+  ETag is derived from the snapshot hash and the rendered bytes, so a client
+  revalidating an unchanged chart gets a 304 without the payload being
+  rebuilt, re-encoded or sent.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", 256))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+
+# Kept in every projection so clients can always check the outcome
+ALWAYS_INCLUDED = ("success", "error")
+
+
+class FieldsError(ValueError):
+    """Raised for a malformed `fields=` expression."""
+
+
+# -----------------------
+# 2. Field projection
+# -----------------------
+def parse_fields(spec):
+    """
+    Parse a partial-response expression into a selection tree.
+    'a,b/c,d(e,f/g)' -> {"a": True, "b": {"c": True}, "d": {"e": True, "f": {"g": True}}}
+    True selects a whole value; "*" matches every key of an object.
+    """
+    tokens = []
+    name = ""
+    for char in spec.replace(" ", ""):
+        if char in ",/()":
+            if name:
+                tokens.append(name)
+                name = ""
+            tokens.append(char)
+        else:
+            name += char
+    if name:
+        tokens.append(name)
+
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take(expected=None):
+        nonlocal position
+        token = peek()
+        if token is None or (expected is not None and token != expected) or \
+                (expected is None and token in ",/()"):
+            raise FieldsError(f"Invalid fields expression near {token or 'end'!r}: {spec!r}")
+        position += 1
+        return token
+
+    def selection_list():
+        tree = {}
+        while True:
+            merge(tree, item())
+            if peek() != ",":
+                return tree
+            take(",")
+
+    def item():
+        path = [take()]
+        while peek() == "/":
+            take("/")
+            path.append(take())
+        leaf = True
+        if peek() == "(":
+            take("(")
+            leaf = selection_list()
+            take(")")
+        for key in reversed(path):
+            leaf = {key: leaf}
+        return leaf
+
+    tree = selection_list()
+    if position != len(tokens):
+        raise FieldsError(f"Invalid fields expression near {peek()!r}: {spec!r}")
+    return tree
+
+
+def merge(tree, other):
+    for key, sub in other.items():
+        if key not in tree or sub is True:
+            tree[key] = sub
+        elif tree[key] is not True:
+            merge(tree[key], sub)
+
+
+def project(value, tree):
+    """Keep only the selected parts of a JSON-like value; lists apply the selection to each element."""
+    if tree is True:
+        return value
+    if isinstance(value, list):
+        return [project(element, tree) for element in value]
+    if isinstance(value, dict):
+        projected = {}
+        for key, element in value.items():
+            sub = tree.get(key, tree.get("*"))
+            if sub is not None:
+                projected[key] = project(element, sub)
+        return projected
+    return value
+
+
+def project_payload(payload, fields):
+    """Apply a parsed `fields` tree to a top-level payload, keeping success/error."""
+    if fields is None:
+        return payload
+    tree = dict(fields)
+    for key in ALWAYS_INCLUDED:
+        tree.setdefault(key, True)
+    return project(payload, tree)
+
+
+# -----------------------
+# 3. Rendered responses
+# -----------------------
+def negotiate_encoding(accept_encodings):
+    """Pick 'br', 'gzip' or None from a werkzeug Accept-Encoding header."""
+    if brotli is not None and accept_encodings.quality("br") > 0:
+        return "br"
+    if accept_encodings.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+class RenderedResponse:
+    """One encoded JSON body plus its compressed variants, made on first use."""
+
+    def __init__(self, version, body, mimetype="application/json"):
+        self.version = version
+        self.body = body
+        self.mimetype = mimetype
+        digest = hashlib.sha1(f"{version}|".encode() + body).hexdigest()[:20]
+        self.tag = f"{str(version)[:12]}-{digest}"
+        self._variants = {None: body}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding):
+        """The body for a content coding (None, 'gzip' or 'br')."""
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return None, self.body
+        with self._lock:
+            data = self._variants.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    data = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                else:
+                    data = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+                self._variants[encoding] = data
+        return encoding, data
+
+    def etag(self, encoding):
+        # Each content coding is its own representation, so gets its own strong tag
+        return self.tag if encoding is None else f"{self.tag}-{encoding}"
+
+    def matches(self, if_none_match):
+        """True if If-None-Match names any variant of this body (or is *)."""
+        if if_none_match.star_tag:
+            return True
+        return any(if_none_match.contains(self.etag(encoding)) for encoding in (None, "gzip", "br"))
+
+    def response(self, request, status=200):
+        """
+        Flask response for `request`: compressed as negotiated, and a 304 if
+        the client already has this body. Without a version (the body isn't
+        tied to one snapshot) there is no ETag.
+        """
+        encoding, data = self.variant(negotiate_encoding(request.accept_encodings))
+        headers = {"Vary": "Accept-Encoding"}
+        if self.version is not None:
+            headers["ETag"] = f'"{self.etag(encoding)}"'
+            # Cache, but revalidate every time: unchanged refreshes become 304s
+            headers["Cache-Control"] = "no-cache"
+            if self.matches(request.if_none_match):
+                return Response(status=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(data, status=status, mimetype=self.mimetype, headers=headers)
+
+
+class ResponseCache:
+    """LRU of RenderedResponse by request variant; an entry is reused only for the same version."""
+
+    def __init__(self, max_entries=RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+        counters["brotli"] = brotli is not None
+        return counters
+
+
+response_cache = ResponseCache()
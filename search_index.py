@@ -0,0 +1,381 @@
+"""
+search_index.py
+Inverted indexes for keyword filtering and search.
+
+SnapshotIndex covers one trending chart (a VideoBatch): it is built once per
+chart, cached, and answers token queries as well as the dashboard's
+substring keyword filter (with unchanged results). CorpusIndex covers every video recorded in trends.db,
+deduplicated by video id and updated incrementally as snapshots land; it
+backs /search across regions and days.
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+from dotenv import load_dotenv
+
+from snapshot_store import snapshot_store
+from video_batch import best_thumbnail, parse_count
+
+# -----------------------
+# 1. Config & Tokenizing
+# -----------------------
+load_dotenv()
+
+SNAPSHOT_INDEX_CACHE_SIZE = int(os.getenv("SNAPSHOT_INDEX_CACHE_SIZE", 64))
+# Distinct keyword filters remembered per chart
+KEYWORD_MEMO_SIZE = int(os.getenv("KEYWORD_MEMO_SIZE", 128))
+# How often /search checks trends.db for snapshots it hasn't indexed yet
+CORPUS_REFRESH_INTERVAL = float(os.getenv("CORPUS_REFRESH_INTERVAL", 5))
+# Distinct /search queries whose matches are kept until the next refresh
+QUERY_MEMO_SIZE = int(os.getenv("QUERY_MEMO_SIZE", 256))
+
+TOKEN_RE = re.compile(r"\w+")
+EMPTY = frozenset()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def parse_query(query):
+    """Split a query into (term, is_prefix) pairs; a trailing * marks a prefix term."""
+    terms = []
+    for word in (query or "").split():
+        tokens = tokenize(word)
+        for n, token in enumerate(tokens):
+            terms.append((token, word.endswith("*") and n == len(tokens) - 1))
+    return terms
+
+
+def intersect(sets):
+    """
+    Intersection of several sets, smallest first. A single set is returned
+    as is (it may be an index's own postings: read it, don't modify it).
+    """
+    sets = sorted(sets, key=len)
+    if not sets:
+        return EMPTY
+    if len(sets) == 1:
+        return sets[0]
+    return sets[0].intersection(*sets[1:])
+
+
+# -----------------------
+# 2. Token index
+# -----------------------
+class TokenIndex:
+    """token -> set of document numbers, with AND/OR and prefix queries."""
+
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self._vocabulary = None  # sorted tokens for prefix lookups, rebuilt after changes
+
+    def _add_tokens(self, doc, tokens):
+        for token in set(tokens):
+            self.postings[token].add(doc)
+        self._vocabulary = None
+
+    def _remove_tokens(self, doc, tokens):
+        for token in set(tokens):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.discard(doc)
+                if not docs:
+                    del self.postings[token]
+        self._vocabulary = None
+
+    def vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def term_docs(self, term, prefix=False):
+        if not prefix:
+            return self.postings.get(term, EMPTY)
+        vocabulary = self.vocabulary()
+        docs = set()
+        i = bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            docs |= self.postings[vocabulary[i]]
+            i += 1
+        return docs
+
+    def query_sets(self, query, op="and", prefix=False):
+        """The document sets whose intersection answers the query (one set for op="or")."""
+        terms = parse_query(query)
+        if not terms:
+            return [EMPTY]
+        sets = [self.term_docs(term, prefix or is_prefix) for term, is_prefix in terms]
+        if op == "or":
+            return [set().union(*sets)]
+        return sets
+
+    def match(self, query, op="and", prefix=False):
+        """Documents matching all (op="and") or any (op="or") query terms (read-only)."""
+        return intersect(self.query_sets(query, op, prefix))
+
+
+# -----------------------
+# 3. Per-chart index
+# -----------------------
+class SnapshotIndex(TokenIndex):
+    """
+    Index over one chart's rows (documents are row numbers). Tokens come from
+    titles, descriptions and tags. The dashboard's substring filter is
+    memoized per keyword, since the same chart is filtered again on every
+    request until it changes.
+    """
+
+    def __init__(self, ids, titles, descriptions, tags):
+        super().__init__()
+        self.ids = list(ids)
+        self.titles = list(titles)
+        self.descriptions = list(descriptions)
+        self._lower = {
+            "title": [(title or "").lower() for title in self.titles],
+            "description": [(description or "").lower() for description in self.descriptions],
+        }
+        self._fields = {}  # fields tuple -> joined lowercase texts
+        self._hits = OrderedDict()  # (keyword, fields) -> matching rows
+        self._lock = threading.Lock()
+
+        for row, video_tags in enumerate(tags):
+            tokens = tokenize(self.titles[row]) + tokenize(self.descriptions[row])
+            for tag in video_tags or []:
+                tokens += tokenize(tag)
+            self._add_tokens(row, tokens)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _field_texts(self, fields):
+        """
+        Per-row text of `fields` joined by NUL, so one `in` check covers every
+        field: a keyword without NUL can't match across the join.
+        """
+        with self._lock:
+            texts = self._fields.get(fields)
+            if texts is None:
+                texts = self._fields[fields] = [
+                    "\0".join(parts) for parts in zip(*(self._lower[field] for field in fields))
+                ]
+        return texts
+
+    def rows_containing(self, keyword, fields=("title",)):
+        """
+        Rows (in chart order) where `keyword` is a substring of any of the
+        lowercased `fields` -- exactly what scanning with
+        `keyword in text.lower()` returns, computed once per keyword.
+        """
+        fields = tuple(fields)
+        key = (keyword, fields)
+        with self._lock:
+            rows = self._hits.get(key)
+            if rows is not None:
+                self._hits.move_to_end(key)
+                return list(rows)
+
+        if "\0" in keyword:
+            rows = [row for row in range(len(self))
+                    if any(keyword in self._lower[field][row] for field in fields)]
+        else:
+            texts = self._field_texts(fields)
+            rows = [row for row, text in enumerate(texts) if keyword in text]
+
+        with self._lock:
+            self._hits[key] = rows
+            while len(self._hits) > KEYWORD_MEMO_SIZE:
+                self._hits.popitem(last=False)
+        return list(rows)
+
+    def search(self, query, op="and", prefix=False):
+        """Token query; returns matching rows in chart order."""
+        return sorted(self.match(query, op, prefix))
+
+
+_index_cache = OrderedDict()  # fingerprint -> SnapshotIndex
+_index_cache_lock = threading.Lock()
+
+
+def snapshot_index(batch):
+    """
+    The cached SnapshotIndex for a VideoBatch, built on first use.
+    Charts are re-parsed per request, so entries are found by content
+    (ids, titles, descriptions) rather than by object identity.
+    """
+    fingerprint = hash((tuple(batch.ids), tuple(batch.titles), tuple(batch.descriptions)))
+    with _index_cache_lock:
+        index = _index_cache.get(fingerprint)
+        if index is not None:
+            _index_cache.move_to_end(fingerprint)
+    # A hash collision must not serve another chart's index
+    if index is not None and index.ids == batch.ids and index.titles == batch.titles \
+            and index.descriptions == batch.descriptions:
+        return index
+
+    index = SnapshotIndex(batch.ids, batch.titles, batch.descriptions, batch.tags)
+    with _index_cache_lock:
+        _index_cache[fingerprint] = index
+        while len(_index_cache) > SNAPSHOT_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+# -----------------------
+# 4. Corpus index (trends.db)
+# -----------------------
+class CorpusIndex(TokenIndex):
+    """
+    Every video recorded in the snapshot store, one document per video id
+    (its latest version). refresh() indexes only snapshots added since the
+    last call, and a video's text is re-tokenized only when it changed.
+
+    Region and day filters are inverted lists too (region -> docs, day of
+    last sighting -> docs), so a filtered query is a handful of set
+    operations; term matches are memoized until new snapshots arrive, and
+    results are ranked by views from a precomputed order.
+    """
+
+    def __init__(self, store, refresh_interval=CORPUS_REFRESH_INTERVAL):
+        super().__init__()
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._docs = {}       # video id -> doc number
+        self._text = []       # doc -> (title, description, tags) last indexed
+        self._tokens = []     # doc -> tokens last indexed
+        self._rows = []       # doc -> result row
+        self._views = []      # doc -> latest view count
+        self._seen = []       # doc -> last captured_at
+        self._regions = defaultdict(set)  # region -> docs
+        self._days = defaultdict(set)     # day number of last sighting -> docs
+        self._by_views = None  # docs, most viewed first; rebuilt after a refresh
+        self._matches = OrderedDict()  # (query, op, prefix) -> docs, until the next refresh
+        self._last_snapshot_id = 0
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def _index_item(self, region, captured_at, video_id, item):
+        snippet = item.get("snippet", {})
+        statistics = item.get("statistics", {})
+        text = (snippet.get("title") or "", snippet.get("description") or "", tuple(snippet.get("tags") or ()))
+
+        doc = self._docs.get(video_id)
+        if doc is None:
+            doc = self._docs[video_id] = len(self._rows)
+            self._text.append(None)
+            self._tokens.append([])
+            self._rows.append({"video_id": video_id, "regions": set(), "last_seen": captured_at})
+            self._views.append(0)
+            self._seen.append(captured_at)
+            self._days[int(captured_at // 86400)].add(doc)
+        if self._text[doc] != text:
+            tokens = tokenize(text[0]) + tokenize(text[1])
+            for tag in text[2]:
+                tokens += tokenize(tag)
+            self._remove_tokens(doc, self._tokens[doc])
+            self._add_tokens(doc, tokens)
+            self._text[doc], self._tokens[doc] = text, tokens
+
+        row = self._rows[doc]
+        row["regions"].add(region)
+        self._regions[region].add(doc)
+        if captured_at > row["last_seen"]:
+            self._days[int(row["last_seen"] // 86400)].discard(doc)
+            self._days[int(captured_at // 86400)].add(doc)
+            row["last_seen"] = self._seen[doc] = captured_at
+        self._views[doc] = parse_count(statistics.get("viewCount"))
+        row.update({
+            "title": text[0],
+            "channel_title": snippet.get("channelTitle", ""),
+            "thumbnail": best_thumbnail(snippet.get("thumbnails", {})),
+            "views": self._views[doc],
+        })
+
+    def refresh(self, force=False):
+        """Index snapshots recorded since the last refresh. Returns how many were added."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = now
+            snapshots = set()
+            for snapshot_id, region, captured_at, video_id, item in self.store.items_after(self._last_snapshot_id):
+                self._index_item(region, captured_at, video_id, item)
+                snapshots.add(snapshot_id)
+                self._last_snapshot_id = max(self._last_snapshot_id, snapshot_id)
+            if snapshots:
+                self._by_views = None
+                self._matches.clear()
+            return len(snapshots)
+
+    def _seen_since(self, docs, since):
+        """
+        The part of `docs` last seen at or after `since`: checked one by one
+        when `docs` is small, else intersected with the day lists.
+        """
+        first_day = int(since // 86400)
+        later = [day_docs for day, day_docs in self._days.items() if day > first_day]
+        if len(docs) <= sum(map(len, later)):
+            return {doc for doc in docs if self._seen[doc] >= since}
+        recent = set().union(*later)
+        recent.update(doc for doc in self._days.get(first_day, EMPTY) if self._seen[doc] >= since)
+        return docs & recent
+
+    def _match(self, query, op, prefix):
+        key = (query, op, prefix)
+        docs = self._matches.get(key)
+        if docs is None:
+            docs = self._matches[key] = self.match(query, op, prefix)
+            while len(self._matches) > QUERY_MEMO_SIZE:
+                self._matches.popitem(last=False)
+        else:
+            self._matches.move_to_end(key)
+        return docs
+
+    def _top(self, docs, limit):
+        """The `limit` most viewed of `docs`, whichever way touches fewer documents."""
+        if len(docs) <= limit * len(self._rows) / max(len(docs), 1):
+            return heapq.nlargest(limit, docs, key=self._views.__getitem__)
+        if self._by_views is None:
+            self._by_views = sorted(range(len(self._rows)), key=self._views.__getitem__, reverse=True)
+        top = []
+        for doc in self._by_views:
+            if doc in docs:
+                top.append(doc)
+                if len(top) == limit:
+                    break
+        return top
+
+    def search(self, query, op="and", prefix=False, regions=None, since=None, limit=50):
+        """
+        Videos matching the query, most viewed first.
+        Returns (total_matches, rows); `regions` and `since` narrow the corpus.
+        """
+        self.refresh()
+        with self._lock:
+            docs = self._match(query, op, prefix)
+            if docs and regions:
+                in_regions = [self._regions.get(region, EMPTY) for region in regions]
+                docs = docs & (in_regions[0] if len(in_regions) == 1 else set().union(*in_regions))
+            if docs and since:
+                docs = self._seen_since(docs, since)
+            top = self._top(docs, limit)
+            return len(docs), [{**self._rows[doc], "regions": sorted(self._rows[doc]["regions"])} for doc in top]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "videos": len(self._rows),
+                "tokens": len(self.postings),
+                "regions": len(self._regions),
+                "last_snapshot_id": self._last_snapshot_id,
+            }
+
+
+corpus_index = CorpusIndex(snapshot_store)
@@ -0,0 +1,186 @@
+"""
+serialization.py
+Response encoders for DataFrame-backed endpoints.
+
+- JSON goes through orjson when it is installed (the stdlib json module
+  otherwise). NumPy arrays and scalars, pandas timestamps and missing values
+  are encoded natively; NaN becomes null, so the output is always valid JSON.
+- Three response formats for a frame, picked with `format=` or the Accept header:
+    json      records, [{"col": value, ...}, ...] (the default)
+    columnar  column-oriented JSON, {"col": [values...], ...}
+    arrow     an Arrow IPC stream, for internal consumers; needs pyarrow.
+              The JSON envelope (success, region, insights, ...) travels in
+              the schema metadata under b"envelope".
+"""
+
+import datetime
+import json
+import math
+import sys
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# -----------------------
+# 1. Formats
+# -----------------------
+FORMATS = {
+    "json": "application/json",
+    "columnar": "application/vnd.trends.columnar+json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class FormatError(ValueError):
+    """Raised for an unknown `format=`, or a format this server can't produce."""
+
+
+def negotiate_format(request):
+    """
+    Pick a format name for `request`: an explicit format= wins, then the
+    Accept header; anything else (including */*) gets plain JSON.
+    """
+    requested = request.args.get("format")
+    if requested:
+        requested = requested.lower()
+        if requested not in FORMATS:
+            raise FormatError(f"Unknown format {requested!r}; expected one of {', '.join(FORMATS)}")
+    else:
+        mimetype = request.accept_mimetypes.best_match(list(FORMATS.values()), default=FORMATS["json"])
+        requested = next(name for name, value in FORMATS.items() if value == mimetype)
+    if requested == "arrow" and pyarrow is None:
+        raise FormatError("Arrow output needs the pyarrow package, which is not installed")
+    return requested
+
+
+# -----------------------
+# 2. JSON encoding
+# -----------------------
+def _default(value):
+    """Types neither encoder handles on its own."""
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    # pandas stays off the `import app` path (see app.py); until something
+    # has imported it, no value can be a pandas one
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        # NaT is a datetime too, so it is checked first
+        if value is pd.NaT or value is pd.NA:
+            return None
+        if isinstance(value, pd.Timedelta):
+            return value.total_seconds()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(value):
+    """Stdlib path: floats nested anywhere, NaN/inf -> None (orjson does this itself)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(element) for key, element in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(element) for element in value]
+    return value
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """Encode `value` as compact UTF-8 JSON bytes."""
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(value):
+        """Encode `value` as compact UTF-8 JSON bytes."""
+        return json.dumps(_finite(value), default=_default, separators=(",", ":"),
+                          ensure_ascii=False, allow_nan=False).encode()
+
+
+def _column_values(series):
+    """A column as something dumps() encodes in one call: a contiguous array for plain numbers, else a list."""
+    import pandas as pd
+
+    values = series.to_numpy()
+    if values.dtype.kind in "biuf" and orjson is not None:
+        return np.ascontiguousarray(values)
+    if values.dtype.kind == "M":
+        return [None if pd.isna(value) else value.isoformat() for value in series]
+    return values.tolist()
+
+
+def _value_fragments(series):
+    """Each value of a column as JSON text."""
+    import pandas as pd
+
+    values = _column_values(series)
+    if isinstance(values, np.ndarray):
+        # Numbers never contain commas, so one encode and a split does the whole column
+        return dumps(values)[1:-1].decode().split(",") if len(values) else []
+    if pd.api.types.infer_dtype(values, skipna=False) == "string":
+        return list(map(encode_basestring_ascii, values))
+    return [dumps(value).decode() for value in values]
+
+
+def encode_records(df):
+    """
+    The frame as a JSON array of row objects, the same document as
+    dumps(df.to_dict(orient="records")) but built column by column: each
+    column is encoded in bulk and the rows are stitched together from the
+    encoded values, without creating a dict per row.
+    """
+    if df.empty:
+        return b"[]"
+    keys = [encode_basestring_ascii(str(column)).replace("%", "%%") for column in df.columns]
+    template = "{" + ",".join(key + ":%s" for key in keys) + "}"
+    columns = [_value_fragments(df[column]) for column in df.columns]
+    return ("[" + ",".join([template % row for row in zip(*columns)]) + "]").encode()
+
+
+def encode_columns(df):
+    """The frame as column-oriented JSON: {"col": [values...], ...}."""
+    return dumps({str(column): _column_values(df[column]) for column in df.columns})
+
+
+def encode_arrow(df, envelope=None):
+    """The frame as an Arrow IPC stream, with `envelope` as JSON in the schema metadata."""
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    if envelope is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"envelope": dumps(envelope)})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# -----------------------
+# 3. Envelopes
+# -----------------------
+def encode_frame_payload(envelope, key, df, fmt="json"):
+    """
+    Encode `envelope` with the frame under `key` in the given format.
+    Returns (body, mimetype). The frame is encoded on its own and spliced into
+    the envelope, so it never exists as Python objects.
+    """
+    if fmt == "arrow":
+        return encode_arrow(df, envelope), FORMATS["arrow"]
+    frame = encode_columns(df) if fmt == "columnar" else encode_records(df)
+    head = dumps(envelope)[:-1]
+    separator = b"," if len(head) > 1 else b""
+    return head + separator + dumps(key) + b":" + frame + b"}", FORMATS[fmt]
@@ -0,0 +1,74 @@
+"""
+singleflight.py
+Collapses concurrent identical upstream calls into one.
+The first caller for a key runs the call; everyone else who asks for the
+same key while it is in flight waits on the same future.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """In-flight request deduplication keyed by any hashable value."""
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}  # key -> Future
+        self._async_inflight = {}  # key -> asyncio.Task (for the event loop's callers)
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "upstream_calls": 0,
+            "coalesced_calls": 0,
+        }
+
+    def do(self, key, fn):
+        """Run `fn()` once per key at a time and share its result (or exception)."""
+        with self._lock:
+            self._counters["calls"] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters["coalesced_calls"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self._counters["upstream_calls"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        return future.result()
+
+    async def do_async(self, key, coro_fn):
+        """Like do(), for coroutines on the event loop: await `coro_fn()` once per key at a time."""
+        with self._lock:
+            self._counters["calls"] += 1
+            task = self._async_inflight.get(key)
+            if task is not None:
+                self._counters["coalesced_calls"] += 1
+            else:
+                task = self._async_inflight[key] = asyncio.ensure_future(coro_fn())
+                self._counters["upstream_calls"] += 1
+                task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+        # A cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["in_flight"] = len(self._inflight) + len(self._async_inflight)
+        counters["name"] = self.name
+        counters["upstream_calls_saved"] = counters["coalesced_calls"]
+        return counters
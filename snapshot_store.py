@@ -0,0 +1,324 @@
+"""
+snapshot_store.py
+SQLite-backed history of trending charts (trends.db).
+Every mostPopular page fetched from YouTube is recorded per region, so the
+analyzers can run on stored snapshots instead of always calling the API.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config & Schema
+# -----------------------
+load_dotenv()
+
+TRENDS_DB_PATH = os.getenv(
+    "TRENDS_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "trends.db")
+)
+
+# The dashboard's chart (two 50-item pages). Shorter fetches (the Creator
+# Coach's 20, the suggestions' 50) are stored too, but only charts at least
+# this long stand in for "the chart" in latest_snapshot() and items_after().
+TRENDING_CHART_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    region TEXT NOT NULL,
+    category_id TEXT NOT NULL DEFAULT '',
+    captured_at REAL NOT NULL,
+    item_count INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    chart_size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_region_captured
+    ON snapshots (region, category_id, captured_at);
+
+CREATE TABLE IF NOT EXISTS snapshot_videos (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    position INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    item TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_videos_video
+    ON snapshot_videos (video_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_snapshot_videos_region_captured
+    ON snapshot_videos (region, captured_at);
+
+CREATE TABLE IF NOT EXISTS title_sentiment (
+    content_hash TEXT PRIMARY KEY,
+    polarity REAL NOT NULL
+);
+"""
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+def _count(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def content_hash(items):
+    """Stable hash of a chart page: which videos, in what order, with what stats."""
+    digest = hashlib.sha1()
+    for item in items:
+        stats = item.get("statistics", {})
+        digest.update(
+            f"{item.get('id', '')}:{stats.get('viewCount', '')}:{stats.get('likeCount', '')}:"
+            f"{stats.get('commentCount', '')}|".encode()
+        )
+    return digest.hexdigest()
+
+
+# -----------------------
+# 2. Snapshot Store
+# -----------------------
+class SnapshotStore:
+    """Reads and writes trending snapshots in a WAL-mode SQLite database."""
+
+    def __init__(self, db_path=TRENDS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            if "chart_size" not in columns:
+                # Databases from before chart_size: their snapshots count as partial
+                conn.execute("ALTER TABLE snapshots ADD COLUMN chart_size INTEGER NOT NULL DEFAULT 0")
+        # Connections must not cross a fork (gunicorn --preload): a child opens its own
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread; SQLite connections must not be shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+
+    def record_snapshots(self, snapshots):
+        """
+        Write several snapshots in one transaction.
+        `snapshots` is a list of (region, category_id, items, captured_at[, chart_size]);
+        chart_size is how many items were asked for (default: len(items)).
+        Returns the new snapshot ids.
+        """
+        conn = self._connect()
+        snapshot_ids = []
+        with conn:
+            for region, category_id, items, captured_at, *chart_size in snapshots:
+                captured_at = captured_at or time.time()
+                cursor = conn.execute(
+                    "INSERT INTO snapshots (region, category_id, captured_at, item_count, content_hash, chart_size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (region, category_id or "", captured_at, len(items), content_hash(items),
+                     chart_size[0] if chart_size else len(items))
+                )
+                snapshot_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO snapshot_videos (snapshot_id, position, video_id, region, captured_at, "
+                    "view_count, like_count, comment_count, item) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            snapshot_id, position, item.get("id", ""), region, captured_at,
+                            _count(item.get("statistics", {}).get("viewCount")),
+                            _count(item.get("statistics", {}).get("likeCount")),
+                            _count(item.get("statistics", {}).get("commentCount")),
+                            json.dumps(item, separators=(",", ":"))
+                        )
+                        for position, item in enumerate(items)
+                    ]
+                )
+                snapshot_ids.append(snapshot_id)
+        return snapshot_ids
+
+    def record_snapshot(self, region, items, category_id=None, captured_at=None, chart_size=None):
+        return self.record_snapshots([(region, category_id, items, captured_at, chart_size or len(items))])[0]
+
+    # --- Reads ---
+
+    def latest_snapshot(self, region, category_id=None, min_chart_size=TRENDING_CHART_SIZE):
+        """
+        Return the most recent snapshot for a region (of a chart of at least
+        `min_chart_size` items) as
+        {"id", "region", "category_id", "captured_at", "content_hash", "items"},
+        or None if nothing has been recorded yet.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, captured_at, content_hash FROM snapshots "
+            "WHERE region = ? AND category_id = ? AND chart_size >= ? ORDER BY captured_at DESC LIMIT 1",
+            (region, category_id or "", min_chart_size)
+        ).fetchone()
+        if row is None:
+            return None
+
+        snapshot_id, captured_at, snapshot_hash = row
+        items = [
+            json.loads(item) for (item,) in conn.execute(
+                "SELECT item FROM snapshot_videos WHERE snapshot_id = ? ORDER BY position",
+                (snapshot_id,)
+            )
+        ]
+        return {
+            "id": snapshot_id,
+            "region": region,
+            "category_id": category_id,
+            "captured_at": captured_at,
+            "content_hash": snapshot_hash,
+            "items": items
+        }
+
+    def snapshot_ids(self, region=None, since=None):
+        """List (id, region, captured_at) of snapshots, optionally filtered."""
+        query = "SELECT id, region, captured_at FROM snapshots WHERE 1 = 1"
+        params = []
+        if region:
+            query += " AND region = ?"
+            params.append(region)
+        if since:
+            query += " AND captured_at >= ?"
+            params.append(since)
+        return self._connect().execute(query + " ORDER BY captured_at", params).fetchall()
+
+    def items_after(self, snapshot_id=0, min_chart_size=TRENDING_CHART_SIZE):
+        """
+        Yield (snapshot_id, region, captured_at, video_id, item) for every video
+        in snapshots newer than `snapshot_id` (of charts of at least
+        `min_chart_size` items), oldest snapshot first.
+        """
+        cursor = self._connect().execute(
+            "SELECT snapshot_id, region, captured_at, video_id, item FROM snapshot_videos "
+            "WHERE snapshot_id IN (SELECT id FROM snapshots WHERE id > ? AND chart_size >= ?) "
+            "ORDER BY snapshot_id, position",
+            (snapshot_id, min_chart_size)
+        )
+        for snapshot, region, captured_at, video_id, item in cursor:
+            yield snapshot, region, captured_at, video_id, json.loads(item)
+
+    # --- Sentiment memo (shared by title_sentiment.py) ---
+
+    def sentiment_lookup(self, hashes):
+        """Return {content_hash: polarity} for the hashes that have been scored before."""
+        conn = self._connect()
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK):
+            chunk = hashes[start:start + LOOKUP_CHUNK]
+            found.update(conn.execute(
+                f"SELECT content_hash, polarity FROM title_sentiment "
+                f"WHERE content_hash IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        return found
+
+    def record_sentiments(self, scores):
+        """Store {content_hash: polarity}; hashes already present are left alone."""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO title_sentiment (content_hash, polarity) VALUES (?, ?)",
+                list(scores.items())
+            )
+
+
+# -----------------------
+# 3. Batched background writer
+# -----------------------
+class SnapshotWriter:
+    """
+    Queues snapshots from request threads and writes them in batches on a
+    single background thread, so recording never adds latency to a request.
+    Subscribers are called on that thread too, once per written snapshot.
+    """
+
+    def __init__(self, store, batch_size=32, flush_interval=1.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._subscribers = []
+        self._start()
+        # The writer thread does not survive a fork; each child starts its own
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        self._queue = queue.Queue()
+        self._start()
+
+    def enqueue(self, region, items, category_id=None, captured_at=None, chart_size=None):
+        """Queue a chart; `chart_size` is how many items were asked for (default: len(items))."""
+        self._queue.put((region, category_id, items, captured_at or time.time(), chart_size or len(items)))
+
+    def subscribe(self, callback, min_chart_size=0):
+        """Call `callback(region, category_id, items, captured_at)` for every snapshot of at least `min_chart_size`."""
+        if all(callback != subscribed for subscribed, _ in self._subscribers):
+            self._subscribers.append((callback, min_chart_size))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self.store.record_snapshots(batch)
+            except Exception as e:
+                # Not only sqlite3.Error (e.g. items that don't serialize): the thread must live on
+                print(f"Failed to record {len(batch)} trending snapshot(s): {e}")
+            try:
+                for *snapshot, chart_size in batch:
+                    for callback, min_chart_size in self._subscribers:
+                        if chart_size < min_chart_size:
+                            continue
+                        try:
+                            callback(*snapshot)
+                        except Exception as e:
+                            print(f"Snapshot subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written (or `timeout` passes). Returns True once drained."""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+
+snapshot_store = SnapshotStore()
+snapshot_writer = SnapshotWriter(snapshot_store)
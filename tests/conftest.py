@@ -0,0 +1,39 @@
+"""
+conftest.py
+Puts the repo (and benchmarks/, for the stub's synthetic charts) on sys.path
+and gives the tests dummy API keys and scratch databases, before any test
+imports the app.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for _path in (os.path.join(ROOT, "benchmarks"), ROOT):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Removed at interpreter exit
+SCRATCH = tempfile.TemporaryDirectory(prefix="tests_")
+os.environ.update({
+    "YOUTUBE_API_KEY": "test",
+    "GEMINI_API_KEY": "test",
+    "TRENDS_DB_PATH": os.path.join(SCRATCH.name, "trends.db"),
+    "CACHE_DB_PATH": os.path.join(SCRATCH.name, "cache.db"),
+})
+
+
+@pytest.fixture
+def wait_until():
+    """Poll `predicate` until it holds, failing after `timeout` seconds."""
+    def wait(predicate, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            assert time.monotonic() < deadline, "timed out waiting for the condition"
+            time.sleep(0.005)
+    return wait
@@ -0,0 +1,95 @@
+"""
+test_cache.py
+TwoTierCache: fresh hits, stale-while-revalidate and the shared disk tier.
+"""
+
+import threading
+
+from cache import TwoTierCache
+
+
+def test_fresh_value_is_served_without_fetching():
+    cache = TwoTierCache("fresh", ttl=60, db_path=None)
+    cache.set("k", "cached")
+
+    assert cache.get_or_fetch("k", lambda: "fetched") == "cached"
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_miss_fetches_synchronously_and_stores():
+    cache = TwoTierCache("miss", ttl=60, db_path=None)
+
+    assert cache.get_or_fetch("k", lambda: "fetched") == "fetched"
+    assert cache.get_fresh("k") == "fetched"
+    assert cache.stats()["misses"] == 1
+
+
+def test_stale_value_is_served_while_refreshing(wait_until):
+    # ttl=0: everything stored is already stale, but within stale_ttl
+    cache = TwoTierCache("stale", ttl=0, stale_ttl=60, db_path=None)
+    cache.set("k", "old")
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        return "new"
+
+    assert cache.get_or_fetch("k", fetch) == "old"
+    assert cache.get("k")[0] == "old"  # not replaced until the refresh returns
+
+    release.set()
+    wait_until(lambda: cache.stats()["refreshes"] == 1)
+    assert cache.get("k")[0] == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_one_background_refresh_per_key(wait_until):
+    cache = TwoTierCache("dedupe", ttl=0, stale_ttl=60, db_path=None)
+    cache.set("k", "old")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    for _ in range(5):
+        assert cache.get_or_fetch("k", fetch) == "old"
+    release.set()
+    wait_until(lambda: cache.stats()["refreshes"] == 1)
+
+    assert len(calls) == 1
+    assert cache.stats()["stale_hits"] == 5
+
+
+def test_failed_refresh_keeps_the_stale_value(wait_until):
+    cache = TwoTierCache("failing", ttl=0, stale_ttl=60, db_path=None)
+    cache.set("k", "old")
+
+    def fetch():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_fetch("k", fetch) == "old"
+    wait_until(lambda: cache.stats()["refresh_errors"] == 1)
+    assert cache.get("k")[0] == "old"
+
+
+def test_expired_value_is_a_miss():
+    cache = TwoTierCache("expired", ttl=0, stale_ttl=0, db_path=None)
+    cache.set("k", "old")
+
+    assert cache.get_or_fetch("k", lambda: "new") == "new"
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["stale_hits"] == 0
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    TwoTierCache("shared", ttl=60, db_path=db_path).set(("US", 100), {"items": [1, 2]})
+    other = TwoTierCache("shared", ttl=60, db_path=db_path)
+
+    assert other.get_fresh(("US", 100)) == {"items": [1, 2]}
+    assert other.stats()["disk_hits"] == 1
+    assert other.get_fresh(("US", 100)) == {"items": [1, 2]}
+    assert other.stats()["memory_hits"] == 1
@@ -0,0 +1,98 @@
+"""
+test_jobs.py
+JobManager: a job's lifecycle from submission to expiry, failures and limits.
+"""
+
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobManager, JobQueueFull
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=1, max_queue=2, retention=60)
+    yield manager
+    manager.shutdown(timeout=5)
+
+
+def staged(release, fail=False):
+    def run(region, progress):
+        progress("fetch")
+        release.wait(5)
+        progress("analyze")
+        if fail:
+            raise ValueError(f"no chart for {region}")
+        return {"region": region}
+    return run
+
+
+def test_job_runs_through_its_stages(manager):
+    release = threading.Event()
+    job_id = manager.submit("suggestions", staged(release), "US", params={"country": "US"})
+
+    updates = manager.updates(job_id, timeout=5)
+    first = next(updates)
+    release.set()
+    final = list(updates)[-1]
+
+    assert first["state"] in (QUEUED, RUNNING)
+    assert final["state"] == DONE
+    assert final["result"] == {"region": "US"}
+    assert final["params"] == {"country": "US"}
+    assert [stage["stage"] for stage in final["stages"]] == ["fetch", "analyze"]
+    assert final["run_seconds"] >= 0
+    assert "result" not in manager.get(job_id, include_result=False)
+    assert manager.stats()["completed"] == 1
+
+
+def test_failed_job_reports_its_error(manager):
+    release = threading.Event()
+    release.set()
+    job_id = manager.submit("suggestions", staged(release, fail=True), "ZZ")
+
+    final = list(manager.updates(job_id, timeout=5))[-1]
+
+    assert final["state"] == FAILED
+    assert final["error"] == "no chart for ZZ"
+    assert "result" not in final
+    assert manager.stats()["failed"] == 1
+
+
+def test_submissions_past_the_queue_limit_are_rejected(manager):
+    release = threading.Event()
+    job_ids = [manager.submit("suggestions", staged(release), region) for region in ("US", "IN")]
+
+    with pytest.raises(JobQueueFull):
+        manager.submit("suggestions", staged(release), "JP")
+    assert manager.stats()["rejected"] == 1
+
+    release.set()
+    for job_id in job_ids:
+        list(manager.updates(job_id, timeout=5))
+    assert manager.stats()["active"] == 0
+    manager.submit("suggestions", staged(release), "JP")
+
+
+def test_finished_jobs_expire():
+    manager = JobManager(workers=1, retention=0)
+    job_id = manager.submit("suggestions", lambda progress: "ok")
+    list(manager.updates(job_id, timeout=5))
+    time.sleep(0.01)
+
+    assert manager.get(job_id) is None
+    assert manager.stats()["expired"] == 1
+    manager.shutdown(timeout=5)
+
+
+def test_shutdown_waits_for_running_jobs_and_refuses_new_ones(manager):
+    release = threading.Event()
+    job_id = manager.submit("suggestions", staged(release), "US")
+    threading.Timer(0.05, release.set).start()
+
+    assert manager.shutdown(timeout=5) is True
+    assert manager.get(job_id)["state"] == DONE
+    with pytest.raises(JobQueueFull):
+        manager.submit("suggestions", staged(release), "IN")
@@ -0,0 +1,44 @@
+"""
+test_profiler.py
+ProfileStore: profiles taken in one worker process can be read from another.
+"""
+
+import multiprocessing
+
+from profiler import ProfileStore
+
+
+def add_in_child(store, name, ids):
+    ids.put(store.add(name, "sample", 0.0, 0.01, "app.py:view 1\n", samples=1))
+
+
+def test_ids_are_unique_and_readable_across_forked_workers(tmp_path):
+    store = ProfileStore(db_path=str(tmp_path / "trends.db"))
+    store.add("before_fork", "sample", 0.0, 0.01, "app.py:view 1\n", samples=1)
+
+    context = multiprocessing.get_context("fork")
+    ids = context.Queue()
+    workers = [context.Process(target=add_in_child, args=(store, f"worker{n}", ids)) for n in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+    child_ids = [ids.get(timeout=5) for _ in workers]
+
+    assert len(set(child_ids)) == 3
+    assert 1 not in child_ids
+    for profile_id in child_ids:
+        profile = store.get(profile_id)
+        assert profile["function"].startswith("worker")
+        assert profile["data"] == "app.py:view 1\n"
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    store = ProfileStore(max_entries=2, db_path=str(tmp_path / "trends.db"))
+    first = store.add("a", "cprofile", 0.0, 0.01, b"\x00raw")
+    store.add("b", "sample", 0.0, 0.01, "x 1\n")
+    store.add("c", "sample", 0.0, 0.01, "y 1\n")
+
+    assert [profile["function"] for profile in store.list()] == ["c", "b"]
+    assert "data" not in store.list()[0]
+    assert store.get(first) is None
@@ -0,0 +1,134 @@
+"""
+test_response_cache.py
+fields= projection and ETag/Accept-Encoding negotiation, on their own and
+through /get_trending_data (served from a stored snapshot, no API calls).
+"""
+
+import gzip
+import json
+
+import pytest
+
+from response_cache import FieldsError, parse_fields, project_payload
+from stub_server import synthetic_items
+
+
+# -----------------------
+# 1. fields=
+# -----------------------
+def test_parse_fields():
+    assert parse_fields("a,b/c,d(e,f/g)") == {"a": True, "b": {"c": True}, "d": {"e": True, "f": {"g": True}}}
+    # A whole value wins over a sub-selection of it
+    assert parse_fields("a/b,a") == {"a": True}
+
+
+@pytest.mark.parametrize("spec", ["videos(", "videos)", "a,,b", "/a", "a/"])
+def test_parse_fields_rejects_malformed_expressions(spec):
+    with pytest.raises(FieldsError):
+        parse_fields(spec)
+
+
+def test_project_payload_keeps_success_and_applies_to_lists():
+    payload = {
+        "success": True,
+        "country": "US",
+        "videos": [{"video_id": "a", "title": "A", "views": 1}, {"video_id": "b", "title": "B", "views": 2}],
+    }
+
+    assert project_payload(payload, parse_fields("videos/video_id")) == {
+        "success": True,
+        "videos": [{"video_id": "a"}, {"video_id": "b"}],
+    }
+    assert project_payload(payload, None) is payload
+
+
+# -----------------------
+# 2. /get_trending_data
+# -----------------------
+@pytest.fixture(scope="module")
+def client():
+    import app
+
+    app.snapshot_store.record_snapshot("GB", synthetic_items("GB", 100))
+    return app.app.test_client()
+
+
+def trending(client, query="", headers=None):
+    return client.get(f"/get_trending_data?country=GB&source=store{query}", headers=headers or {})
+
+
+def record_new_chart(seed):
+    import app
+
+    app.snapshot_store.record_snapshot("GB", synthetic_items("GB", 100, seed=seed))
+
+
+def test_fields_trims_the_response(client):
+    response = trending(client, "&fields=videos(video_id,title)")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) == {"success", "videos"}
+    assert len(body["videos"]) == 100
+    assert all(set(video) == {"video_id", "title"} for video in body["videos"])
+
+
+def test_malformed_fields_is_a_400(client):
+    response = trending(client, "&fields=videos(title")
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_unchanged_chart_revalidates_with_a_304(client):
+    first = trending(client)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = trending(client, headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_each_projection_has_its_own_etag(client):
+    full = trending(client).headers["ETag"]
+    trimmed = trending(client, "&fields=videos(video_id)").headers["ETag"]
+
+    assert full != trimmed
+    assert trending(client, "&fields=videos(video_id)", headers={"If-None-Match": full}).status_code == 200
+
+
+def test_gzip_is_negotiated_with_its_own_etag(client):
+    plain = trending(client)
+    zipped = trending(client, headers={"Accept-Encoding": "gzip"})
+
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["Vary"] == "Accept-Encoding"
+    assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+    # A tag for any coding of the same body still revalidates
+    revalidated = trending(client, headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_new_chart_changes_the_etag(client):
+    etag = trending(client).headers["ETag"]
+    record_new_chart(seed=7)
+
+    response = trending(client, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_new_snapshot_of_the_same_chart_changes_the_etag(client):
+    record_new_chart(seed=11)
+    first = trending(client)
+    record_new_chart(seed=11)  # same items, captured later
+
+    response = trending(client, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert response.status_code == 200
+    assert response.get_json()["snapshot_captured_at"] > first.get_json()["snapshot_captured_at"]
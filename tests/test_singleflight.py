@@ -0,0 +1,98 @@
+"""
+test_singleflight.py
+SingleFlight: concurrent identical calls share one upstream call.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced(wait_until):
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"items": 50}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "US", fetch) for _ in range(8)]
+        wait_until(lambda: flight.stats()["calls"] == 8)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced_calls"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_exception_is_shared_with_every_waiter(wait_until):
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError("quota exceeded")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "US", fetch) for _ in range(4)]
+        wait_until(lambda: flight.stats()["calls"] == 4)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="quota exceeded"):
+                future.result(5)
+    assert flight.stats()["upstream_calls"] == 1
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight("test")
+
+    assert flight.do("US", lambda: "us") == "us"
+    assert flight.do("IN", lambda: "in") == "in"
+    assert flight.do("US", lambda: "us again") == "us again"
+    assert flight.stats()["upstream_calls"] == 3
+
+
+def test_async_calls_are_coalesced():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("US", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["page"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["coalesced_calls"] == 4
+
+
+def test_cancelled_async_waiter_does_not_cancel_the_call():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do_async("US", fetch))
+        second = asyncio.ensure_future(flight.do_async("US", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "page"
+    assert flight.stats()["upstream_calls"] == 1
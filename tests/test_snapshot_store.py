@@ -0,0 +1,19 @@
+"""
+test_snapshot_store.py
+SnapshotWriter: a batch that fails to record does not stop the writer.
+"""
+
+from snapshot_store import SnapshotStore, SnapshotWriter
+
+
+def test_writer_survives_a_batch_that_fails_to_serialize(tmp_path):
+    store = SnapshotStore(str(tmp_path / "trends.db"))
+    writer = SnapshotWriter(store, flush_interval=0.01)
+
+    writer.enqueue("US", [{"id": "a", "snippet": {"title": object()}}])  # not JSON-serializable
+    assert writer.flush(timeout=5)
+
+    writer.enqueue("US", [{"id": "b", "snippet": {"title": "fine"}}])
+    assert writer.flush(timeout=5)
+    assert writer._thread.is_alive()
+    assert [item["id"] for item in store.latest_snapshot("US", min_chart_size=0)["items"]] == ["b"]
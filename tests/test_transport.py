@@ -0,0 +1,49 @@
+"""
+test_transport.py
+Replayed Gemini calls: an unrecorded prompt falls back only to a recording
+of the same prompt kind.
+"""
+
+import pytest
+
+import transport
+from transport import ReplayIndex, ReplayMiss, ReplayModel, gemini_group, gemini_key, prompt_kind
+
+MODEL = "gemini-2.5-flash"
+
+
+def recording(prompt, kind, text):
+    return {"kind": "gemini", "key": gemini_key(MODEL, prompt, False), "group": gemini_group(MODEL, False, kind),
+            "model": MODEL, "stream": False, "prompt_kind": kind, "latency": 0, "chunks": [[text, 0]],
+            "usage": None}
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    # The ideas list was recorded first, so a kind-blind fallback would hand it to the coach
+    index = ReplayIndex([
+        recording("ideas prompt, 3 days old", "ideas", "1. An idea"),
+        recording("coach prompt, 3 days old", "coach", "Coach report"),
+    ])
+    monkeypatch.setattr(transport, "_replay_index", index)
+    return index
+
+
+def test_exact_prompt_is_replayed(replay):
+    with prompt_kind("ideas"):
+        assert ReplayModel(MODEL).generate_content("coach prompt, 3 days old").text == "Coach report"
+    assert replay.stats()["exact"] == 1
+
+
+def test_unrecorded_prompt_falls_back_within_its_kind(replay):
+    model = ReplayModel(MODEL)
+    with prompt_kind("coach"):
+        assert model.generate_content("coach prompt, 4 days old").text == "Coach report"
+    with prompt_kind("ideas"):
+        assert model.generate_content("ideas prompt, 4 days old").text == "1. An idea"
+    assert replay.stats()["fallback"] == 2
+
+
+def test_unrecorded_prompt_of_an_unrecorded_kind_misses(replay):
+    with pytest.raises(ReplayMiss):
+        ReplayModel(MODEL).generate_content("some other prompt")
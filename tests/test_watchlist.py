@@ -0,0 +1,84 @@
+"""
+test_watchlist.py
+POST /watchlist: the WATCHLIST_MAX_VIDEOS limit counts only videos not yet
+tracked. velocity(): a video that stops growing stops ranking first.
+"""
+
+import time
+
+import pytest
+
+from watchlist import WatchlistStore, velocity
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "WATCHLIST_MAX_VIDEOS", 3)
+    app.watchlist_store.remove(app.watchlist_store.video_ids())
+    yield app.app.test_client()
+    app.watchlist_store.remove(app.watchlist_store.video_ids())
+
+
+def video_ids(*numbers):
+    return [f"watch{n:06d}" for n in numbers]
+
+
+def test_resubmitting_tracked_videos_at_the_limit(client):
+    assert client.post("/watchlist", json={"video_ids": video_ids(1, 2, 3)}).status_code == 200
+
+    response = client.post("/watchlist", json={"video_ids": video_ids(1, 2, 3)})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"success": True, "added": 0, "already_tracked": 3, "tracked": 3}
+
+
+def test_only_new_videos_count_against_the_limit(client):
+    client.post("/watchlist", json={"video_ids": video_ids(1, 2)})
+
+    response = client.post("/watchlist", json={"video_ids": video_ids(1, 2, 3)})
+    assert response.get_json() == {"success": True, "added": 1, "already_tracked": 2, "tracked": 3}
+
+    response = client.post("/watchlist", json={"video_ids": video_ids(3, 4)})
+    assert response.status_code == 400
+    assert "limited to 3" in response.get_json()["error"]
+
+
+def poll(store, views, t):
+    items = {video_id: {"id": video_id, "statistics": {"viewCount": str(count), "likeCount": "0", "commentCount": "0"}}
+             for video_id, count in views.items()}
+    store.record_poll(items, list(views), t)
+
+
+def test_stalled_video_ranks_below_a_growing_one(tmp_path):
+    store = WatchlistStore(str(tmp_path / "trends.db"))
+    stalled, steady = video_ids(1, 2)
+    store.add([stalled, steady])
+    start = int(time.time()) - 11 * 3600
+    # The stalled video gains 10,000 views in the first hour, then nothing for 10 hours
+    for hour in range(12):
+        poll(store, {stalled: 10_000 if hour else 0, steady: 1_000 * hour}, start + hour * 3600)
+
+    series = velocity(store, since=start)
+
+    assert list(series) == [steady, stalled]
+    assert series[stalled]["t"][-1] == start + 11 * 3600
+    assert series[stalled]["views_per_hour"][-1] == 0
+    assert series[stalled]["views"][-1] == 10_000
+    assert series[steady]["views_per_hour"][-1] == 1_000
+
+
+def test_deleted_video_stops_at_its_last_poll(tmp_path):
+    store = WatchlistStore(str(tmp_path / "trends.db"))
+    gone, = video_ids(3)
+    store.add([gone])
+    start = int(time.time()) - 3 * 3600
+    poll(store, {gone: 0}, start)
+    poll(store, {gone: 5_000}, start + 3600)
+    store.record_poll({}, [gone], start + 3 * 3600)  # no longer returned by the API
+
+    series = velocity(store, since=start)[gone]
+
+    assert series["t"] == [start, start + 3600, start + 3 * 3600]
+    assert series["views_per_hour"] == [None, 5_000, 0]
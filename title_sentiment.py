@@ -0,0 +1,107 @@
+"""
+title_sentiment.py
+Batch TextBlob sentiment scoring for video titles, memoized by content hash.
+Trending titles repeat across refreshes and regions, so each distinct title
+is scored once: scores live in a small in-process LRU and in trends.db
+(shared by every worker), and only titles never seen before reach TextBlob.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from snapshot_store import snapshot_store
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+SENTIMENT_MEMO_MAX_ENTRIES = int(os.getenv("SENTIMENT_MEMO_MAX_ENTRIES", 50000))
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def score_polarity(text):
+    """The un-memoized score: exactly what add_sentiment() always computed."""
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+
+# -----------------------
+# 2. Memoized batch scoring
+# -----------------------
+class SentimentMemo:
+    """
+    Content-hash-keyed memo of title polarity.
+    `store` (a SnapshotStore) shares scores across processes; pass None to
+    keep them in memory only.
+    """
+
+    def __init__(self, store=None, max_entries=SENTIMENT_MEMO_MAX_ENTRIES):
+        self.store = store
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # content hash -> polarity
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "store_hits": 0, "scored": 0}
+
+    def polarities(self, titles):
+        """Polarity for each title, in order (titles are scored as str(title))."""
+        texts = [str(title) for title in titles]
+        hashes = [text_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+
+        scores = {}
+        with self._lock:
+            for h in unique:
+                if h in self._memory:
+                    self._memory.move_to_end(h)
+                    scores[h] = self._memory[h]
+        memory_hits = len(scores)
+
+        missing = [h for h in unique if h not in scores]
+        store_hits = {}
+        if missing and self.store is not None:
+            try:
+                store_hits = self.store.sentiment_lookup(missing)
+            except sqlite3.Error as e:
+                print(f"Sentiment memo lookup failed: {e}")
+            scores.update(store_hits)
+
+        fresh = {h: score_polarity(unique[h]) for h in unique if h not in scores}
+        scores.update(fresh)
+        if fresh and self.store is not None:
+            try:
+                self.store.record_sentiments(fresh)
+            except sqlite3.Error as e:
+                print(f"Sentiment memo write failed: {e}")
+
+        with self._lock:
+            for h in store_hits.keys() | fresh.keys():
+                self._memory[h] = scores[h]
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+            self._counters["memory_hits"] += memory_hits
+            self._counters["store_hits"] += len(store_hits)
+            self._counters["scored"] += len(fresh)
+
+        return [scores[h] for h in hashes]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_entries"] = len(self._memory)
+        return counters
+
+
+sentiment_memo = SentimentMemo(snapshot_store)
@@ -0,0 +1,171 @@
+"""
+topic_clusters.py
+Incremental, warm-started topic clustering of trending titles.
+
+Titles are embedded with a stateless HashingVectorizer (no vocabulary to
+refit) and clustered with MiniBatchKMeans.partial_fit, keeping one model per
+region. Each refresh only trains on titles that region has not seen yet, and
+because the centroids are updated in place rather than re-initialized, a
+cluster id keeps meaning the same topic from one refresh to the next.
+A region's model is only created once it has n_clusters distinct titles to
+start from; until then each call is labelled with a throwaway model.
+"""
+
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+# "full" refits TF-IDF + KMeans on every call (the original behaviour);
+# "incremental" uses the warm-started per-region models below
+TOPIC_CLUSTERING = os.getenv("TOPIC_CLUSTERING", "full")
+# Titles remembered per region, so re-seen titles are not trained on again
+TOPIC_MAX_SEEN_TITLES = int(os.getenv("TOPIC_MAX_SEEN_TITLES", 20000))
+
+HASH_FEATURES = 2 ** 16
+
+
+def feature_index(term, n_features=HASH_FEATURES):
+    """The column HashingVectorizer puts `term` in (murmurhash3, abs, modulo)."""
+    h = murmurhash3_32(term, seed=0)
+    if h == -2 ** 31:
+        return (2 ** 31 - 1 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+# -----------------------
+# 2. Incremental clusterer
+# -----------------------
+class _RegionModel:
+    __slots__ = ("kmeans", "pending", "seen", "terms")
+
+    def __init__(self):
+        self.kmeans = None
+        self.pending = {}  # clean title -> None, buffered until there are n_clusters of them
+        self.seen = {}   # clean title -> None, in insertion order (bounded)
+        self.terms = {}  # hashed column -> first term seen there, for keywords
+
+
+class IncrementalTopicClusterer:
+    """
+    Per-region MiniBatchKMeans models over hashed title n-grams.
+    fit_predict() trains on the unseen titles only, then labels every title.
+    """
+
+    def __init__(self, n_features=HASH_FEATURES, random_state=42, max_seen=TOPIC_MAX_SEEN_TITLES):
+        self.n_features = n_features
+        self.random_state = random_state
+        self.max_seen = max_seen
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=(1, 2), stop_words="english", alternate_sign=False
+        )
+        self._analyzer = self.vectorizer.build_analyzer()
+        self._models = {}  # (region, n_clusters) -> _RegionModel
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._counters = {"updates": 0, "titles_labelled": 0, "titles_trained": 0}
+
+    def _model(self, key):
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = _RegionModel()
+                self._locks[key] = threading.Lock()
+            return self._models[key], self._locks[key]
+
+    def _remember_terms(self, model, title):
+        for term in self._analyzer(title):
+            model.terms.setdefault(feature_index(term, self.n_features), term)
+
+    def _remember(self, model, titles):
+        for title in titles:
+            model.seen[title] = None
+            self._remember_terms(model, title)
+        while len(model.seen) > self.max_seen:
+            model.seen.pop(next(iter(model.seen)))
+
+    def fit_predict(self, region, clean_titles, n_clusters=5):
+        """
+        Update `region`'s model with the titles it hasn't seen, then label all
+        `clean_titles`. Returns (labels, cluster_keywords) like cluster_titles().
+        """
+        if not clean_titles:
+            return np.zeros(0, dtype=np.int32), {}
+        X = self.vectorizer.transform(clean_titles)
+        model, lock = self._model((region, n_clusters))
+
+        with lock:
+            new_rows = {}
+            for row, title in enumerate(clean_titles):
+                if title not in model.seen and title not in new_rows:
+                    new_rows[title] = row
+
+            trained = 0
+            if model.kmeans is None:
+                # The model is created once n_clusters distinct titles are buffered, so a
+                # small first batch cannot fix the cluster count below n_clusters
+                model.pending.update(dict.fromkeys(new_rows))
+                if len(model.pending) < n_clusters:
+                    # Label this call with a throwaway model over what is buffered so far
+                    kmeans = MiniBatchKMeans(
+                        n_clusters=len(model.pending), random_state=self.random_state, n_init=3
+                    ).fit(self.vectorizer.transform(list(model.pending)))
+                    for title in new_rows:
+                        self._remember_terms(model, title)
+                else:
+                    # k-means++ on everything buffered initializes the centroids
+                    pending, model.pending = list(model.pending), {}
+                    model.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=self.random_state, n_init=3)
+                    model.kmeans.partial_fit(self.vectorizer.transform(pending))
+                    self._remember(model, pending)
+                    trained = len(pending)
+            elif new_rows:
+                model.kmeans.partial_fit(X[list(new_rows.values())])
+                self._remember(model, new_rows)
+                trained = len(new_rows)
+
+            if model.kmeans is not None:
+                kmeans = model.kmeans
+            labels = kmeans.predict(X)
+            centers = kmeans.cluster_centers_.copy()
+            terms = dict(model.terms)
+
+        with self._lock:
+            self._counters["updates"] += 1
+            self._counters["titles_labelled"] += len(clean_titles)
+            self._counters["titles_trained"] += trained
+
+        return labels, self._keywords(centers, terms)
+
+    @staticmethod
+    def _keywords(centers, terms, top_n=5):
+        cluster_keywords = {}
+        for i, center in enumerate(centers):
+            # Only the heaviest columns matter; avoid a full sort of the hashed space
+            candidates = np.argpartition(center, -top_n * 4)[-top_n * 4:]
+            ordered = candidates[np.argsort(center[candidates])[::-1]]
+            cluster_keywords[i] = [terms[idx] for idx in ordered if center[idx] > 0 and idx in terms][:top_n]
+        return cluster_keywords
+
+    def reset(self, region=None):
+        with self._lock:
+            for key in [k for k in self._models if region is None or k[0] == region]:
+                del self._models[key]
+                del self._locks[key]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["regions"] = sorted({key[0] for key in self._models})
+        return counters
+
+
+topic_clusterer = IncrementalTopicClusterer()
@@ -0,0 +1,357 @@
+"""
+transport.py
+Record/replay of the app's upstream traffic, for deterministic offline
+replays of production load.
+
+TRANSPORT_MODE selects what sits beneath the YouTube HTTP transports
+(client_pool.py) and the Gemini model handles (gemini_api.py):
+    off     (default) the real transports, untouched.
+    record  the real transports; every YouTube request/response pair and
+            Gemini call (prompt, text chunks, usage, latency) is appended to
+            TRANSPORT_LOG as one JSON line, as is every inbound request the
+            app answers (method, path, status, latency).
+    replay  no network: calls are answered from TRANSPORT_LOG after the
+            recorded latency times TRANSPORT_LATENCY_SCALE (0 = instantly).
+            benchmarks/bench_replay.py re-sends the recorded inbound requests.
+
+Replayed calls are matched on the exact request (YouTube: method, URL
+path and query minus the API key, body; Gemini: model, prompt,
+streaming). Identical requests get their recorded responses in order,
+then the last one again.
+A Gemini prompt that was never recorded (prompts embed "days since
+upload", which moves on) falls back to the next recording for the same
+model, streaming and prompt kind (the caller's tag, e.g. "coach" or
+"ideas", see gemini_api.generate_text), so a coach report is never
+answered with an ideas list; an unmatched YouTube request raises ReplayMiss.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+TRANSPORT_MODE = os.getenv("TRANSPORT_MODE", "off").lower()
+# Not requests.jsonl: that name is already taken at the repo root
+TRANSPORT_LOG = os.getenv("TRANSPORT_LOG", "transport_log.jsonl")
+TRANSPORT_LATENCY_SCALE = float(os.getenv("TRANSPORT_LATENCY_SCALE", 1.0))
+
+MODES = ("off", "record", "replay")
+if TRANSPORT_MODE not in MODES:
+    raise ValueError(f"TRANSPORT_MODE must be one of {', '.join(MODES)}, got {TRANSPORT_MODE!r}")
+
+# Query parameters never written to the log
+SECRET_PARAMS = {"key", "token", "profile"}
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode for a request the log has no recording of."""
+
+
+def strip_secrets(uri):
+    """`uri` without credentials in its query string."""
+    parts = urlsplit(uri)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def body_text(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        # surrogateescape round-trips any bytes through the JSON log
+        return body.decode("utf-8", "surrogateescape")
+    return body
+
+
+def youtube_key(method, uri, body):
+    # Scheme and host left out: a log recorded against one API root replays against any other
+    parts = urlsplit(strip_secrets(uri))
+    request_line = f"{method} {parts.path}?{parts.query}\n{body_text(body) or ''}"
+    return "youtube " + hashlib.sha256(request_line.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def gemini_key(model_name, prompt, stream):
+    return "gemini " + hashlib.sha256(f"{model_name} {bool(stream)}\n{prompt}".encode()).hexdigest()
+
+
+def gemini_group(model_name, stream, kind=None):
+    return f"gemini {model_name} {bool(stream)} {kind or '-'}"
+
+
+# What the Gemini call being made is for (set by gemini_api.py around each call)
+_prompt_kind = contextvars.ContextVar("prompt_kind", default=None)
+
+
+@contextlib.contextmanager
+def prompt_kind(kind):
+    """Tag the Gemini calls made inside the block with `kind`, for replay fallbacks."""
+    token = _prompt_kind.set(kind)
+    try:
+        yield
+    finally:
+        _prompt_kind.reset(token)
+
+
+# -----------------------
+# 2. The log
+# -----------------------
+class TransportLog:
+    """Appends entries to a JSONL file, one line per entry, from any thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def append(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.written += 1
+
+
+def read_log(path):
+    """Every entry in a transport log, in recorded order."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayIndex:
+    """Recorded upstream calls by request key (and Gemini model), served in recorded order."""
+
+    def __init__(self, entries):
+        self._by_key = defaultdict(list)
+        self._by_group = defaultdict(list)
+        for entry in entries:
+            if entry.get("kind") in ("youtube", "gemini"):
+                self._by_key[entry["key"]].append(entry)
+                if entry.get("group"):
+                    self._by_group[entry["group"]].append(entry)
+        self._next = defaultdict(int)
+        self._lock = threading.Lock()
+        self._counters = {"exact": 0, "fallback": 0, "repeated": 0, "misses": 0}
+
+    def _take(self, table, name, counter):
+        entries = table.get(name)
+        if not entries:
+            return None
+        with self._lock:
+            index = self._next[name]
+            self._next[name] = index + 1
+            self._counters[counter] += 1
+            if index >= len(entries):
+                self._counters["repeated"] += 1
+        return entries[min(index, len(entries) - 1)]
+
+    def lookup(self, key, group=None):
+        entry = self._take(self._by_key, key, "exact")
+        if entry is None and group is not None:
+            entry = self._take(self._by_group, group, "fallback")
+        if entry is None:
+            with self._lock:
+                self._counters["misses"] += 1
+            raise ReplayMiss(f"No recording of {key} in {TRANSPORT_LOG}")
+        return entry
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        counters["recorded_calls"] = sum(len(entries) for entries in self._by_key.values())
+        return counters
+
+
+_log = TransportLog(TRANSPORT_LOG) if TRANSPORT_MODE == "record" else None
+
+_replay_lock = threading.Lock()
+_replay_index = None
+
+
+def replay_index():
+    """The replay index, loaded from TRANSPORT_LOG on first use."""
+    global _replay_index
+    if _replay_index is None:
+        with _replay_lock:
+            if _replay_index is None:
+                _replay_index = ReplayIndex(read_log(TRANSPORT_LOG))
+    return _replay_index
+
+
+def replay_delay(seconds):
+    if TRANSPORT_LATENCY_SCALE > 0 and seconds > 0:
+        time.sleep(seconds * TRANSPORT_LATENCY_SCALE)
+
+
+def record_inbound(method, path, status, latency):
+    """Log one request the app answered (record mode only)."""
+    if _log is not None:
+        _log.append({"kind": "inbound", "t": time.time(), "method": method, "path": strip_secrets(path),
+                     "status": status, "latency": round(latency, 6)})
+
+
+def transport_stats():
+    stats = {"mode": TRANSPORT_MODE, "log": TRANSPORT_LOG}
+    if TRANSPORT_MODE == "record":
+        stats["written"] = _log.written
+    elif TRANSPORT_MODE == "replay":
+        stats["latency_scale"] = TRANSPORT_LATENCY_SCALE
+        stats.update(replay_index().stats())
+    return stats
+
+
+# -----------------------
+# 3. YouTube (httplib2) transports
+# -----------------------
+class RecordingHttp:
+    """Wraps an httplib2.Http and logs each request/response pair it carries."""
+
+    def __init__(self, http):
+        self.http = http
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        start = time.perf_counter()
+        response, content = self.http.request(uri, method, body, headers, redirections, connection_type)
+        _log.append({
+            "kind": "youtube",
+            "t": time.time(),
+            "key": youtube_key(method, uri, body),
+            "method": method,
+            "uri": strip_secrets(uri),
+            "latency": round(time.perf_counter() - start, 6),
+            "status": response.status,
+            "headers": dict(response),
+            "content": body_text(content),
+        })
+        return response, content
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+class ReplayHttp:
+    """Stands in for httplib2.Http, answering from the transport log."""
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+        entry = replay_index().lookup(youtube_key(method, uri, body))
+        replay_delay(entry["latency"])
+        response = httplib2.Response(entry["headers"])
+        response.status = entry["status"]
+        return response, entry["content"].encode("utf-8", "surrogateescape")
+
+    def close(self):
+        pass
+
+
+def wrap_http(factory):
+    """A YouTube HTTP transport for the current TRANSPORT_MODE; `factory()` builds the real one."""
+    if TRANSPORT_MODE == "replay":
+        return ReplayHttp()
+    if TRANSPORT_MODE == "record":
+        return RecordingHttp(factory())
+    return factory()
+
+
+# -----------------------
+# 4. Gemini model handles
+# -----------------------
+def _usage(usage):
+    if usage is None:
+        return None
+    return {
+        "prompt_token_count": getattr(usage, "prompt_token_count", 0) or 0,
+        "candidates_token_count": getattr(usage, "candidates_token_count", 0) or 0,
+    }
+
+
+class RecordingModel:
+    """Wraps a GenerativeModel and logs each generate_content call it makes."""
+
+    def __init__(self, model_name, model):
+        self.model_name = model_name
+        self.model = model
+
+    def _append(self, prompt, stream, chunks, usage, latency, kind):
+        _log.append({
+            "kind": "gemini",
+            "t": time.time(),
+            "key": gemini_key(self.model_name, prompt, stream),
+            "group": gemini_group(self.model_name, stream, kind),
+            "model": self.model_name,
+            "stream": stream,
+            "prompt_kind": kind,
+            "latency": round(latency, 6),
+            "chunks": chunks,
+            "usage": _usage(usage),
+        })
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        kind = _prompt_kind.get()
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(prompt, response, start, kind)
+        latency = time.perf_counter() - start
+        self._append(prompt, False, [[response.text, round(latency, 6)]],
+                     getattr(response, "usage_metadata", None), latency, kind)
+        return response
+
+    def _record_stream(self, prompt, response, start, kind):
+        chunks = []
+        usage = None
+        for chunk in response:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            chunks.append([chunk.text, round(time.perf_counter() - start, 6)])
+            yield chunk
+        self._append(prompt, True, chunks, usage, time.perf_counter() - start, kind)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class ReplayModel:
+    """Stands in for a GenerativeModel, answering from the transport log."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        entry = replay_index().lookup(gemini_key(self.model_name, prompt, stream),
+                                      gemini_group(self.model_name, stream, _prompt_kind.get()))
+        usage = SimpleNamespace(**entry["usage"]) if entry.get("usage") else None
+        if stream:
+            return self._replay_stream(entry, usage)
+        replay_delay(entry["latency"])
+        return SimpleNamespace(text="".join(text for text, _ in entry["chunks"]), usage_metadata=usage)
+
+    def _replay_stream(self, entry, usage):
+        start = time.perf_counter()
+        for i, (text, offset) in enumerate(entry["chunks"]):
+            replay_delay(offset - (time.perf_counter() - start) / (TRANSPORT_LATENCY_SCALE or 1))
+            last = i == len(entry["chunks"]) - 1
+            yield SimpleNamespace(text=text, usage_metadata=usage if last else None)
+
+
+def wrap_model(model_name, factory):
+    """A Gemini model handle for the current TRANSPORT_MODE; `factory()` builds the real one."""
+    if TRANSPORT_MODE == "replay":
+        return ReplayModel(model_name)
+    if TRANSPORT_MODE == "record":
+        return RecordingModel(model_name, factory())
+    return factory()
@@ -0,0 +1,244 @@
+"""
+video_batch.py
+Turns the raw `items` list from videos().list into a compact columnar
+VideoBatch. Every field the analyzers need is parsed exactly once here,
+so counts are never re-parsed from strings and dates never re-run strptime.
+"""
+
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# Canonical YouTube timestamp, e.g. 2024-05-01T17:03:22Z
+_FAST_TIMESTAMP = re.compile(r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})Z$")
+_EPOCH = datetime(1970, 1, 1)
+
+
+# -----------------------
+# 1. Field Parsing
+# -----------------------
+def parse_count(value):
+    """Parse a statistics count string, treating missing/invalid values as 0."""
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+def parse_published_at(published_at):
+    """
+    Parse a `publishedAt` string into epoch seconds (UTC), or None if invalid.
+    Accepts the same formats the analyzers always have.
+    """
+    if not published_at:
+        return None
+
+    match = _FAST_TIMESTAMP.match(published_at)
+    try:
+        if match:
+            upload_date = datetime(*map(int, match.groups()))
+        elif published_at.endswith('Z'):
+            upload_date = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ")
+        else:
+            upload_date = datetime.strptime(published_at.split('.')[0], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+
+    delta = upload_date - _EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+def engagement_rate(views, likes, comments):
+    """(likes + comments) / views as a percentage, rounded to 2 decimals."""
+    return round(((likes + comments) / views) * 100, 2) if views > 0 else 0.0
+
+
+def engagement_rates_vectorized(views, likes, comments):
+    """
+    Array version of engagement_rate() that matches it bit for bit.
+    np.round(x, 2) can disagree with Python's round() when x * 100 lands
+    within float error of a .5 boundary, so those rare rows use round().
+    """
+    rates = np.zeros(len(views), dtype=np.float64)
+    has_views = views > 0
+    scaled = (likes[has_views] + comments[has_views]) / views[has_views] * 100
+    rounded = np.rint(scaled * 100) / 100
+
+    frac = scaled * 100 - np.floor(scaled * 100)
+    near_tie = np.abs(frac - 0.5) < 1e-6
+    for j in np.flatnonzero(near_tie):
+        rounded[j] = round(float(scaled[j]), 2)
+
+    rates[has_views] = rounded
+    return rates
+
+
+def group_sum(codes, values, n_groups):
+    """
+    Exact per-group sums of an integer column (codes in 0..n_groups-1).
+    Uses a stable sort + reduceat so large view counts never go through float.
+    """
+    sums = np.zeros(n_groups, dtype=np.int64)
+    if len(codes) == 0:
+        return sums
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    sums[sorted_codes[starts]] = np.add.reduceat(values[order], starts)
+    return sums
+
+
+def best_thumbnail(thumbnails):
+    """Pick the highest quality thumbnail URL available."""
+    return thumbnails.get('maxres', {}).get('url') or \
+        thumbnails.get('high', {}).get('url') or \
+        thumbnails.get('medium', {}).get('url') or \
+        thumbnails.get('default', {}).get('url', '')
+
+
+# -----------------------
+# 2. Columnar Batch
+# -----------------------
+class VideoBatch:
+    """
+    Column-oriented view of a list of YouTube video items.
+
+    Numeric columns are NumPy int64 arrays, `published_at` holds epoch seconds
+    (with `published_valid` marking rows whose timestamp parsed), and the
+    category column is stored as integer codes into `categories`.
+    """
+
+    __slots__ = (
+        "ids", "titles", "descriptions", "channel_titles", "thumbnails", "tags",
+        "views", "likes", "comments", "engagement_rates",
+        "published_at", "published_valid",
+        "category_codes", "categories",
+    )
+
+    def __init__(self, ids, titles, descriptions, channel_titles, thumbnails, tags,
+                 views, likes, comments, engagement_rates,
+                 published_at, published_valid, category_codes, categories):
+        self.ids = ids
+        self.titles = titles
+        self.descriptions = descriptions
+        self.channel_titles = channel_titles
+        self.thumbnails = thumbnails
+        self.tags = tags
+        self.views = views
+        self.likes = likes
+        self.comments = comments
+        self.engagement_rates = engagement_rates
+        self.published_at = published_at
+        self.published_valid = published_valid
+        self.category_codes = category_codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_items(cls, video_items):
+        """Single ingestion pass over raw API items."""
+        n = len(video_items)
+        intern = sys.intern
+
+        ids, titles, descriptions, channel_titles, thumbnails, tags = [], [], [], [], [], []
+        views = np.zeros(n, dtype=np.int64)
+        likes = np.zeros(n, dtype=np.int64)
+        comments = np.zeros(n, dtype=np.int64)
+        published_at = np.zeros(n, dtype=np.int64)
+        published_valid = np.zeros(n, dtype=bool)
+        category_codes = np.full(n, -1, dtype=np.int32)
+        categories = []
+        category_index = {}
+
+        for i, item in enumerate(video_items):
+            snippet = item.get('snippet', {})
+            statistics = item.get('statistics', {})
+
+            ids.append(intern(item.get('id', '')))
+            titles.append(snippet.get('title'))
+            descriptions.append(snippet.get('description', ''))
+            channel_titles.append(intern(snippet.get('channelTitle') or ''))
+            thumbnails.append(best_thumbnail(snippet.get('thumbnails', {})))
+            tags.append(snippet.get('tags', []))
+
+            views[i] = parse_count(statistics.get('viewCount'))
+            likes[i] = parse_count(statistics.get('likeCount'))
+            comments[i] = parse_count(statistics.get('commentCount'))
+
+            ts = parse_published_at(snippet.get('publishedAt'))
+            if ts is not None:
+                published_at[i] = ts
+                published_valid[i] = True
+
+            category_id = str(snippet.get('categoryId', ''))
+            if category_id:
+                code = category_index.get(category_id)
+                if code is None:
+                    code = category_index[category_id] = len(categories)
+                    categories.append(intern(category_id))
+                category_codes[i] = code
+
+        engagement_rates = engagement_rates_vectorized(views, likes, comments)
+
+        return cls(ids, titles, descriptions, channel_titles, thumbnails, tags,
+                   views, likes, comments, engagement_rates,
+                   published_at, published_valid, category_codes, categories)
+
+    @classmethod
+    def concat(cls, batches):
+        """Stack several batches (e.g. regions or snapshots) into one."""
+        batches = list(batches)
+        category_index = {}  # insertion order keeps categories in first-seen order
+        category_codes = []
+        for batch in batches:
+            remap = np.array(
+                [category_index.setdefault(c, len(category_index)) for c in batch.categories] + [-1],
+                dtype=np.int32
+            )
+            # Code -1 (no category) indexes the trailing -1 in remap
+            category_codes.append(remap[batch.category_codes])
+
+        def join_lists(name):
+            return [value for batch in batches for value in getattr(batch, name)]
+
+        def join_arrays(name, dtype):
+            arrays = [getattr(batch, name) for batch in batches]
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+        return cls(
+            join_lists("ids"), join_lists("titles"), join_lists("descriptions"),
+            join_lists("channel_titles"), join_lists("thumbnails"), join_lists("tags"),
+            join_arrays("views", np.int64), join_arrays("likes", np.int64),
+            join_arrays("comments", np.int64), join_arrays("engagement_rates", np.float64),
+            join_arrays("published_at", np.int64), join_arrays("published_valid", bool),
+            np.concatenate(category_codes) if category_codes else np.zeros(0, dtype=np.int32),
+            list(category_index)
+        )
+
+    # --- Row helpers ---
+
+    def category_id(self, i):
+        code = self.category_codes[i]
+        return self.categories[code] if code >= 0 else ''
+
+    def dashboard_row(self, i):
+        """The per-video dict the dashboard renders."""
+        views = int(self.views[i])
+        likes = int(self.likes[i])
+        comments = int(self.comments[i])
+        return {
+            "video_id": self.ids[i],
+            "title": self.titles[i],
+            "thumbnail": self.thumbnails[i],
+            "views": views,
+            "likes": likes,
+            "comment_count": comments,
+            "like_count": likes,
+            "engagement_rate": float(self.engagement_rates[i]),
+            "category_id": self.category_id(i),
+            "description": self.descriptions[i]
+        }
@@ -0,0 +1,167 @@
+"""
+wsgi.py
+Production entry point (`python app.py` is the single-process dev server).
+
+    gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+
+create_app() preloads everything a worker would otherwise load on its
+first requests: the app and creator modules (pandas, scikit-learn), the
+YouTube clients (discovery document), TextBlob's sentiment lexicon,
+scikit-learn's TF-IDF machinery and the Gemini SDK. With preload_app on,
+this happens once in the gunicorn master and workers fork with it in
+memory (copy-on-write); sockets, SQLite connections and background
+threads are never carried across the fork (see the register_at_fork hooks
+in client_pool.py, snapshot_store.py and jobs.py).
+
+shutdown() runs in each worker as it exits (and at interpreter exit):
+it stops the collector, lets queued jobs finish and flushes pending
+snapshot writes, within SHUTDOWN_TIMEOUT seconds. With COLLECTOR_ENABLED=1
+(or WATCHLIST_ENABLED=1) only the worker holding COLLECTOR_LOCK_PATH runs
+the collector (and the watchlist poller), so the quota is not spent once
+per worker.
+
+Measured on one core against benchmarks/stub_server.py (YouTube 50 ms,
+Gemini 500 ms), with bench_load.py and 8 clients (`--url` for the servers
+started on their own):
+    preload in the master                 2.6 s, once
+    first trending + coach request        1.1 s in a preloaded worker, 2.0 s cold
+                                          all three endpoints     /get_trending_data only
+    gunicorn, 3 gthread workers           69-82 req/s, p50 27-36 ms   667 req/s
+    werkzeug (python app.py)              65-69 req/s, p50 74-77 ms   771 req/s
+    gunicorn + UvicornWorker (asgi.py)    50-57 req/s, p50 60-72 ms   440 req/s
+On one core, extra workers add no CPU: gunicorn's gain is lower latency
+on the mix (the clustering in /get_creator_suggestions no longer holds up
+other requests behind one GIL), and the cheap cached route is slightly
+slower than in one process. Multi-core scaling has not been measured;
+measure a deployment with `bench_load.py --url`. /metrics reports only
+the worker that served the scrape.
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# -----------------------
+# 1. Config
+# -----------------------
+load_dotenv()
+
+PRELOAD = os.getenv("PRELOAD", "1") == "1"
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", 20))
+# Next to trends.db (same default as snapshot_store.py), wherever the server is started from
+COLLECTOR_LOCK_PATH = os.getenv("COLLECTOR_LOCK_PATH", os.path.abspath(os.getenv(
+    "TRENDS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trends.db")
+)) + ".collector.lock")
+
+
+# -----------------------
+# 2. Preload
+# -----------------------
+def preload():
+    """Import and warm the app's heavy dependencies. Returns {step: seconds}."""
+    timings = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        fn()
+        timings[name] = round(time.perf_counter() - start, 3)
+
+    def import_modules():
+        import app  # noqa: F401
+        import creator_coach_ai  # noqa: F401
+        import creator_suggestions  # noqa: F401
+
+    def build_clients():
+        import app
+        import creator_coach_ai
+        import creator_suggestions
+        # LazyClient builds on first attribute access
+        for client in (app.youtube_service, creator_suggestions.youtube, creator_coach_ai.youtube):
+            client.videos
+
+    def warm_sentiment():
+        from title_sentiment import score_polarity
+        score_polarity("Preloading the sentiment lexicon")
+
+    def warm_vectorizer():
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        TfidfVectorizer(max_features=1000, ngram_range=(1, 2), stop_words="english").fit(
+            ["preload the vectorizer", "before the first request"]
+        )
+
+    def import_gemini():
+        import google.generativeai  # noqa: F401  (no client or channel is opened before the fork)
+
+    step("modules", import_modules)
+    step("youtube_clients", build_clients)
+    step("sentiment_lexicon", warm_sentiment)
+    step("tfidf_vectorizer", warm_vectorizer)
+    step("gemini_sdk", import_gemini)
+    return timings
+
+
+# -----------------------
+# 3. Collector & shutdown
+# -----------------------
+_collector_lock_file = None
+
+
+def start_collector_once():
+    """Start the collector / watchlist poller in this process if enabled and no other worker runs them."""
+    global _collector_lock_file
+    enabled = "1" in (os.getenv("COLLECTOR_ENABLED", "0"), os.getenv("WATCHLIST_ENABLED", "0"))
+    if not enabled or _collector_lock_file is not None:
+        return False
+    import fcntl
+
+    lock_file = open(COLLECTOR_LOCK_PATH, "a")
+    try:
+        # Held until this process exits; a replacement worker can then take over
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _collector_lock_file = lock_file
+    from app import start_background_collector
+    start_background_collector()
+    return True
+
+
+_shutdown_lock = threading.Lock()
+_shut_down = False
+
+
+def shutdown(timeout=SHUTDOWN_TIMEOUT):
+    """Stop background work and flush pending writes, within `timeout` seconds. Runs once."""
+    global _shut_down
+    with _shutdown_lock:
+        if _shut_down:
+            return
+        _shut_down = True
+    from app import trending_collector, watchlist_poller
+    from jobs import job_manager
+    from snapshot_store import snapshot_writer
+
+    deadline = time.monotonic() + timeout
+    trending_collector.stop(timeout)
+    watchlist_poller.stop(max(deadline - time.monotonic(), 0))
+    if not job_manager.shutdown(max(deadline - time.monotonic(), 0)):
+        print("⚠️ Shutdown: abandoned unfinished background jobs")
+    if not snapshot_writer.flush(max(deadline - time.monotonic(), 0)):
+        print("⚠️ Shutdown: some trending snapshots were not written")
+
+
+# -----------------------
+# 4. App factory
+# -----------------------
+def create_app(preload_models=PRELOAD):
+    """The Flask app, preloaded and with shutdown() registered."""
+    if preload_models:
+        timings = preload()
+        print(f"Preloaded in {sum(timings.values()):.1f}s: {timings}")
+    from app import app
+    atexit.register(shutdown)
+    return app
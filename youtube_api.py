@@ -0,0 +1,313 @@
+"""
+youtube_api.py
+Shared access layer for the YouTube `mostPopular` chart.
+app.py, creator_suggestions.py and creator_coach_ai.py all fetch through
+here so a chart fetched by one endpoint is reused by the others.
+"""
+
+import asyncio
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from cache import TwoTierCache
+from client_pool import YOUTUBE_HTTP_POOL_SIZE, YOUTUBE_HTTP_TIMEOUT, youtube_http_pool
+from metrics import record_youtube_call, stage
+from singleflight import SingleFlight
+from snapshot_store import snapshot_writer
+from transport import TRANSPORT_MODE
+
+try:
+    import httpx  # optional: lets the ASGI server (asgi.py) await YouTube calls
+except ImportError:
+    httpx = None
+
+# -----------------------
+# 1. Client & Cache Setup
+# -----------------------
+load_dotenv()
+
+# Point the client at a local stub server (e.g. http://127.0.0.1:8765/) for testing
+YOUTUBE_API_ROOT = os.getenv("YOUTUBE_API_ROOT")
+
+
+class LazyClient:
+    """Stands in for an API client and builds it on first use (once, thread-safe)."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def build_youtube_client(api_key=None, lazy=True):
+    """
+    Create a YouTube Data API v3 client, honouring YOUTUBE_API_ROOT.
+    The discovery document is the static copy bundled with
+    google-api-python-client (no network fetch), and unless lazy=False the
+    client is only built on first use, so importing a module stays cheap.
+    """
+    client_options = {"api_endpoint": YOUTUBE_API_ROOT} if YOUTUBE_API_ROOT else None
+
+    def build_client():
+        from googleapiclient.discovery import build
+        return build(
+            "youtube", "v3",
+            developerKey=api_key or os.getenv("YOUTUBE_API_KEY"),
+            client_options=client_options,
+            static_discovery=True
+        )
+
+    return LazyClient(build_client) if lazy else build_client()
+
+# The trending chart only changes every few minutes, so a short TTL is enough.
+trending_cache = TwoTierCache(
+    namespace="youtube_most_popular",
+    ttl=int(os.getenv("YOUTUBE_CACHE_TTL", 300)),
+    stale_ttl=int(os.getenv("YOUTUBE_CACHE_STALE_TTL", 600)),
+    max_entries=int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", 256)),
+)
+
+# Concurrent cache misses for the same request share one upstream call.
+youtube_inflight = SingleFlight("youtube_videos_list")
+
+
+# -----------------------
+# 2. Fetch mostPopular chart (paginated)
+# -----------------------
+# videos().list never returns more than 50 items per page
+PAGE_SIZE = 50
+
+# Only the fields the analyzers and creator modules read; everything else
+# (localizations, liveBroadcastContent, etags, ...) is dropped server-side.
+PART_FIELDS = {
+    "snippet": "snippet(publishedAt,title,description,channelTitle,categoryId,tags,"
+               "thumbnails(maxres(url),high(url),medium(url),default(url)))",
+    "statistics": "statistics(viewCount,likeCount,commentCount)",
+}
+
+
+def fields_for(part):
+    """Build a `fields=` projection for the requested parts."""
+    item_fields = ["id"] + [PART_FIELDS[p] for p in part.split(",") if p in PART_FIELDS]
+    return f"nextPageToken,items({','.join(item_fields)})"
+
+
+def page_request(region, page_size, category_id, part, page_token, fields):
+    """(cache key, videos().list parameters) for one mostPopular page."""
+    category_id = str(category_id) if category_id else None
+    key = (region, category_id, int(page_size), part, page_token, fields)
+
+    request_params = {
+        "part": part,
+        "chart": "mostPopular",
+        "regionCode": region,
+        "maxResults": page_size
+    }
+    if category_id:
+        request_params["videoCategoryId"] = category_id
+    if page_token:
+        request_params["pageToken"] = page_token
+    if fields:
+        request_params["fields"] = fields
+    return key, request_params
+
+
+def fetch_most_popular_page(youtube, region="US", page_size=PAGE_SIZE, category_id=None,
+                            part="snippet,statistics", page_token=None, fields=None):
+    """
+    Return one raw `videos().list(chart="mostPopular")` page.
+    Pages are cached by (region, videoCategoryId, maxResults, part, pageToken, fields).
+    Returns (response, fetched_upstream).
+    """
+    key, request_params = page_request(region, page_size, category_id, part, page_token, fields)
+    fetched_upstream = []
+
+    def call_upstream():
+        record_youtube_call("videos.list")
+        # httplib2.Http is not thread-safe: borrow a pooled keep-alive transport per call
+        with stage("youtube_fetch"), youtube_http_pool.acquire() as http:
+            return youtube.videos().list(**request_params).execute(http=http)
+
+    def fetch():
+        fetched_upstream.append(True)
+        inflight_key = ("videos.list", tuple(sorted(request_params.items())))
+        return youtube_inflight.do(inflight_key, call_upstream)
+
+    response = trending_cache.get_or_fetch(key, fetch)
+    return response, bool(fetched_upstream)
+
+
+def iter_most_popular(youtube, region="US", limit=50, category_id=None, part="snippet,statistics",
+                      fields="auto"):
+    """
+    Stream trending items page by page, following nextPageToken.
+
+    Stops as soon as `limit` items have been yielded, or when the caller
+    stops iterating (the next page is only fetched once the current one is
+    used up). Pass fields=None to request full items instead of the default
+    projection.
+    """
+    if fields == "auto":
+        fields = fields_for(part)
+
+    # Always request full pages once we need more than one, so page boundaries
+    # (and cache keys) are the same no matter how many items a caller wants
+    page_size = PAGE_SIZE if limit > PAGE_SIZE else limit
+
+    yielded = 0
+    page_token = None
+    seen_items = []
+    recorded_fresh_page = False
+    chart_ended = False
+
+    try:
+        while yielded < limit:
+            response, fresh = fetch_most_popular_page(
+                youtube, region, page_size, category_id, part, page_token, fields
+            )
+            recorded_fresh_page = recorded_fresh_page or fresh
+
+            for item in response.get("items", []):
+                if yielded >= limit:
+                    return
+                seen_items.append(item)
+                yield item
+                yielded += 1
+
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                chart_ended = True
+                return
+    finally:
+        # Keep a history of freshly fetched charts in trends.db (written in the background).
+        # A chart cut short (the caller stopped early) is stored by its real length.
+        if recorded_fresh_page and seen_items:
+            complete = chart_ended or len(seen_items) >= limit
+            snapshot_writer.enqueue(region, seen_items, category_id=category_id,
+                                    chart_size=limit if complete else len(seen_items))
+
+
+# -----------------------
+# 3. Batched statistics lookups (watchlist)
+# -----------------------
+STATS_FIELDS = "items(id,statistics(viewCount,likeCount,commentCount))"
+
+
+def fetch_video_stats(youtube, video_ids):
+    """
+    Statistics for up to PAGE_SIZE (50) videos in one `videos().list(id=...)`
+    call, which costs 1 quota unit however many ids it carries. Returns
+    {video_id: item}; ids YouTube did not return (deleted, private) are absent.
+    Not cached: the point is the current numbers.
+    """
+    if not video_ids:
+        return {}
+    if len(video_ids) > PAGE_SIZE:
+        raise ValueError(f"videos().list takes at most {PAGE_SIZE} ids per call, got {len(video_ids)}")
+    record_youtube_call("videos.list")
+    with stage("youtube_fetch"), youtube_http_pool.acquire() as http:
+        response = youtube.videos().list(
+            part="statistics", id=",".join(video_ids), fields=STATS_FIELDS
+        ).execute(http=http)
+    return {item["id"]: item for item in response.get("items", [])}
+
+
+# -----------------------
+# 4. Async fetch (ASGI server)
+# -----------------------
+# Pages are awaited on httpx when it is installed; without it, or while
+# TRANSPORT_MODE records or replays, the sync path runs on a worker thread.
+ASYNC_UPSTREAM = httpx is not None and TRANSPORT_MODE == "off"
+
+_async_client = None
+
+
+def _http_client():
+    # Made on first use, inside the event loop that will use it
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=YOUTUBE_HTTP_TIMEOUT, limits=httpx.Limits(max_connections=YOUTUBE_HTTP_POOL_SIZE)
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def _call_upstream_async(youtube, request_params):
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    # Let the client build the request (URL, key, headers); only the sending is ours
+    http_request = youtube.videos().list(**request_params)
+    record_youtube_call("videos.list")
+    with stage("youtube_fetch"):
+        response = await _http_client().request(
+            http_request.method, http_request.uri, headers=http_request.headers, content=http_request.body
+        )
+    if response.status_code >= 300:
+        raise HttpError(httplib2.Response({"status": response.status_code}), response.content, uri=http_request.uri)
+    return response.json()
+
+
+async def fetch_most_popular_page_async(youtube, region="US", page_size=PAGE_SIZE, category_id=None,
+                                        part="snippet,statistics", page_token=None, fields=None):
+    """
+    fetch_most_popular_page() for the event loop: same cache and keys, but a
+    stale page is refetched rather than served while it refreshes.
+    """
+    if not ASYNC_UPSTREAM:
+        return await asyncio.to_thread(
+            fetch_most_popular_page, youtube, region, page_size, category_id, part, page_token, fields
+        )
+
+    key, request_params = page_request(region, page_size, category_id, part, page_token, fields)
+    response = trending_cache.get_fresh(key)
+    if response is not None:
+        return response, False
+    inflight_key = ("videos.list", tuple(sorted(request_params.items())))
+    response = await youtube_inflight.do_async(inflight_key, lambda: _call_upstream_async(youtube, request_params))
+    trending_cache.set(key, response)
+    return response, True
+
+
+async def most_popular_async(youtube, region="US", limit=50, category_id=None, part="snippet,statistics",
+                             fields="auto"):
+    """The first `limit` trending items, like list(iter_most_popular(...)) but awaited."""
+    if fields == "auto":
+        fields = fields_for(part)
+    page_size = PAGE_SIZE if limit > PAGE_SIZE else limit
+
+    items = []
+    page_token = None
+    recorded_fresh_page = False
+    while len(items) < limit:
+        response, fresh = await fetch_most_popular_page_async(
+            youtube, region, page_size, category_id, part, page_token, fields
+        )
+        recorded_fresh_page = recorded_fresh_page or fresh
+        items.extend(response.get("items", [])[:limit - len(items)])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    if recorded_fresh_page and items:
+        snapshot_writer.enqueue(region, items, category_id=category_id, chart_size=limit)
+    return items